@@ -0,0 +1,500 @@
+import numpy as np
+from tick_store import RingBuffer
+
+NS_PER_SEC = 1_000_000_000
+
+BAR_COLUMNS = {
+    'time': np.int64, # Bar open time (epoch ns)
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+}
+OHLCV = ['open', 'high', 'low', 'close', 'volume']
+
+def reduce_bars(starts, times, opens, highs, lows, closes, volumes):
+    """Vectorized OHLCV reduction of consecutive groups beginning at `starts`."""
+    ends = np.r_[starts[1:], len(opens)] - 1
+    return {
+        'time': times[starts],
+        'open': opens[starts],
+        'high': np.maximum.reduceat(highs, starts),
+        'low': np.minimum.reduceat(lows, starts),
+        'close': closes[ends],
+        'volume': np.add.reduceat(volumes, starts),
+    }
+
+def bars_to_frame(bars):
+    """Dict of bar column arrays -> lowercase OHLCV DataFrame indexed by bar open time."""
+    import pandas as pd # Deferred: the bar hot path is numpy only
+    cols = dict(bars)
+    index = pd.DatetimeIndex(np.asarray(cols.pop('time')).astype(np.int64).view('datetime64[ns]'), name='time')
+    return pd.DataFrame(cols, index=index, columns=OHLCV)
+
+def group_starts(keys):
+    """Indices where the (sorted) group key changes, including 0."""
+    return np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+
+
+class BarAggregator:
+    """
+    Base class for incremental bar builders.
+    Completed bars live in a fixed-size RingBuffer; the forming bar is a small
+    list [time, open, high, low, close, volume] updated in place.
+    """
+    def __init__(self, capacity):
+        self.history = RingBuffer(capacity, BAR_COLUMNS)
+        self.forming = None
+
+    def _open_bar(self, ts_ns, price, volume):
+        self.forming = [ts_ns, price, price, price, price, volume]
+
+    def _close_bar(self):
+        """Move the forming bar into history and return it as a tuple."""
+        bar = self.forming
+        self.history.append(time=bar[0], open=bar[1], high=bar[2], low=bar[3], close=bar[4], volume=bar[5])
+        self.forming = None
+        return tuple(bar)
+
+    def _load(self, bars):
+        """Bulk-load reduced bars into an empty aggregator; the newest one stays forming."""
+        n = len(bars['time'])
+        if n == 0:
+            return
+        self.history.extend(**{name: arr[:-1] for name, arr in bars.items()})
+        self.forming = [int(bars['time'][-1])] + [float(bars[name][-1]) for name in OHLCV]
+
+    def seed(self, times, prices, volumes):
+        """
+        Bulk-load historical ticks into an empty aggregator.
+        Generic fallback: replay through update(); subclasses vectorize.
+        """
+        for t, p, v in zip(times.tolist(), prices.tolist(), volumes.tolist()):
+            self.update(t, p, v)
+
+    def _fold(self, price, volume):
+        bar = self.forming
+        if price > bar[2]: bar[2] = price
+        if price < bar[3]: bar[3] = price
+        bar[4] = price
+        bar[5] += volume
+
+    def _tail_rows(self, pending=None):
+        """Bars after the completed history: the forming bar, if any."""
+        return [self.forming] if self.forming is not None else []
+
+    def bar_count(self, pending=None):
+        return len(self.history) + len(self._tail_rows(pending))
+
+    def __len__(self):
+        return self.bar_count()
+
+    def arrays(self, length=None, pending=None):
+        """
+        Copies of the last `length` bars (default: all retained) as a dict of
+        column arrays, completed bars followed by the forming bar.
+        `pending` is an unfinished lower-timeframe bar to merge provisionally.
+        """
+        tail = self._tail_rows(pending)
+        if length is None:
+            length = len(self.history) + len(tail)
+        tail = tail[-length:] if length > 0 else []
+        n_hist = length - len(tail)
+        cols = {name: self.history.view(name, n_hist) for name in BAR_COLUMNS}
+        if tail:
+            return {name: np.append(cols[name], [row[i] for row in tail]) for i, name in enumerate(BAR_COLUMNS)}
+        return {name: arr.copy() for name, arr in cols.items()}
+
+    def to_frame(self, length, pending=None):
+        """
+        Last `length` bars (completed bars followed by the forming bar) as a
+        lowercase OHLCV DataFrame indexed by bar open time.
+        `pending` is an unfinished lower-timeframe bar to merge provisionally.
+        """
+        return bars_to_frame(self.arrays(length, pending))
+
+
+class TimeBarAggregator(BarAggregator):
+    """
+    Fixed-period time bars (e.g. 1 minute), rolled on period boundaries.
+    `offset_sec` shifts the boundaries (e.g. sessions opening at 23:01).
+    """
+    def __init__(self, period_sec, capacity, offset_sec=0):
+        super().__init__(capacity)
+        self.period_ns = int(period_sec * NS_PER_SEC)
+        self.offset_ns = int(offset_sec * NS_PER_SEC) % self.period_ns
+
+    def bucket(self, ts_ns):
+        return ts_ns - (ts_ns - self.offset_ns) % self.period_ns
+
+    def update(self, ts_ns, price, volume=1.0):
+        """
+        Fold a tick into the forming bar in O(1).
+        Returns the bar that was closed by this tick (tuple), or None.
+        """
+        start = self.bucket(ts_ns)
+        closed = None
+        if self.forming is None:
+            self._open_bar(start, price, volume)
+        elif start > self.forming[0]:
+            closed = self._close_bar()
+            self._open_bar(start, price, volume)
+        else:
+            # Same bar (late ticks are folded into the forming bar)
+            self._fold(price, volume)
+        return closed
+
+    def seed(self, times, prices, volumes):
+        starts = group_starts(self.bucket(times))
+        bars = reduce_bars(starts, times, prices, prices, prices, prices, volumes)
+        bars['time'] = self.bucket(bars['time'])
+        self._load(bars)
+
+    def seed_bars(self, bars):
+        """Bulk-load completed lower-timeframe bars (dict of column arrays)."""
+        if len(bars['time']) == 0:
+            return
+        buckets = self.bucket(bars['time'])
+        reduced = reduce_bars(group_starts(buckets), buckets, bars['open'], bars['high'],
+                              bars['low'], bars['close'], bars['volume'])
+        self._load(reduced)
+
+    def update_bar(self, bar):
+        """
+        Fold a completed lower-timeframe bar (time, open, high, low, close, volume) in O(1).
+        Returns the bar of this timeframe that was closed, or None.
+        """
+        start = self.bucket(bar[0])
+        closed = None
+        if self.forming is not None and start > self.forming[0]:
+            closed = self._close_bar()
+        if self.forming is None:
+            self.forming = [start, bar[1], bar[2], bar[3], bar[4], bar[5]]
+        else:
+            merge_into(self.forming, bar)
+        return closed
+
+    def roll(self, ts_ns):
+        """Close the forming bar if `ts_ns` falls in a later period. Returns the closed bar or None."""
+        if self.forming is not None and self.bucket(ts_ns) > self.forming[0]:
+            return self._close_bar()
+        return None
+
+    def _tail_rows(self, pending=None):
+        if pending is None:
+            return super()._tail_rows()
+
+        # Provisionally merge the unfinished lower-timeframe bar (without mutating state)
+        start = self.bucket(pending[0])
+        forming = self.forming
+        if forming is not None and start == forming[0]:
+            merged = list(forming)
+            merge_into(merged, pending)
+            return [merged]
+
+        rows = [forming] if forming is not None else []
+        rows.append([start, pending[1], pending[2], pending[3], pending[4], pending[5]])
+        return rows
+
+
+def merge_into(target, bar):
+    """Merge OHLCV `bar` into the `target` bar list in place."""
+    if bar[2] > target[2]: target[2] = bar[2]
+    if bar[3] < target[3]: target[3] = bar[3]
+    target[4] = bar[4]
+    target[5] += bar[5]
+
+
+class TickBarAggregator(BarAggregator):
+    """Closes a bar every `count` ticks."""
+    def __init__(self, count, capacity):
+        super().__init__(capacity)
+        self.count = int(count)
+        self.ticks = 0
+
+    def update(self, ts_ns, price, volume=1.0):
+        if self.forming is None:
+            self._open_bar(ts_ns, price, volume)
+            self.ticks = 1
+        else:
+            self._fold(price, volume)
+            self.ticks += 1
+
+        if self.ticks >= self.count:
+            return self._close_bar()
+        return None
+
+    def seed(self, times, prices, volumes):
+        n = len(times)
+        if n == 0:
+            return
+        starts = np.arange(0, n, self.count)
+        self._load(reduce_bars(starts, times, prices, prices, prices, prices, volumes))
+        self.ticks = n - starts[-1]
+        if self.ticks >= self.count:
+            self._close_bar()
+
+
+class VolumeBarAggregator(BarAggregator):
+    """
+    Closes a bar once its accumulated volume reaches `threshold`.
+    Quote feeds carry no traded size, so each tick contributes its tick
+    volume (1.0 unless the caller supplies a weight).
+    """
+    def __init__(self, threshold, capacity):
+        super().__init__(capacity)
+        self.threshold = float(threshold)
+
+    def update(self, ts_ns, price, volume=1.0):
+        if self.forming is None:
+            self._open_bar(ts_ns, price, volume)
+        else:
+            self._fold(price, volume)
+
+        if self.forming[5] >= self.threshold:
+            return self._close_bar()
+        return None
+
+    def seed(self, times, prices, volumes):
+        n = len(times)
+        if n == 0:
+            return
+        if volumes[0] > 0 and (volumes == volumes[0]).all():
+            # Uniform tick volume (quotes carry no size): every bar has the same
+            # tick count, found by summing the volume as update() would
+            steps = np.cumsum(np.full(min(n, int(np.ceil(self.threshold / volumes[0]))) + 1, volumes[0]))
+            starts = np.arange(0, n, int(np.searchsorted(steps, self.threshold)) + 1)
+        else:
+            # A bar ends at the first tick whose cumulative volume reaches the
+            # bar's base + threshold: one binary search per bar, not per tick
+            cum = np.cumsum(volumes)
+            starts = []
+            i, base = 0, 0.0
+            while i < n:
+                starts.append(i)
+                j = max(int(np.searchsorted(cum, base + self.threshold)), i)
+                if j >= n:
+                    break
+                i, base = j + 1, cum[j]
+            starts = np.array(starts)
+        self._load(reduce_bars(starts, times, prices, prices, prices, prices, volumes))
+        if self.forming[5] >= self.threshold:
+            self._close_bar()
+
+
+class RangeBarAggregator(BarAggregator):
+    """
+    Range bars: a bar's high-low never exceeds `size`. A tick that would
+    break the range closes the bar and opens the next one.
+    """
+    def __init__(self, size, capacity):
+        super().__init__(capacity)
+        self.size = float(size)
+        # Tolerance for float noise in prices like 2000.1 - 1999.6
+        self.eps = self.size * 1e-9
+
+    def update(self, ts_ns, price, volume=1.0):
+        bar = self.forming
+        if bar is None:
+            self._open_bar(ts_ns, price, volume)
+            return None
+
+        if max(bar[2], price) - min(bar[3], price) > self.size + self.eps:
+            closed = self._close_bar()
+            self._open_bar(ts_ns, price, volume)
+            return closed
+
+        self._fold(price, volume)
+        return None
+
+    def seed(self, times, prices, volumes):
+        n = len(times)
+        if n == 0:
+            return
+        # A bar ends before the first tick whose running high - low exceeds the
+        # range. The boundary depends on where the bar started, so bars are
+        # found one at a time: long ones by accumulate over growing windows,
+        # short ones (where numpy call overhead dominates) by a plain scan
+        limit = self.size + self.eps
+        starts = []
+        plain = None
+        i, length = 0, 0
+        while i < n:
+            starts.append(i)
+            if length < 16:
+                if plain is None:
+                    plain = prices.tolist()
+                high = low = plain[i]
+                j = i + 1
+                while j < n:
+                    price = plain[j]
+                    if price > high:
+                        high = price
+                    elif price < low:
+                        low = price
+                    if high - low > limit:
+                        break
+                    j += 1
+                if j >= n:
+                    break
+                length = j - i
+            else:
+                window = 2 * length
+                while True:
+                    chunk = prices[i:i + window]
+                    broken = np.flatnonzero(np.maximum.accumulate(chunk) - np.minimum.accumulate(chunk) > limit)
+                    if len(broken) or i + window >= n:
+                        break
+                    window *= 2
+                if not len(broken):
+                    break
+                length = int(broken[0]) # >= 1: a single tick never breaks the range
+            i += length
+        self._load(reduce_bars(np.array(starts), times, prices, prices, prices, prices, volumes))
+
+
+BAR_TYPES = {
+    'tick': TickBarAggregator,
+    'volume': VolumeBarAggregator,
+    'range': RangeBarAggregator,
+}
+
+def make_aggregator(spec, capacity):
+    """Build an activity-based aggregator from a spec like 'tick:100', 'volume:500' or 'range:0.5'."""
+    kind, _, param = spec.partition(':')
+    try:
+        value = float(param)
+    except ValueError:
+        value = float('nan')
+    # A zero / negative size would close a bar on every tick; tick counts must be whole
+    valid = 0 < value < float('inf') and (kind != 'tick' or value == int(value))
+    if kind not in BAR_TYPES or not valid:
+        raise ValueError(f"Invalid bar type '{spec}' (expected tick:N, volume:N or range:X with N, X > 0)")
+    return BAR_TYPES[kind](value, capacity)
+
+
+class BarEngine:
+    """
+    Per-symbol bar engine. Ticks build 1-minute bars; higher timeframes are
+    derived from closed 1-minute bars, so each tick costs O(1) per timeframe.
+    Activity bars (tick/volume/range specs) are built from the same ticks.
+    """
+    BASE = '1m'
+    DERIVED = {'5m': 300, '15m': 900, '1h': 3600, 'session': 86400}
+    ALIASES = {'1min': '1m', '5min': '5m', '15min': '15m', '60m': '1h', '1d': 'session'}
+    MAX_CUSTOM = 8 # Activity bar types per symbol (each one is another aggregator fed every tick)
+
+    def __init__(self, capacity, session_offset_sec=0, custom=()):
+        self.capacity = capacity
+        self.base = TimeBarAggregator(60, capacity)
+        self.derived = {}
+        for tf, period in self.DERIVED.items():
+            offset = session_offset_sec if tf == 'session' else 0
+            self.derived[tf] = TimeBarAggregator(period, capacity, offset_sec=offset)
+        self.custom = {}
+        for spec in custom:
+            self.add_custom(spec)
+
+    def add_custom(self, spec):
+        """Start building an activity bar type (e.g. 'range:0.5'). Returns the aggregator."""
+        if spec not in self.custom:
+            if len(self.custom) >= self.MAX_CUSTOM:
+                raise ValueError(f"Too many activity bar types (max {self.MAX_CUSTOM}), not adding '{spec}'")
+            self.custom[spec] = make_aggregator(spec, self.capacity)
+        return self.custom[spec]
+
+    def has(self, timeframe):
+        tf = self.normalize(timeframe)
+        return tf == self.BASE or tf in self.derived or tf in self.custom
+
+    @classmethod
+    def normalize(cls, timeframe):
+        return cls.ALIASES.get(timeframe, timeframe)
+
+    @classmethod
+    def validate(cls, timeframe):
+        """Raise ValueError unless `timeframe` is a supported time frame (or alias) or a valid activity bar spec."""
+        if ':' in timeframe:
+            make_aggregator(timeframe, 1)
+            return
+        tf = cls.normalize(timeframe)
+        if tf != cls.BASE and tf not in cls.DERIVED:
+            supported = ", ".join([cls.BASE, *cls.DERIVED, "tick:N", "volume:N", "range:X"])
+            raise ValueError(f"Unknown timeframe '{timeframe}' (expected one of {supported})")
+
+    def update(self, ts_ns, price, volume=1.0):
+        """Returns a list of (timeframe, bar) closed by this tick."""
+        events = []
+        for spec, agg in self.custom.items():
+            custom_closed = agg.update(ts_ns, price, volume)
+            if custom_closed is not None:
+                events.append((spec, custom_closed))
+
+        closed = self.base.update(ts_ns, price, volume)
+        if closed is None:
+            return events
+
+        events.append((self.BASE, closed))
+        next_start = self.base.forming[0]
+        for tf, agg in self.derived.items():
+            htf_closed = agg.update_bar(closed)
+            if htf_closed is None:
+                # The new 1-minute bar already belongs to the next period
+                htf_closed = agg.roll(next_start)
+            if htf_closed is not None:
+                events.append((tf, htf_closed))
+        return events
+
+    def seed(self, times, prices, volumes=None):
+        """
+        Bulk-load historical ticks (oldest first) into a fresh engine using
+        vectorized reductions instead of replaying them through update().
+        """
+        if volumes is None:
+            volumes = np.ones(len(times))
+        self.base.seed(times, prices, volumes)
+        closed = {name: self.base.history.view(name) for name in BAR_COLUMNS}
+        for agg in self.derived.values():
+            agg.seed_bars(closed)
+            # Mirror live behaviour: close periods the forming 1-minute bar has moved past
+            if self.base.forming is not None:
+                agg.roll(self.base.forming[0])
+        for agg in self.custom.values():
+            agg.seed(times, prices, volumes)
+
+    def bar_count(self, timeframe):
+        tf = self.normalize(timeframe)
+        if tf == self.BASE:
+            return self.base.bar_count()
+        if tf in self.custom:
+            return self.custom[tf].bar_count()
+        if tf not in self.derived:
+            raise ValueError(f"Unknown timeframe '{timeframe}'")
+        return self.derived[tf].bar_count(self.base.forming)
+
+    def arrays(self, timeframe, length=None):
+        """Bar column arrays for `timeframe` (see BarAggregator.arrays)."""
+        tf = self.normalize(timeframe)
+        if tf == self.BASE:
+            return self.base.arrays(length)
+        if tf in self.custom:
+            return self.custom[tf].arrays(length)
+        if tf not in self.derived:
+            raise ValueError(f"Unknown timeframe '{timeframe}'")
+        return self.derived[tf].arrays(length, pending=self.base.forming)
+
+    def to_frame(self, timeframe, length):
+        tf = self.normalize(timeframe)
+        if tf == self.BASE:
+            return self.base.to_frame(length)
+        if tf in self.custom:
+            return self.custom[tf].to_frame(length)
+        if tf not in self.derived:
+            raise ValueError(f"Unknown timeframe '{timeframe}'")
+        return self.derived[tf].to_frame(length, pending=self.base.forming)
+
+    @property
+    def nbytes(self):
+        aggs = [self.base, *self.derived.values(), *self.custom.values()]
+        return sum(agg.history.nbytes for agg in aggs)
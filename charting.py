@@ -1,18 +1,26 @@
-import mplfinance as mpf
-import pandas as pd
+import io
 import os
-import matplotlib
-# Use Agg backend for non-GUI (Docker/Headless) environment
-matplotlib.use('Agg')
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import re
+import numpy as np
+from bar_engine import reduce_bars, bars_to_frame
+from logger import setup_logger
 
-def generate_candlestick_chart(df, symbol, filename="chart.png"):
+logger = setup_logger("Charting")
+
+def _prepare(df):
     """
-    Generates a candlestick chart from the dataframe and saves it to filename.
+    Conform a bar frame to mplfinance expectations, or return None.
     df must have proper DatetimeIndex and columns: Open, High, Low, Close.
     """
     if df is None or df.empty:
         return None
-    
+    import pandas as pd
+
     # Ensure index is datetime
     if not isinstance(df.index, pd.DatetimeIndex):
         try:
@@ -29,32 +37,242 @@ def generate_candlestick_chart(df, symbol, filename="chart.png"):
     # Our df usually has lowercase 'open', 'high', 'low', 'close'
     plot_df = df.copy()
     rename_map = {
-        'open': 'Open', 
-        'high': 'High', 
-        'low': 'Low', 
+        'open': 'Open',
+        'high': 'High',
+        'low': 'Low',
         'close': 'Close',
         'volume': 'Volume'
     }
     plot_df.rename(columns=rename_map, inplace=True)
-    
+
     # Validation
     required = ['Open', 'High', 'Low', 'Close']
     if not all(col in plot_df.columns for col in required):
         return None
+    return plot_df
+
+HORIZON_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+def parse_horizon(text):
+    """'90m', '12h', '1d', '1w' -> seconds, or None."""
+    match = re.fullmatch(r"(\d+)([mhdw])", text.strip().lower())
+    if not match:
+        return None
+    return int(match.group(1)) * HORIZON_UNITS[match.group(2)]
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: indices of `n_out` points (always including
+    the first and last) that best preserve the visual shape of y(x).
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64) - float(x[0]) # Keep epoch-ns products in range
+    y = np.asarray(y, dtype=np.float64)
+    # Interior points 1..n-2 split into n_out-2 buckets; the last point closes the chain
+    edges = np.r_[np.linspace(1, n - 1, n_out - 1).astype(np.int64), n]
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = edges[i + 1], edges[i + 2]
+        cx = x[next_lo:next_hi].mean()
+        cy = y[next_lo:next_hi].mean()
+        # Twice the triangle area (a, candidate, next bucket centroid)
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+def downsample_bars(bars, max_bars, method="ohlc"):
+    """
+    Reduce bar column arrays to at most `max_bars` rows, so render time does
+    not grow with the requested horizon.
+    "ohlc": merge runs of consecutive bars into candles (true high/low kept).
+    "lttb": keep the LTTB-selected bars of the close series (for line charts).
+    """
+    n = len(bars['time'])
+    if n <= max_bars:
+        return bars
+    if method == "lttb":
+        idx = lttb(bars['time'], bars['close'], max_bars)
+        return {name: arr[idx] for name, arr in bars.items()}
+    if method != "ohlc":
+        raise ValueError(f"Unknown downsampling method '{method}'")
+    starts = np.unique(np.linspace(0, n, max_bars, endpoint=False).astype(np.int64))
+    return reduce_bars(starts, bars['time'], bars['open'], bars['high'], bars['low'], bars['close'], bars['volume'])
+
+def downsample_frame(bars, max_bars, method="ohlc"):
+    """downsample_bars() as an OHLCV DataFrame ready for rendering."""
+    return bars_to_frame(downsample_bars(bars, max_bars, method))
+
+_styles = {} # base style name -> mplfinance style, built once per process
+
+def _get_style(mpf, base):
+    style = _styles.get(base)
+    if style is None:
+        style = _styles[base] = mpf.make_mpf_style(base_mpf_style=base, rc={'font.size': 10})
+    return style
+
+def _plot(plot_df, symbol, target, style, kind='candle'):
+    # Imported here so only processes that actually render pay for matplotlib
+    import matplotlib
+    # Use Agg backend for non-GUI (Docker/Headless) environment
+    matplotlib.use('Agg')
+    import mplfinance as mpf
 
-    # Style
-    s = mpf.make_mpf_style(base_mpf_style='charles', rc={'font.size': 10})
-    
-    # Save
-    filepath = os.path.abspath(filename)
     mpf.plot(
-        plot_df, 
-        type='candle', 
-        style=s, 
+        plot_df,
+        type=kind,
+        style=_get_style(mpf, style),
         title=f"{symbol} Chart",
         ylabel='Price',
         volume=False, # Add volume if available
-        savefig=filepath
+        savefig=dict(fname=target, format='png')
     )
-    
+
+def render_candlestick_png(df, symbol, style='charles', kind='candle'):
+    """
+    Render a chart and return the PNG bytes (nothing touches the filesystem), or None.
+    kind: mplfinance plot type, 'candle' or 'line' (e.g. for LTTB-downsampled data).
+    """
+    plot_df = _prepare(df)
+    if plot_df is None:
+        return None
+    buffer = io.BytesIO()
+    _plot(plot_df, symbol, buffer, style, kind)
+    return buffer.getvalue()
+
+def generate_candlestick_chart(df, symbol, filename="chart.png", style='charles'):
+    """
+    Generates a candlestick chart from the dataframe and saves it to filename.
+    Prefer ChartRenderer / render_candlestick_png, which never write to disk.
+    """
+    png = render_candlestick_png(df, symbol, style)
+    if png is None:
+        return None
+
+    # Save
+    filepath = os.path.abspath(filename)
+    with open(filepath, 'wb') as f:
+        f.write(png)
     return filepath
+
+def _warm_up():
+    """Import the plotting stack in a fresh worker so the first real render is fast."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import mplfinance as mpf
+    _get_style(mpf, 'charles')
+    return os.getpid()
+
+
+class ChartRenderer:
+    """
+    Renders charts in a separate process (spawn context, so the worker never
+    inherits the FIX sockets or threads of the bot) and hands back PNG bytes.
+    `submit()` never blocks; the pool is recreated if a worker dies.
+
+    Rendered PNGs are kept in a small LRU cache keyed by (symbol, timeframe,
+    bar count, last bar timestamp, style, kind), and identical requests already in
+    flight share one render.
+    """
+    def __init__(self, workers=1, cache_size=16):
+        self.workers = workers
+        self.pool = None
+        self.lock = threading.Lock()
+        self.cache_size = cache_size
+        self.cache = OrderedDict() # key -> PNG bytes
+        self.inflight = {} # key -> Future
+        self.hits = 0
+        self.misses = 0
+
+    def _get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.pool
+
+    def start(self):
+        """Spawn the worker(s) and preload matplotlib in the background."""
+        self._get_pool().submit(_warm_up)
+        return self
+
+    @staticmethod
+    def cache_key(df, symbol, timeframe, style, kind='candle'):
+        if df is None or df.empty:
+            return None
+        import pandas as pd # Already loaded by whoever built df
+        return (symbol, timeframe, len(df), pd.Timestamp(df.index[-1]).value, style, kind)
+
+    def _submit(self, df, symbol, style, kind='candle'):
+        try:
+            return self._get_pool().submit(render_candlestick_png, df, symbol, style, kind)
+        except BrokenProcessPool:
+            logger.warning("Chart worker died; restarting the render pool.")
+            with self.lock:
+                self.pool = None
+            return self._get_pool().submit(render_candlestick_png, df, symbol, style, kind)
+
+    def submit(self, df, symbol, timeframe=None, style='charles', kind='candle'):
+        """Future resolving to PNG bytes (or None if the frame can't be charted)."""
+        key = self.cache_key(df, symbol, timeframe, style, kind)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                future = Future()
+                future.set_result(self.cache[key])
+                return future
+            if key in self.inflight:
+                self.hits += 1
+                return self.inflight[key]
+            self.misses += 1
+
+        future = self._submit(df, symbol, style, kind)
+        if key is None:
+            return future
+        with self.lock:
+            self.inflight[key] = future
+        future.add_done_callback(lambda f: self._store(key, f))
+        return future
+
+    def _store(self, key, future):
+        with self.lock:
+            self.inflight.pop(key, None)
+            if future.cancelled() or future.exception() is not None or future.result() is None:
+                return
+            self.cache[key] = future.result()
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def render(self, df, symbol, timeframe=None, style='charles', kind='candle', timeout=None, cancel_event=None):
+        """
+        Blocking helper for worker threads: wait for the PNG bytes. Returns None
+        if `cancel_event` is set first; raises TimeoutError after `timeout`.
+        """
+        future = self.submit(df, symbol, timeframe, style, kind)
+        if cancel_event is None:
+            return future.result(timeout)
+        waited = 0.0
+        while True:
+            if cancel_event.is_set():
+                return None # Left running: the result still lands in the cache
+            try:
+                return future.result(0.1)
+            except TimeoutError:
+                waited += 0.1
+                if timeout is not None and waited >= timeout:
+                    raise
+
+    def stop(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,176 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import config
+from logger import setup_logger
+
+logger = setup_logger("Commands")
+
+class CommandContext:
+    """
+    Passed to every command handler: the parsed arguments, a way to reply and
+    a cancellation flag that heavy handlers should check between steps.
+    """
+    def __init__(self, name, args, notifier):
+        self.name = name
+        self.args = args
+        self.notifier = notifier
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def sleep(self, seconds):
+        """Interruptible sleep. Returns True if the command was cancelled meanwhile."""
+        return self.cancel_event.wait(seconds)
+
+    def reply(self, message, **kwargs):
+        if not self.cancelled:
+            self.notifier.notify(message, **kwargs)
+
+    def reply_image(self, image, caption="", **kwargs):
+        if not self.cancelled:
+            self.notifier.notify_image(image, caption, **kwargs)
+
+
+class Command:
+    def __init__(self, name, handler, description="", heavy=False, timeout=None, aliases=()):
+        self.name = name
+        self.handler = handler
+        self.description = description
+        self.heavy = heavy
+        self.timeout = timeout
+        self.aliases = tuple(aliases)
+
+
+class CommandRegistry:
+    """
+    Maps "/command" texts to handlers. Light commands run inline on the
+    listener thread, so they answer immediately; heavy ones run on a small
+    worker pool with a per-command timeout. Timeouts and /cancel set the
+    command's cancel flag; handlers stop at their next check and later
+    replies are suppressed.
+    """
+    def __init__(self, notifier, workers=None):
+        self.notifier = notifier
+        self.commands = {}
+        self.lookup = {} # name or alias -> Command
+        self.executor = ThreadPoolExecutor(max_workers=workers or config.COMMAND_WORKERS, thread_name_prefix="Command")
+        self.lock = threading.Lock()
+        self.running = {} # name -> CommandContext of the in-flight heavy command
+        self.register("cancel", self._cancel, "Cancel a running command (e.g. /cancel sync)")
+
+    def register(self, name, handler, description="", heavy=False, timeout=None, aliases=()):
+        """handler(ctx: CommandContext); `timeout` (seconds) applies to heavy commands."""
+        command = Command(name, handler, description, heavy, timeout, aliases)
+        self.commands[name] = command
+        for key in (name,) + command.aliases:
+            self.lookup[key] = command
+        return command
+
+    def command(self, name, description="", heavy=False, timeout=None, aliases=()):
+        """Decorator form of register()."""
+        def wrap(handler):
+            self.register(name, handler, description, heavy, timeout, aliases)
+            return handler
+        return wrap
+
+    def help_text(self):
+        lines = [f"`/{c.name}` - {c.description}" for c in self.commands.values() if c.description]
+        return "🤖 **AVAILABLE COMMANDS**\n" + "\n".join(lines)
+
+    @staticmethod
+    def parse(text):
+        """'/status@my_bot arg' -> ('status', ['arg'])"""
+        parts = text.strip().split()
+        if not parts or not parts[0].startswith("/"):
+            return None, []
+        return parts[0][1:].split("@")[0], parts[1:]
+
+    def dispatch(self, text):
+        """Run or schedule one command text. Returns the Future for heavy commands, else None."""
+        name, args = self.parse(text)
+        command = self.lookup.get(name)
+        if command is None:
+            self.notifier.notify(f"❓ **UNKNOWN COMMAND**\nI didn't understand `{text}`.\nTry `/help`.")
+            return None
+
+        ctx = CommandContext(command.name, args, self.notifier)
+        if not command.heavy:
+            self._run(command, ctx)
+            return None
+
+        with self.lock:
+            current = self.running.get(command.name)
+            if current is not None:
+                if current.cancelled:
+                    self.notifier.notify(f"⏳ `/{command.name}` is still stopping. Try again in a moment.")
+                else:
+                    self.notifier.notify(f"⏳ `/{command.name}` is already running. Use `/cancel {command.name}` to stop it.")
+                return None
+            self.running[command.name] = ctx
+
+        if command.timeout:
+            timer = threading.Timer(command.timeout, self._expire, args=(command, ctx))
+            timer.daemon = True
+            timer.start()
+        return self.executor.submit(self._run_heavy, command, ctx)
+
+    def _run(self, command, ctx):
+        t0 = time.perf_counter()
+        try:
+            command.handler(ctx)
+        except Exception as e:
+            logger.error(f"/{command.name} failed: {e}")
+            ctx.reply(f"❌ Error processing command: {e}")
+        finally:
+            logger.info(f"/{command.name} finished in {time.perf_counter() - t0:.2f}s")
+
+    def _run_heavy(self, command, ctx):
+        try:
+            self._run(command, ctx)
+        finally:
+            with self.lock:
+                if self.running.get(command.name) is ctx:
+                    del self.running[command.name]
+
+    def _expire(self, command, ctx):
+        # The entry stays in `running` (cancelling) until the worker returns,
+        # so the same command can't pile up on the pool behind a stuck one
+        with self.lock:
+            if self.running.get(command.name) is not ctx or ctx.cancelled:
+                return # Already finished or cancelled
+            ctx.cancel_event.set()
+        logger.warning(f"/{command.name} timed out after {command.timeout}s")
+        self.notifier.notify(f"⌛ `/{command.name}` timed out after {command.timeout}s and was cancelled.")
+
+    def cancel(self, name):
+        """Cancel a running heavy command. Returns True if one was running (and not already cancelled)."""
+        with self.lock:
+            ctx = self.running.get(name)
+            if ctx is None or ctx.cancelled:
+                return False
+            ctx.cancel_event.set() # Removed from `running` when its worker returns
+        return True
+
+    def _cancel(self, ctx):
+        with self.lock:
+            names = ctx.args or [name for name, running in self.running.items() if not running.cancelled]
+        if not names:
+            ctx.reply("Nothing to cancel.")
+            return
+        for name in names:
+            name = name.lstrip("/")
+            if self.cancel(name):
+                ctx.reply(f"🛑 `/{name}` cancelled.")
+            else:
+                ctx.reply(f"`/{name}` is not running.")
+
+    def shutdown(self):
+        with self.lock:
+            contexts = list(self.running.values())
+            self.running.clear()
+        for ctx in contexts:
+            ctx.cancel_event.set()
+        self.executor.shutdown(wait=False)
@@ -22,9 +22,36 @@ LLM_API_URL = os.getenv("LLM_API_URL", "http://localhost:8000/v1")
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "facebook/opt-125m")
 LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "4096"))
 
+# HTTP (Telegram / LLM): keep-alive connection pools
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "4")) # Hosts cached per session
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "4")) # Connections kept per host
+# Per-endpoint timeout overrides in seconds, e.g. HTTP_TIMEOUTS="sendPhoto=30,chat/completions=120"
+HTTP_TIMEOUTS = {}
+for _item in os.getenv("HTTP_TIMEOUTS", "").split(","):
+    if "=" in _item:
+        _endpoint, _seconds = (part.strip() for part in _item.split("=", 1))
+        HTTP_TIMEOUTS[_endpoint] = float(_seconds)
+
 # Notification Configuration
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+# Commands: "longpoll" (getUpdates held open for TELEGRAM_POLL_TIMEOUT seconds) or
+# "webhook" (local receiver, usually behind a TLS reverse proxy at TELEGRAM_WEBHOOK_URL)
+TELEGRAM_MODE = os.getenv("TELEGRAM_MODE", "longpoll")
+TELEGRAM_POLL_TIMEOUT = int(os.getenv("TELEGRAM_POLL_TIMEOUT", "25"))
+TELEGRAM_OFFSET_FILE = os.getenv("TELEGRAM_OFFSET_FILE", "data/telegram_offset") # Last handled update_id
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL") # Public URL registered with setWebhook (optional)
+TELEGRAM_WEBHOOK_HOST = os.getenv("TELEGRAM_WEBHOOK_HOST", "127.0.0.1")
+TELEGRAM_WEBHOOK_PORT = int(os.getenv("TELEGRAM_WEBHOOK_PORT", "8443"))
+TELEGRAM_WEBHOOK_PATH = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET")
+# Worker threads for heavy Telegram commands (/sync, /chart, /symbol)
+COMMAND_WORKERS = int(os.getenv("COMMAND_WORKERS", "2"))
+# Outbound notifications are queued per provider and sent by a worker thread
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "100"))
+NOTIFY_OVERFLOW = os.getenv("NOTIFY_OVERFLOW", "drop_oldest") # or "drop_newest"
+NOTIFY_COALESCE = os.getenv("NOTIFY_COALESCE", "true").lower() == "true" # Merge identical queued messages
+NOTIFY_DIGEST_WINDOW = float(os.getenv("NOTIFY_DIGEST_WINDOW", "5")) # Seconds; low-priority bursts are sent as one digest
 
 # Trading Parameters
 # Trading Parameters
@@ -51,8 +78,48 @@ RISK_REWARD_RATIO = 2.0
 STOP_LOSS_PCT = 0.005
 TAKE_PROFIT_PCT = 0.01
 
+# Market Data Storage
+# Number of ticks retained in memory per symbol (fixed-size ring buffer)
+TICK_RETENTION = int(os.getenv("TICK_RETENTION", "200000"))
+# Number of completed bars retained in memory per symbol
+BAR_RETENTION = int(os.getenv("BAR_RETENTION", "5000"))
+
+# On-disk tick archive (per-symbol, per-day columnar files)
+TICK_ARCHIVE_ENABLED = os.getenv("TICK_ARCHIVE_ENABLED", "true").lower() == "true"
+TICK_ARCHIVE_DIR = os.getenv("TICK_ARCHIVE_DIR", "data/ticks")
+# 1-minute bars restored from the archive at startup / symbol switch
+WARM_START_BARS = int(os.getenv("WARM_START_BARS", str(BAR_RETENTION)))
+
+# Bar type per symbol (ID or name): 1m, 5m, 15m, 1h, session, or activity bars tick:N, volume:N, range:X
+# e.g. BAR_TYPES="XAUUSD=range:0.50,1=tick:100"
+BAR_TYPES = {}
+for _item in os.getenv("BAR_TYPES", "").split(","):
+    if "=" in _item:
+        _sym, _spec = (part.strip() for part in _item.split("=", 1))
+        BAR_TYPES[SYMBOLS.get(_sym.upper(), _sym)] = _spec
+
+# Strategy trigger: "bar_updated" (every tick that moves the forming bar) or
+# "bar_closed" (only when a bar of the symbol's bar type closes)
+STRATEGY_TRIGGER = os.getenv("STRATEGY_TRIGGER", "bar_updated")
+
+# Market depth requested per symbol: 0 = full L2 book (kept from incremental refreshes),
+# 1 = top of book only
+MARKET_DEPTH = int(os.getenv("MARKET_DEPTH", "0"))
+BOOK_DEPTH_LEVELS = int(os.getenv("BOOK_DEPTH_LEVELS", "5")) # Levels summed for depth / imbalance
+# If > 0, skip signals the book imbalance leans against by at least this much (0..1)
+BOOK_IMBALANCE_MIN = float(os.getenv("BOOK_IMBALANCE_MIN", "0"))
+
+# Indicators: "numpy" (built-in kernels) or "pandas_ta" (optional, for cross-checking)
+INDICATOR_BACKEND = os.getenv("INDICATOR_BACKEND", "numpy")
+
 # Charting Configuration
 CHART_INTERVAL = int(os.getenv("CHART_INTERVAL", "7200")) # Default 2 hours
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "1")) # Rendering processes
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "16")) # Rendered PNGs kept (LRU)
+# Long-horizon charts (/chart 1d, /chart 1w) are downsampled to at most CHART_MAX_BARS points:
+# "ohlc" re-aggregates into wider candles, "lttb" keeps shape-preserving points for a line chart
+CHART_MAX_BARS = int(os.getenv("CHART_MAX_BARS", "300"))
+CHART_DOWNSAMPLE = os.getenv("CHART_DOWNSAMPLE", "ohlc")
 
 # Risk Management
 MAX_OPEN_POSITIONS = int(os.getenv("MAX_OPEN_POSITIONS", "1"))
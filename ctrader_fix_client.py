@@ -4,12 +4,23 @@ import time
 import simplefix
 import config
 import threading
+import numpy as np
+from collections import deque
+from functools import partial
+from fix_scanner import FrameError, MARKET_DATA_TYPES, frame_message, resync, scan_market_data, market_data_entries
+from order_book import TopOfBook, LatestPrices, OrderBook
+from fix_encoder import FixClock, NewOrderEncoder
 from datetime import datetime
 from logger import setup_logger
+from notification import CRITICAL, INFO
 
 logger = setup_logger("FixClient")
 
 class FixSession:
+    RECV_BUFFER_SIZE = 65536
+    LATENCY_SAMPLES = 1000 # Recent enqueue-to-wire times kept for send_latency()
+    STOP_DRAIN_TIMEOUT = 2.0 # Seconds stop() lets the writer flush what is still queued
+
     def __init__(self, host, port, sender_comp_id, target_comp_id, password, sender_sub_id, app):
         self.host = host
         self.port = port
@@ -21,17 +32,67 @@ class FixSession:
         
         self.sock = None
         self.parser = simplefix.FixParser()
+        # Reusable receive buffer: quotes are scanned in place, only other
+        # message types are copied out for simplefix
+        self.buffer = bytearray(self.RECV_BUFFER_SIZE)
+        self.filled = 0
         self.connected = False
-        self.logged_on = False
+        # Signalled on Logon, Logout and disconnect, so callers wait instead of polling
+        self.state_changed = threading.Condition()
+        self._logged_on = False
         self.msg_seq_num = 1
         self.running = False
+        # SendingTime formatting and the pre-encoded NewOrderSingle template
+        self.clock = FixClock()
+        self.order_encoder = NewOrderEncoder(sender_comp_id, target_comp_id, sender_sub_id, clock=self.clock)
+        # Outbound queue drained by one writer thread, which assigns MsgSeqNum
+        # and SendingTime, so sequence numbers always follow wire order
+        self.outbound = deque() # (message, perf_counter when queued)
+        self.outbound_ready = threading.Condition()
+        self.in_flight = 0 # Messages the writer has taken off the queue but not written yet
+        self.writer = None # Thread running write_loop for the current socket
+        self.send_stats = {'sent': 0, 'batches': 0, 'max_batch': 0, 'errors': 0}
+        self.send_latencies = deque(maxlen=self.LATENCY_SAMPLES) # Seconds from _send_raw to sendall returning
         
         self.lock = threading.RLock()
 
-    def stop(self):
-        """Force stop the session."""
-        self.running = False
+    @property
+    def logged_on(self):
+        return self._logged_on
+
+    @logged_on.setter
+    def logged_on(self, value):
+        with self.state_changed:
+            self._logged_on = value
+            self.state_changed.notify_all()
+
+    def wait_for_logon(self, timeout=None):
+        """Block until Logon (True), or until the session stops or `timeout` passes (False)."""
+        with self.state_changed:
+            self.state_changed.wait_for(lambda: self._logged_on or not (self.running and self.connected), timeout)
+            return self._logged_on
+
+    def stop(self, drain_timeout=None):
+        """
+        Force stop the session. The writer first gets up to `drain_timeout`
+        seconds (default STOP_DRAIN_TIMEOUT) to put what is still queued on
+        the wire, e.g. closing orders sent right before; anything left after
+        that is dropped with a warning.
+        """
+        if drain_timeout is None:
+            drain_timeout = self.STOP_DRAIN_TIMEOUT
+        writer = self.writer
+        with self.outbound_ready:
+            if writer is not None and writer.is_alive() and writer is not threading.current_thread():
+                self.outbound_ready.wait_for(lambda: not (self.outbound or self.in_flight), drain_timeout)
+            unsent = len(self.outbound) + self.in_flight
+            self.running = False
+            self.outbound.clear()
+            self.outbound_ready.notify_all()
+        if unsent:
+            logger.warning(f"[{self.sender_sub_id}] Stopped with {unsent} outbound message(s) not sent")
         self.connected = False
+        self.logged_on = False
         if self.sock:
             try:
                 self.sock.shutdown(socket.SHUT_RDWR)
@@ -42,10 +103,13 @@ class FixSession:
 
 
     def connect(self):
+        if self.sock is not None:
+            self.stop() # Retire the previous socket's reader and writer first
         try:
             logger.info(f"Connecting to {self.host}:{self.port}...")
             raw_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             raw_sock.settimeout(10.0) 
+            raw_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) # Orders must not wait for Nagle
             
             # Use a more permissive SSL context for compatibility with OpenSSL 3.0+ and legacy servers
             # Use a more permissive SSL context
@@ -73,6 +137,7 @@ class FixSession:
             
             # Start reader thread
             threading.Thread(target=self.read_loop, daemon=True).start()
+            threading.Thread(target=self.write_loop, args=(self.sock,), name=f"Writer-{self.sender_sub_id}", daemon=True).start()
             
             # Send Logon
             self.send_logon()
@@ -82,26 +147,85 @@ class FixSession:
             self.connected = False
 
     def _add_header(self, msg, msg_type):
-        with self.lock:
-            msg.append_pair(8, "FIX.4.4")
-            msg.append_pair(35, msg_type)
-            msg.append_pair(49, self.sender_comp_id)
-            msg.append_pair(56, self.target_comp_id)
-            msg.append_pair(50, self.sender_sub_id)
-            msg.append_pair(57, self.sender_sub_id)
-            msg.append_pair(34, self.msg_seq_num)
-            
-            self.msg_seq_num += 1
-            
-            msg.append_pair(52, datetime.utcnow().strftime("%Y%m%d-%H:%M:%S.%f")[:-3])
+        # MsgSeqNum (34) and SendingTime (52) are added by the writer thread
+        msg.append_pair(8, "FIX.4.4", header=True)
+        msg.append_pair(35, msg_type, header=True)
+        msg.append_pair(49, self.sender_comp_id, header=True)
+        msg.append_pair(56, self.target_comp_id, header=True)
+        msg.append_pair(50, self.sender_sub_id, header=True)
+        msg.append_pair(57, self.sender_sub_id, header=True)
 
     def _send_raw(self, msg):
-        raw = msg.encode()
-        if self.sock:
+        """Queue a FixMessage (header from _add_header) or a callable seq -> wire bytes for the writer."""
+        if not self.sock:
+            return
+        with self.outbound_ready:
+            self.outbound.append((msg, time.perf_counter()))
+            # All waiters: a writer of a replaced socket may be waiting too, and it only exits on wakeup
+            self.outbound_ready.notify_all()
+
+    def _encode(self, msg, seq):
+        if callable(msg):
+            return msg(seq)
+        msg.append_pair(34, seq, header=True)
+        msg.append_pair(52, self.clock.now()[0], header=True)
+        return msg.encode()
+
+    def write_loop(self, sock):
+        """
+        Writer for `sock`: takes everything queued, numbers and encodes it in
+        queue order and writes it with one sendall. Exits when the session
+        stops or reconnects on a new socket.
+        """
+        self.writer = threading.current_thread()
+        batch = None
+        while True:
+            with self.outbound_ready:
+                if batch:
+                    self.in_flight = 0
+                    self.outbound_ready.notify_all() # stop() may be waiting for the queue to drain
+                self.outbound_ready.wait_for(lambda: self.outbound or not self.running or self.sock is not sock)
+                if not self.running or self.sock is not sock:
+                    return
+                batch = list(self.outbound)
+                self.outbound.clear()
+                self.in_flight = len(batch)
+
+            data = []
+            with self.lock:
+                for msg, _ in batch:
+                    try:
+                        data.append(self._encode(msg, self.msg_seq_num))
+                    except Exception as e:
+                        logger.error(f"[{self.sender_sub_id}] Encode Error: {e}")
+                        continue
+                    self.msg_seq_num += 1
             try:
-                self.sock.sendall(raw)
+                sock.sendall(b"".join(data))
             except Exception as e:
+                self.send_stats['errors'] += 1
                 logger.error(f"[{self.sender_sub_id}] Send Error: {e}")
+                continue
+
+            now = time.perf_counter()
+            self.send_latencies.extend(now - queued for _, queued in batch)
+            self.send_stats['sent'] += len(data)
+            self.send_stats['batches'] += 1
+            self.send_stats['max_batch'] = max(self.send_stats['max_batch'], len(batch))
+
+    def send_latency(self):
+        """
+        Writer stats plus enqueue-to-wire latency (ms) over the last
+        LATENCY_SAMPLES messages: mean, p50, p99 and max (None before any send).
+        """
+        samples = sorted(self.send_latencies)
+        stats = dict(self.send_stats)
+        stats['queued'] = len(self.outbound)
+        for key, q in (('p50_ms', 0.50), ('p99_ms', 0.99)):
+            stats[key] = 1000 * samples[min(int(q * len(samples)), len(samples) - 1)] if samples else None
+        stats['mean_ms'] = 1000 * sum(samples) / len(samples) if samples else None
+        stats['max_ms'] = 1000 * samples[-1] if samples else None
+        return stats
 
     def send_logon(self):
         msg = simplefix.FixMessage()
@@ -133,6 +257,11 @@ class FixSession:
         
         self._send_raw(msg)
 
+    def send_new_order(self, cl_ord_id, symbol_id, side, qty, order_type, price=None, stop_px=None, position_id=None):
+        """NewOrderSingle (D) from the pre-encoded template; same bytes as _add_header + append_pair."""
+        self._send_raw(partial(self.order_encoder.encode, cl_ord_id=cl_ord_id, symbol=symbol_id, side=side, qty=qty,
+                               order_type=order_type, price=price, stop_px=stop_px, position_id=position_id))
+
     def send_heartbeat(self):
         msg = simplefix.FixMessage()
         self._add_header(msg, "0")
@@ -146,30 +275,18 @@ class FixSession:
         pass
 
     def read_loop(self):
+        self.filled = 0
         while self.running and self.sock:
             try:
-                data = self.sock.recv(4096)
-                if not data:
+                if self.filled == len(self.buffer):
+                    # A single message larger than the buffer: grow it
+                    self.buffer = self.buffer + bytearray(len(self.buffer))
+                with memoryview(self.buffer) as view:
+                    n = self.sock.recv_into(view[self.filled:])
+                if not n:
                     break
-                self.parser.append_buffer(data)
-                
-                while True:
-                    msg = self.parser.get_message()
-                    if msg is None:
-                        break
-                    
-                    try:
-                         # self.handle_message(msg) -> self.app.on_message? 
-                         # The viewed code has 'self.handle_message(msg)' at line 147.
-                         # But wait, line 147 in viewed code says 'self.handle_message(msg)'.
-                         # Does FixSession have handle_message? No, it's not defined in the snippet.
-                         # It should likely be self.app.on_message(self.sender_sub_id, msg).
-                         # I will use self.handle_message(msg) if that is what was there, but wrap it.
-                         self.handle_message(msg)
-                    except Exception as e:
-                        logger.error(f"[{self.sender_sub_id}] Error in handle_message: {e}")
-                        import traceback
-                        logger.error(traceback.format_exc())
+                self.filled += n
+                self.process_buffer()
 
             except socket.timeout:
                 continue # Just loop
@@ -190,6 +307,42 @@ class FixSession:
         self.connected = False
         self.logged_on = False
 
+    def process_buffer(self):
+        """Dispatch every complete message in the receive buffer, keeping any partial tail."""
+        buf = self.buffer
+        pos = 0
+        while pos < self.filled:
+            try:
+                frame = frame_message(buf, pos, self.filled)
+            except FrameError as e:
+                logger.warning(f"[{self.sender_sub_id}] {e}; skipping to next message")
+                pos = resync(buf, pos, self.filled)
+                continue
+            if frame is None:
+                break
+            msg_type, body_start, body_end, end = frame
+
+            try:
+                if msg_type in MARKET_DATA_TYPES:
+                    # Fast path: pull the quote fields straight out of the buffer
+                    self.app.on_market_data(self.sender_sub_id, msg_type, scan_market_data(buf, body_start, body_end))
+                else:
+                    self.parser.append_buffer(bytes(buf[pos:end]))
+                    msg = self.parser.get_message()
+                    if msg is not None:
+                        self.handle_message(msg)
+            except Exception as e:
+                logger.error(f"[{self.sender_sub_id}] Error in handle_message: {e}")
+                import traceback
+                logger.error(traceback.format_exc())
+            pos = end
+
+        if pos:
+            # Move the partial message (if any) to the front
+            rest = self.filled - pos
+            buf[:rest] = buf[pos:self.filled]
+            self.filled = rest
+
     def handle_message(self, msg):
         msg_type = msg.get(35)
         # print(f"[{self.sender_sub_id}] Recv: {msg_type}")
@@ -209,6 +362,10 @@ class FixSession:
         # Pass to main app logic
         self.app.on_message(self.sender_sub_id, msg)
 
+        on_logon = getattr(self.app, 'on_logon', None) # Optional: e.g. fetch_symbols' app has none
+        if msg_type == b'A' and on_logon is not None:
+            on_logon(self.sender_sub_id)
+
 
 class CTraderFixClient:
     # Fallback map for common symbols (Demo/Live IDs are usually consistent for majors)
@@ -231,8 +388,12 @@ class CTraderFixClient:
             config.CT_PASSWORD, "TRADE", self
         )
         self.market_data_callbacks = []
-        self.latest_prices = {} # Store latest price by SymbolID
-        self.last_price_times = {} # Store last update time
+        self.logon_callbacks = [] # cb(session_type) on every QUOTE / TRADE Logon (reader thread)
+        self.top_of_book = TopOfBook() # Bid / ask / sizes / update time by SymbolID
+        self.latest_prices = LatestPrices(self.top_of_book) # SymbolID -> mid (dict interface)
+        self.market_depth = config.MARKET_DEPTH # 0 = full L2 book, 1 = top of book
+        self.order_books = {} # SymbolID -> OrderBook (MarketDepth=0)
+        self.book_lock = threading.Lock() # Books are written by the QUOTE reader thread
         self.symbol_map = {}
         # Tracking State (In-Memory)
         self.open_orders = {} # OrderID -> {Symbol, Side, Qty, Price}
@@ -377,7 +538,7 @@ class CTraderFixClient:
 
         logger.info(f"Closing all positions: {self.positions}")
         if self.notifier:
-            self.notifier.notify(f"🛑 **MARKET CLOSE**\nClosing all {len(self.positions)} positions.")
+            self.notifier.notify(f"🛑 **MARKET CLOSE**\nClosing all {len(self.positions)} positions.", priority=CRITICAL)
 
         # Iterate copy of keys
         for symbol_id, pos_data in list(self.positions.items()):
@@ -512,19 +673,30 @@ class CTraderFixClient:
             
         return "\n".join(lines)
         
-    def handle_market_data(self, symbol_id, price):
-        # Ensure symbol_id is string
-        if isinstance(symbol_id, bytes):
-            symbol_id = symbol_id.decode()
-
-        self.latest_prices[str(symbol_id)] = price
-        if hasattr(self, 'last_price_times'):
-             self.last_price_times[symbol_id] = datetime.now()
+    def handle_market_data(self, symbol_id, timestamp):
+        """Publish the symbol's current top of book to the market data callbacks."""
+        values = self.top_of_book.values[self.top_of_book.rows[symbol_id]]
+        price, bid, ask = float(values[TopOfBook.PRICE]), float(values[TopOfBook.BID]), float(values[TopOfBook.ASK])
+        bid = bid if bid == bid else None # NaN: side not quoted yet
+        ask = ask if ask == ask else None
              
         for cb in self.market_data_callbacks:
-            cb(symbol_id, price)
+            cb(symbol_id, price, bid=bid, ask=ask, timestamp=timestamp)
         
+    def on_logon(self, source):
+        for cb in self.logon_callbacks:
+            try:
+                cb(source)
+            except Exception as e:
+                logger.error(f"Logon callback failed for {source}: {e}")
+
     def start(self):
+        """
+        Connect QUOTE and TRADE concurrently and return once both have logged
+        on or given up. Work that needs a session should hang off
+        `logon_callbacks` (fires the moment that session logs on) rather
+        than wait for start() to return.
+        """
         logger.info("Connecting to cTrader FIX...")
         
         # Helper retry function
@@ -534,26 +706,29 @@ class CTraderFixClient:
                     logger.info(f"Connecting to {name} (Attempt {i+1}/5)...")
                     session.connect()
                     
-                    # Wait for Logon
-                    for _ in range(20): 
-                        if session.logged_on: return True
-                        if not session.running: return False # Check if stopped
-                        time.sleep(0.5)
+                    # Wait for Logon (returns early on Logout / disconnect)
+                    if session.wait_for_logon(10):
+                        return True
+                    if not session.running: return False # Check if stopped
                         
                 except Exception as e:
                     logger.error(f"{name} connect error: {e}")
                 
                 logger.warning(f"{name} failed to connect (or Logon). Retrying...")
+                session.stop() # Close this attempt's socket (and its reader / writer) before the next one
                 time.sleep(2)
             return False
 
-        # Connect Quote
-        if not connect_session(self.quote_session, "QUOTE"):
-             logger.error("Failed to connect QUOTE session.")
+        def connect(session, name):
+            if not connect_session(session, name):
+                logger.error(f"Failed to connect {name} session.")
 
-        # Connect Trade
-        if not connect_session(self.trade_session, "TRADE"):
-             logger.error("Failed to connect TRADE session.")
+        threads = [threading.Thread(target=connect, args=(session, name), name=f"Connect-{name}", daemon=True)
+                   for session, name in ((self.quote_session, "QUOTE"), (self.trade_session, "TRADE"))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
         
         # Final Status Check
         if self.quote_session.connected and self.trade_session.connected:
@@ -563,30 +738,89 @@ class CTraderFixClient:
         elif self.quote_session.connected:
              msg = "[WARN] PARTIAL CONNECTION: Connected to QUOTE Only. Trade session failed."
              logger.warning(msg)
-             if self.notifier: self.notifier.notify("⚠️ **PARTIAL CONNECTION**\nConnected to QUOTE Only. Trade session failed.")
+             if self.notifier: self.notifier.notify("⚠️ **PARTIAL CONNECTION**\nConnected to QUOTE Only. Trade session failed.", priority=CRITICAL)
         elif self.trade_session.connected:
              msg = "[WARN] PARTIAL CONNECTION: Connected to TRADE Only. Quote session failed."
              logger.warning(msg)
-             if self.notifier: self.notifier.notify("⚠️ **PARTIAL CONNECTION**\nConnected to TRADE Only. Quote session failed.")
+             if self.notifier: self.notifier.notify("⚠️ **PARTIAL CONNECTION**\nConnected to TRADE Only. Quote session failed.", priority=CRITICAL)
         else:
             msg = "[ERROR] CONNECTION FAILED: Could not connect to cTrader."
             logger.error(msg)
-            if self.notifier: self.notifier.notify("❌ **CONNECTION FAILED**\nCould not connect to cTrader.")
+            if self.notifier: self.notifier.notify("❌ **CONNECTION FAILED**\nCould not connect to cTrader.", priority=CRITICAL)
 
     def on_disconnected(self, session_type, reason="Unknown"):
         msg = f"[FAILED] **DISCONNECTED**\nSession: {session_type}\nReason: {reason}"
         logger.warning(msg)
         if self.notifier:
-            self.notifier.notify(msg)
+            self.notifier.notify(msg, priority=CRITICAL)
+
+    def on_market_data(self, source, msg_type, entries):
+        """
+        Apply decoded W/X entries [(symbol, type, price, size, action, entry_id), ...]
+        to the L2 books (full depth, entries carry MDEntryIDs) or directly to
+        the top of book, then publish each symbol whose bid / ask / price
+        changed once. Book updates away from the best levels publish nothing.
+        """
+        ts = time.time_ns()
+        before = {} # symbol -> its (bid, ask, price) before this message
+        with self.book_lock:
+            for symbol_id, entry_type, price, size, action, entry_id in entries:
+                if symbol_id is None:
+                    continue
+                depth = entry_id is not None and self.market_depth != 1
+                if not depth and price is None:
+                    continue # e.g. a top-of-book delete, which carries no price
+                if symbol_id not in before:
+                    before[symbol_id] = self.top_of_book.top(symbol_id)
+                    if depth and msg_type == b'W' and symbol_id in self.order_books:
+                        self.order_books[symbol_id].clear() # A snapshot replaces the whole book
+                if depth:
+                    book = self.order_books.get(symbol_id)
+                    if book is None:
+                        book = self.order_books[symbol_id] = OrderBook()
+                    book.apply(action, entry_type, entry_id, price, size)
+                else:
+                    self.top_of_book.update(symbol_id, entry_type, price, size, ts)
+
+            changed = []
+            for symbol_id, old in before.items():
+                book = self.order_books.get(symbol_id)
+                if book is not None:
+                    bid, ask = book.best_bid() or (None, None), book.best_ask() or (None, None)
+                    self.top_of_book.set_quote(symbol_id, bid[0], bid[1], ask[0], ask[1], ts)
+                if old is None or not np.array_equal(old, self.top_of_book.top(symbol_id), equal_nan=True):
+                    changed.append(symbol_id)
+        for symbol_id in changed:
+            if symbol_id in self.latest_prices:
+                self.handle_market_data(symbol_id, ts)
+
+    def get_book_stats(self, symbol_id, levels=None):
+        """
+        Liquidity summary from the symbol's L2 book: best bid/ask, spread, size
+        of the best `levels` levels per side and their imbalance, or None.
+        """
+        levels = levels or config.BOOK_DEPTH_LEVELS
+        with self.book_lock:
+            book = self.order_books.get(str(symbol_id))
+            if book is None:
+                return None
+            return {
+                'best_bid': book.best_bid(),
+                'best_ask': book.best_ask(),
+                'spread': book.spread(),
+                'levels': levels,
+                'bid_depth': book.bids.depth(levels),
+                'ask_depth': book.asks.depth(levels),
+                'bid_levels': len(book.bids),
+                'ask_levels': len(book.asks),
+                'imbalance': book.imbalance(levels),
+            }
 
     def on_message(self, source, msg):
         msg_type = msg.get(35)
         
         if msg_type == b'W' or msg_type == b'X': # Market Data Snapshot / Incremental
-             symbol_id = msg.get(55)
-             price = msg.get(270) # MDEntryPx
-             if price:
-                 self.handle_market_data(symbol_id, float(price))
+             self.on_market_data(source, msg_type, market_data_entries(msg))
                  
         elif msg_type == b'3': # Reject
             logger.warning(f"[{source}] REJECT: {msg.get(58)}")
@@ -605,7 +839,7 @@ class CTraderFixClient:
             else:
                  logger.error(f"[{source}] BUSINESS REJECT: Type={ref_msg_type}, Reason={reason}, Text={text}")
                  if self.notifier:
-                     self.notifier.notify(f"🚫 **BUSINESS REJECT**\nReason: {text}")
+                     self.notifier.notify(f"🚫 **BUSINESS REJECT**\nReason: {text}", priority=CRITICAL)
 
         elif msg_type == b'y': # Security List
              # cTrader sends 55=ID, 107=Description (Name)
@@ -638,7 +872,7 @@ class CTraderFixClient:
                     "ord_type": msg.get(40).decode() if msg.get(40) else '1',
                     "cl_ord_id": cl_ord_id # STORE CLORDID
                 }
-                if self.notifier: self.notifier.notify(f"✅ **ORDER ACCEPTED**\n{side_str} {symbol} {qty}")
+                if self.notifier: self.notifier.notify(f"✅ **ORDER ACCEPTED**\n{side_str} {symbol} {qty}", priority=INFO)
             
             elif exec_type == b'F': # Trade (Partial or Full Fill)
                 pos_id = msg.get(721).decode() if msg.get(721) else None # PositionID
@@ -777,7 +1011,7 @@ class CTraderFixClient:
                 # Rich text notification
                 if self.notifier: 
                     notify_msg = f"{title}\n{side_str} {symbol}\nQty: {fill_qty} @ {fill_px}{pnl_str}"
-                    self.notifier.notify(notify_msg)
+                    self.notifier.notify(notify_msg, priority=CRITICAL)
                 
                 # --- OCO Logic: Cancel Sibling Orders ---
                 if is_protection_fill and pos_id:
@@ -895,13 +1129,13 @@ class CTraderFixClient:
                 # Rich text notification
                 if self.notifier: 
                     notify_msg = f"🚫 **ORDER REJECTED**\n{side_str} {symbol}\nReason: {text}"
-                    self.notifier.notify(notify_msg)
+                    self.notifier.notify(notify_msg, priority=CRITICAL)
                 
             elif exec_type == b'4': # Canceled
                 if order_id in self.open_orders:
                     del self.open_orders[order_id]
                     logger.info(f"Order {order_id} Canceled.")
-                    if self.notifier: self.notifier.notify(f"🗑️ **ORDER CANCELED**\n{side_str} {symbol} {qty}")
+                    if self.notifier: self.notifier.notify(f"🗑️ **ORDER CANCELED**\n{side_str} {symbol} {qty}", priority=INFO)
             
             elif exec_type == b'I': # Order Status (Response to Mass Status)
                 # If active, add to tracking
@@ -1176,7 +1410,7 @@ class CTraderFixClient:
         
         msg.append_pair(262, request_id) # MDReqID
         msg.append_pair(263, "1") # SubscriptionRequestType
-        msg.append_pair(264, "1") # MarketDepth
+        msg.append_pair(264, str(self.market_depth)) # MarketDepth: 0 = full book, 1 = top of book
         msg.append_pair(265, "1") # UpdateType
         
         msg.append_pair(267, "2") # NoMDEntryTypes
@@ -1196,26 +1430,9 @@ class CTraderFixClient:
             self.order_counter += 1
             counter = self.order_counter
             
-        msg = simplefix.FixMessage()
-        self.trade_session._add_header(msg, "D")
-        
         # Unique ClOrdID: Time + Counter to prevent collisions in rapid fire (SL/TP)
         cls_ord_id = f"ord{int(time.time() * 1000)}_{counter}"
-        msg.append_pair(11, cls_ord_id) 
-        msg.append_pair(55, symbol_id)
-        msg.append_pair(54, side) 
-        msg.append_pair(60, datetime.utcnow().strftime("%Y%m%d-%H:%M:%S.%f")[:-3])
-        msg.append_pair(38, qty)
-        msg.append_pair(40, order_type)
-        msg.append_pair(59, "1") # GTC usually okay, or 0 (Day)
-        
-        if price:
-            msg.append_pair(44, price) # Price (for Limit)
-        if stop_px:
-            msg.append_pair(99, stop_px) # StopPx (for Stop)
-        
         if position_id:
-            msg.append_pair(721, position_id) # PositionID for closing specific position in Hedging
             logger.info(f"Attaching PositionID {position_id} to order.")
 
         # If SL/TP are provided for a New Order (order_type '1'), cache them for post-fill linking.
@@ -1229,8 +1446,10 @@ class CTraderFixClient:
                 'side': side
             }
             logger.info(f"Cached pending protections for {cls_ord_id}")
-            
-        self.trade_session._send_raw(msg)
+
+        # TimeInForce 1 (GTC); 44 Price (Limit), 99 StopPx (Stop), 721 PositionID (close a specific position in Hedging)
+        self.trade_session.send_new_order(cls_ord_id, symbol_id, side, qty, order_type,
+                                          price or None, stop_px or None, position_id or None)
     def cancel_order(self, order_id):
         """Cancel an existing order by OrderID."""
         if order_id not in self.open_orders:
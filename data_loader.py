@@ -1,68 +1,219 @@
-import pandas as pd
+import numpy as np
 import threading
+import time
 from datetime import datetime
+import config
+from tick_store import TickStore
+from bar_engine import BarEngine, NS_PER_SEC
+from logger import setup_logger
+
+logger = setup_logger("DataLoader")
+
+def to_epoch_ns(timestamp):
+    """Normalize datetime / pd.Timestamp / epoch-ns int to epoch nanoseconds."""
+    if timestamp is None:
+        return time.time_ns()
+    if isinstance(timestamp, (int, np.integer)):
+        return int(timestamp)
+    import pandas as pd # Only datetime inputs need it
+    return pd.Timestamp(timestamp).value
+
+class DirtySymbols:
+    """
+    Symbols with new market data since the consumer last looked. Marked from
+    event handlers on the FIX reader thread; `wait()` blocks until something
+    is marked (or the timeout passes) and hands back the coalesced set.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.symbols = set()
+        self.event = threading.Event()
+
+    def mark(self, symbol_id, *_):
+        with self.lock:
+            self.symbols.add(symbol_id)
+        self.event.set()
+
+    def wait(self, timeout=None):
+        self.event.wait(timeout)
+        with self.lock:
+            self.event.clear()
+            symbols, self.symbols = self.symbols, set()
+        return symbols
+
 
 class DataLoader:
-    def __init__(self, client):
+    # Published events and their handler signatures:
+    #   "tick":        handler(symbol_id, ts_ns, price)
+    #   "bar_updated": handler(symbol_id, ts_ns)             forming bars now include the tick
+    #   "bar_closed":  handler(symbol_id, timeframe, bar)    bar = (time, open, high, low, close, volume)
+    EVENTS = ("tick", "bar_updated", "bar_closed")
+    # Time frames searched (finest first) for long-horizon history
+    HISTORY_TIMEFRAMES = ('1m', '5m', '15m', '1h')
+
+    def __init__(self, client, retention=None, archive=None):
         self.client = client
-        self.ticks = {} # symbol -> list of {time, price}
-        self.bars = {} # symbol -> list of bars
+        self.archive = archive # Optional TickArchive (persists every tick)
+        self.retention = retention or config.TICK_RETENTION
+        self.ticks = {} # symbol -> TickStore (fixed-size ring buffer)
+        self.bar_retention = config.BAR_RETENTION
+        self.bars = {} # symbol -> BarEngine (1m bars + derived 5m/15m/1h/session, built incrementally)
+        self.session_offset = config.MARKET_OPEN_HOUR * 3600 + config.MARKET_OPEN_MINUTE * 60
+        self.bar_types = dict(config.BAR_TYPES) # symbol -> default bar type for get_latest_bars
+        for spec in self.bar_types.values():
+            BarEngine.validate(spec) # Raises ValueError for a bad BAR_TYPES entry at startup, not per tick
         self.lock = threading.RLock()
-        
+        # Tuples, replaced on (un)subscribe, so a handler may unsubscribe itself mid-publish
+        self.subscribers = {event: () for event in self.EVENTS}
+
         # Hook up callback
         self.client.market_data_callbacks.append(self.on_tick)
 
-    def on_tick(self, symbol_id, price):
+    def _get_store(self, symbol_id):
+        store = self.ticks.get(symbol_id)
+        if store is None:
+            store = TickStore(self.retention)
+            self.ticks[symbol_id] = store
+            custom = [spec for spec in [self.bar_types.get(symbol_id)] if spec and ':' in spec]
+            self.bars[symbol_id] = BarEngine(self.bar_retention, self.session_offset, custom=custom)
+        return store
+
+    def subscribe(self, event, handler):
+        """Call `handler` on every `event` (see EVENTS). Handlers run on the FIX reader thread."""
+        if event not in self.subscribers:
+            raise ValueError(f"Unknown event '{event}', expected one of {self.EVENTS}")
+        self.subscribers[event] += (handler,)
+
+    def unsubscribe(self, event, handler):
+        handlers = self.subscribers.get(event, ())
+        if handler in handlers:
+            i = handlers.index(handler)
+            self.subscribers[event] = handlers[:i] + handlers[i + 1:]
+
+    def _publish(self, event, *args):
+        for handler in self.subscribers[event]:
+            try:
+                handler(*args)
+            except Exception as e:
+                logger.error(f"{event} handler {getattr(handler, '__name__', handler)} failed: {e}")
+
+    def default_timeframe(self, symbol_id):
+        """The symbol's BAR_TYPES entry, else '1m', normalized as bar_closed events name it ('1min' -> '1m')."""
+        return BarEngine.normalize(self.bar_types.get(symbol_id, '1m'))
+
+    def on_tick(self, symbol_id, price, bid=None, ask=None, timestamp=None, volume=1.0):
         if isinstance(symbol_id, bytes):
             symbol_id = symbol_id.decode()
-            
-        now = datetime.now()
+
+        ts_ns = to_epoch_ns(timestamp)
+        bid = np.nan if bid is None else bid
+        ask = np.nan if ask is None else ask
         with self.lock:
-            if symbol_id not in self.ticks:
-                self.ticks[symbol_id] = []
-            
-            self.ticks[symbol_id].append({'time': now, 'price': price})
-            
+            self._get_store(symbol_id).add(ts_ns, price, bid, ask)
+            # O(1) per timeframe: update the forming bars, rolling on period boundaries
+            closed = self.bars[symbol_id].update(ts_ns, price, volume)
+
+        if self.archive:
+            # Buffered in memory; the archive's writer thread does the disk I/O
+            self.archive.append(symbol_id, ts_ns, price, bid, ask)
+
+        # Published outside the lock so handlers can read bars freely
+        self._publish("tick", symbol_id, ts_ns, price)
+        for timeframe, bar in closed:
+            self._publish("bar_closed", symbol_id, timeframe, bar)
+        self._publish("bar_updated", symbol_id, ts_ns)
+
         # logger.debug(f"[{now.strftime('%H:%M:%S')}] Tick: {symbol_id} @ {price}")
-        print(f"[{now.strftime('%H:%M:%S')}] Tick: {symbol_id} @ {price}")
-        
-        # Simple aggregation: If > 60 ticks or > 1 min, make a bar (Simulated)
-        # Real impl would bucket by time.
-        pass
-
-    def get_latest_bars(self, symbol_id, length=50):
-        # Convert ticks to dataframe
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] Tick: {symbol_id} @ {price}")
+
+    def warm_start(self, symbol_id, bars=None):
+        """
+        Hydrate an idle symbol with the last `bars` 1-minute bars from the tick
+        archive, using bulk vectorized reads and reductions (no on_tick replay).
+        Returns the number of ticks loaded.
+        """
+        if not self.archive:
+            return 0
+        bars = bars or config.WARM_START_BARS
+
+        data = self.archive.load_recent(symbol_id, bars)
+        if data is None:
+            return 0
+
         with self.lock:
-            if symbol_id not in self.ticks or not self.ticks[symbol_id]:
+            if symbol_id in self.ticks and len(self.ticks[symbol_id]) > 0:
+                # Live data already flowing; don't interleave history behind it
+                return 0
+            self._get_store(symbol_id).extend(**data)
+            self.bars[symbol_id].seed(data['time'], data['price'])
+        return len(data['time'])
+
+    def get_tick_arrays(self, symbol_id, length=None):
+        """
+        Zero-copy (time_ns, price, bid, ask) views of the newest ticks, or None.
+        Views alias the ring buffer: hold `self.lock` while reading them if the
+        feed is live, or copy them.
+        """
+        store = self.ticks.get(symbol_id)
+        if store is None or len(store) == 0:
+            return None
+        return store.arrays(length)
+
+    def memory_usage(self):
+        """Bytes preallocated for tick and bar storage, per symbol."""
+        with self.lock:
+            return {sym: store.nbytes + self.bars[sym].nbytes for sym, store in self.ticks.items()}
+
+    def _ensure_bar_type(self, symbol_id, engine, timeframe):
+        """
+        Start an activity bar type on demand, seeding it from the stored ticks.
+        Raises ValueError for an invalid spec or once the engine's MAX_CUSTOM is reached.
+        """
+        if engine.has(timeframe) or ':' not in timeframe:
+            return
+        BarEngine.validate(timeframe) # Before the engine keeps anything
+        agg = engine.add_custom(timeframe)
+        times, prices, _, _ = self.ticks[symbol_id].arrays()
+        agg.seed(times, prices, np.ones(len(times))) # Stored ticks carry no size: tick volume 1.0 each
+
+    def get_latest_bars(self, symbol_id, length=50, timeframe=None):
+        """
+        Return the last `length` bars, completed bars plus the forming bar, as a
+        lowercase OHLCV DataFrame, or None if fewer than 2 bars exist.
+        timeframe: '1m', '5m', '15m', '1h', 'session', 'tick:N', 'volume:N' or
+        'range:X'. Defaults to the symbol's BAR_TYPES entry, else '1m'.
+        """
+        if timeframe is None:
+            timeframe = self.default_timeframe(symbol_id)
+
+        with self.lock:
+            engine = self.bars.get(symbol_id)
+            if engine is None:
                 return None
-            
-            # Create a copy to minimize lock holding time and avoid modification during DF creation
-            data = list(self.ticks[symbol_id])
-        
-        try:
-            df = pd.DataFrame(data)
-            df['time'] = pd.to_datetime(df['time'])
-            df.set_index('time', inplace=True)
-            # Ensure unique index
-            df = df[~df.index.duplicated(keep='last')]
-            
-            # Resample to 1-minute OHLC bars
-            bars = df['price'].resample('1min').ohlc()
-            
-            # Add Volume (count of ticks)
-            bars['volume'] = df['price'].resample('1min').count()
-            
-            # Drop empty intervals (no ticks)
-            bars.dropna(inplace=True)
-            
-            # Rename columns to lowercase for consistency
-            bars.columns = ['open', 'high', 'low', 'close', 'volume']
-            
-            if len(bars) < 2:
-                # If not enough aggregated bars, return distinct None to signal "Waiting for more data"
+            self._ensure_bar_type(symbol_id, engine, timeframe)
+            if engine.bar_count(timeframe) < 2:
+                # Not enough aggregated bars, return distinct None to signal "Waiting for more data"
                 return None
-                
-            return bars.tail(length)
-        except Exception as e:
-            print(f"Error creating DataFrame for {symbol_id}: {e}")
-            return None
+            return engine.to_frame(timeframe, length)
+
+    def get_history(self, symbol_id, horizon_sec):
+        """
+        Bar column arrays (time, open, high, low, close, volume) covering the last
+        `horizon_sec` seconds, taken from the finest time frame whose retained
+        history reaches back that far (else the coarsest). None if < 2 bars.
+        """
+        with self.lock:
+            engine = self.bars.get(symbol_id)
+            if engine is None:
+                return None
+            for timeframe in self.HISTORY_TIMEFRAMES:
+                bars = engine.arrays(timeframe)
+                if len(bars['time']) == 0:
+                    return None
+                cutoff = bars['time'][-1] - int(horizon_sec * NS_PER_SEC)
+                if bars['time'][0] <= cutoff:
+                    break
+
+        first = np.searchsorted(bars['time'], cutoff)
+        bars = {name: arr[first:] for name, arr in bars.items()}
+        return bars if len(bars['time']) >= 2 else None
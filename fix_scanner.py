@@ -0,0 +1,126 @@
+"""
+Framing and field scanning for inbound FIX bytes without building
+simplefix.FixMessage objects. Everything works on index ranges of one
+receive buffer (a bytearray), so a quote is never copied as a whole.
+"""
+
+SOH = b"\x01"
+BEGIN_STRING = b"8=FIX"
+CHECKSUM_LEN = 7 # "10=nnn\x01"
+MARKET_DATA_TYPES = (b"W", b"X") # Snapshot / Incremental Refresh
+
+class FrameError(ValueError):
+    """The bytes at the read position are not the start of a FIX message."""
+
+def frame_message(buf, pos, limit):
+    """
+    Locate the message starting at buf[pos] (bytes up to `limit` are valid).
+    Returns (msg_type, body_start, body_end, end), where the body is
+    buf[body_start:body_end] starting at the 35= field and `end` is one past
+    the CheckSum field, or None if the message is not complete yet.
+    Raises FrameError if buf[pos] does not start a message.
+    """
+    if limit - pos < 2:
+        return None
+    if buf[pos] != 0x38 or buf[pos + 1] != 0x3D: # "8="
+        raise FrameError(f"Expected BeginString at {pos}")
+    tag = buf.find(b"\x019=", pos, limit)
+    if tag < 0:
+        return None
+    body_start = buf.find(SOH, tag + 3, limit) + 1
+    if body_start == 0:
+        return None
+    try:
+        body_len = int(buf[tag + 3:body_start - 1])
+    except ValueError:
+        raise FrameError(f"Bad BodyLength at {pos}")
+    body_end = body_start + body_len
+    end = body_end + CHECKSUM_LEN
+    if end > limit:
+        return None
+    if buf[body_end:body_end + 3] != b"10=":
+        raise FrameError(f"CheckSum not where BodyLength says at {pos}")
+    type_end = buf.find(SOH, body_start + 3, body_end)
+    return bytes(buf[body_start + 3:type_end]), body_start, body_end, end
+
+def resync(buf, pos, limit):
+    """
+    Index of the next BeginString after `pos`. If there is none yet, skip all
+    but a tail that could still turn out to be one.
+    """
+    i = buf.find(BEGIN_STRING, pos + 1, limit)
+    return max(pos + 1, limit - len(BEGIN_STRING) + 1) if i < 0 else i
+
+def find_value(buf, tag, start, end):
+    """Raw value of the first `tag` field (given as b"\\x01270=") in buf[start:end], or None."""
+    i = buf.find(tag, start, end)
+    if i < 0:
+        return None
+    i += len(tag)
+    return buf[i:buf.find(SOH, i)] # Fields always end in SOH, possibly right at `end`
+
+ENTRY_FIELDS = {b"55": 0, b"269": 1, b"270": 2, b"271": 3, b"279": 4, b"278": 5}
+
+def _text(value):
+    return value.decode() if value else None
+
+def _number(value):
+    return float(value) if value else None
+
+def _bytes_or_none(value):
+    return bytes(value) if value is not None else None
+
+def scan_market_data(buf, body_start, body_end):
+    """
+    Decode the NoMDEntries (268) group of a W/X body into
+    [(symbol, entry_type, price, size, action, entry_id), ...] from tags
+    55/269/270/271/279/278. An entry's own 55 (incremental refresh) wins
+    over the message-level one (snapshot); absent fields are None.
+    """
+    entries = []
+    group = buf.find(b"\x01268=", body_start - 1, body_end)
+    if group < 0:
+        return entries
+    symbol = _text(find_value(buf, b"\x0155=", body_start - 1, group))
+    # Each entry starts with the group's first field (269 in snapshots, 279 in refreshes)
+    first = buf.find(SOH, group + 5, body_end)
+    equals = buf.find(b"=", first, body_end) if first >= 0 else -1
+    if equals < 0:
+        return entries # Empty group
+    delimiter = bytes(buf[first:equals + 1])
+    i = first
+    while i >= 0:
+        nxt = buf.find(delimiter, i + len(delimiter), body_end)
+        entry_end = body_end if nxt < 0 else nxt
+        entries.append((
+            _text(find_value(buf, b"\x0155=", i, entry_end)) or symbol,
+            _bytes_or_none(find_value(buf, b"\x01269=", i, entry_end)),
+            _number(find_value(buf, b"\x01270=", i, entry_end)),
+            _number(find_value(buf, b"\x01271=", i, entry_end)),
+            _bytes_or_none(find_value(buf, b"\x01279=", i, entry_end)),
+            _text(find_value(buf, b"\x01278=", i, entry_end)),
+        ))
+        i = nxt
+    return entries
+
+def market_data_entries(msg):
+    """scan_market_data() for a W/X simplefix.FixMessage."""
+    entries = []
+    symbol = None
+    delimiter = None
+    entry = None
+    in_group = False
+    for tag, value in msg.pairs:
+        if tag == b"268":
+            in_group = True
+        elif not in_group:
+            if tag == b"55":
+                symbol = value.decode()
+        elif tag in ENTRY_FIELDS:
+            if delimiter is None:
+                delimiter = tag
+            if tag == delimiter:
+                entry = [None] * 6
+                entries.append(entry)
+            entry[ENTRY_FIELDS[tag]] = value
+    return [(_text(e[0]) or symbol, e[1], _number(e[2]), _number(e[3]), e[4], _text(e[5])) for e in entries]
@@ -0,0 +1,161 @@
+import threading
+import time
+import config
+from logger import setup_logger
+
+logger = setup_logger("HTTP")
+
+# Connections opened by the current thread; the pool opens them on the
+# requesting thread, so this attributes each new TCP/TLS handshake to a call.
+_opened = threading.local()
+
+def _count_new_conn():
+    _opened.count = getattr(_opened, 'count', 0) + 1
+
+_adapter_class = None
+
+def _counting_adapter_class():
+    """
+    HTTPAdapter subclass whose pools report every newly opened connection.
+    Built on first use so importing this module does not import requests.
+    """
+    global _adapter_class
+    if _adapter_class is None:
+        from requests.adapters import HTTPAdapter
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        class _CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                _count_new_conn()
+                return super()._new_conn()
+
+        class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                _count_new_conn()
+                return super()._new_conn()
+
+        class CountingHTTPAdapter(HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs):
+                super().init_poolmanager(*args, **kwargs)
+                self.poolmanager.pool_classes_by_scheme = {
+                    'http': _CountingHTTPConnectionPool,
+                    'https': _CountingHTTPSConnectionPool,
+                }
+
+        _adapter_class = CountingHTTPAdapter
+    return _adapter_class
+
+class PooledSession:
+    """
+    A keep-alive requests.Session with bounded connection pools, per-endpoint
+    timeouts and connection reuse statistics. The underlying session (and
+    requests itself) is created on the first call.
+
+    timeouts: endpoint name -> seconds, used when a call passes `endpoint`
+    and no explicit `timeout`.
+    """
+    def __init__(self, name, pool_connections=None, pool_maxsize=None, timeouts=None, default_timeout=10):
+        self.name = name
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.pool_connections = pool_connections or config.HTTP_POOL_CONNECTIONS
+        self.pool_maxsize = pool_maxsize or config.HTTP_POOL_MAXSIZE
+        self._session = None
+        self.lock = threading.Lock()
+        self.stats = {} # endpoint -> counters
+
+    @property
+    def session(self):
+        with self.lock:
+            if self._session is None:
+                import requests
+                session = requests.Session()
+                adapter = _counting_adapter_class()(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def timeout_for(self, endpoint):
+        return self.timeouts.get(endpoint, self.default_timeout)
+
+    def request(self, method, url, endpoint=None, **kwargs):
+        endpoint = endpoint or url.rsplit('/', 1)[-1].split('?', 1)[0]
+        kwargs.setdefault('timeout', self.timeout_for(endpoint))
+
+        before = getattr(_opened, 'count', 0)
+        t0 = time.perf_counter()
+        try:
+            return self.session.request(method, url, **kwargs)
+        finally:
+            self._record(endpoint, time.perf_counter() - t0, getattr(_opened, 'count', 0) - before)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _record(self, endpoint, elapsed, new_connections):
+        with self.lock:
+            s = self.stats.get(endpoint)
+            if s is None:
+                s = self.stats[endpoint] = {'requests': 0, 'new_connections': 0, 'reused': 0, 'new_time': 0.0, 'reused_time': 0.0}
+            s['requests'] += 1
+            s['new_connections'] += new_connections
+            if new_connections:
+                s['new_time'] += elapsed
+            else:
+                s['reused'] += 1
+                s['reused_time'] += elapsed
+
+    def connection_stats(self):
+        """
+        Per-endpoint request counts, connections opened vs reused, and mean
+        latency (ms) of calls on fresh vs reused connections. `saved_ms` is the
+        difference, i.e. the handshake cost avoided per reused call.
+        """
+        with self.lock:
+            report = {}
+            for endpoint, s in self.stats.items():
+                fresh = s['requests'] - s['reused']
+                new_ms = 1000 * s['new_time'] / fresh if fresh else None
+                reused_ms = 1000 * s['reused_time'] / s['reused'] if s['reused'] else None
+                report[endpoint] = {
+                    'requests': s['requests'],
+                    'new_connections': s['new_connections'],
+                    'reused': s['reused'],
+                    'new_ms': new_ms,
+                    'reused_ms': reused_ms,
+                    'saved_ms': new_ms - reused_ms if new_ms is not None and reused_ms is not None else None,
+                }
+            return report
+
+    def close(self):
+        with self.lock:
+            session, self._session = self._session, None
+        if session:
+            session.close()
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(name, timeouts=None, default_timeout=10):
+    """
+    Shared PooledSession per service name (e.g. "telegram", "llm"), so every
+    caller reuses the same pool. config.HTTP_TIMEOUTS overrides `timeouts`.
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            merged = dict(timeouts or {})
+            merged.update(config.HTTP_TIMEOUTS)
+            session = _sessions[name] = PooledSession(name, timeouts=merged, default_timeout=default_timeout)
+        return session
+
+def connection_stats():
+    """connection_stats() of every shared session, keyed by name."""
+    with _sessions_lock:
+        sessions = dict(_sessions)
+    return {name: s.connection_stats() for name, s in sessions.items()}
@@ -1,46 +1,213 @@
-import pandas as pd
-try:
-    import pandas_ta as ta
-except ImportError:
-    try:
-        import pandas_ta_classic as ta
-    except ImportError:
-        raise ImportError("Could not import pandas_ta or pandas_ta_classic")
+import math
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import config
+from logger import setup_logger
+
+logger = setup_logger("Indicators")
+
+_ta = None
+
+def load_pandas_ta():
+    """
+    Import pandas_ta (or the pandas_ta_classic fork) on demand.
+    It is only needed for the optional cross-check backend.
+    """
+    global _ta
+    if _ta is None:
+        try:
+            import pandas_ta as ta
+        except ImportError:
+            try:
+                import pandas_ta_classic as ta
+            except ImportError:
+                raise ImportError("Could not import pandas_ta or pandas_ta_classic")
+        _ta = ta
+    return _ta
+
+
+# --- NumPy kernels (raw float arrays in, float arrays out, NaN where undefined) ---
+
+def ema(values, length, seed_end=None):
+    """
+    EMA seeded with the SMA of the `length` values ending at `seed_end`
+    (default: the first `length` non-NaN values), as pandas_ta / TA-Lib do.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if seed_end is None:
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid) == 0:
+            return out
+        seed_end = valid[0] + length - 1
+    if seed_end - length + 1 < 0 or seed_end >= len(values):
+        return out
+
+    k = 2.0 / (length + 1)
+    prev = values[seed_end - length + 1:seed_end + 1].mean()
+    out[seed_end] = prev
+    # Recursive filter: inherently sequential, so iterate over plain floats
+    tail = values[seed_end + 1:].tolist()
+    for i, x in enumerate(tail, seed_end + 1):
+        prev = k * x + (1 - k) * prev
+        out[i] = prev
+    return out
+
+def rma(values, length):
+    """Wilder's moving average (alpha=1/length), seeded with the SMA of the first `length` values."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if len(values) < length:
+        return out
+
+    alpha = 1.0 / length
+    prev = values[:length].mean()
+    out[length - 1] = prev
+    for i, x in enumerate(values[length:].tolist(), length):
+        prev = prev + alpha * (x - prev)
+        out[i] = prev
+    return out
+
+def rsi(close, length=14):
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), np.nan)
+    if len(close) <= length:
+        return out
+
+    change = np.diff(close)
+    avg_gain = rma(np.where(change > 0, change, 0.0), length)
+    avg_loss = rma(np.where(change < 0, -change, 0.0), length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out[1:] = 100.0 * avg_gain / (avg_gain + avg_loss)
+    return out
+
+def bbands(close, length=20, std=2.0):
+    """Returns (lower, mid, upper) using the SMA and population standard deviation."""
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    lower, mid, upper = (np.full(n, np.nan) for _ in range(3))
+    if n < length:
+        return lower, mid, upper
+
+    windows = sliding_window_view(close, length)
+    mid[length - 1:] = windows.mean(axis=1)
+    dev = std * windows.std(axis=1)
+    lower[length - 1:] = mid[length - 1:] - dev
+    upper[length - 1:] = mid[length - 1:] + dev
+    return lower, mid, upper
+
+def macd(close, fast=12, slow=26, signal=9):
+    """Returns (macd, histogram, signal). The fast EMA runs from bar fast-1, not reseeded at slow-1."""
+    close = np.asarray(close, dtype=np.float64)
+    line = ema(close, fast, fast - 1) - ema(close, slow, slow - 1)
+    sig = ema(line, signal, slow + signal - 2)
+    return line, line - sig, sig
+
+def linreg(values, length=20):
+    """
+    Batch rolling linear regression over every trailing `length`-value window
+    (x = 0..length-1) in one vectorized pass, for backtests.
+    Returns (slope, intercept, r2) arrays; intercept is the fitted value at x=0.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    slope, intercept, r2 = (np.full(len(values), np.nan) for _ in range(3))
+    if len(values) < length:
+        return slope, intercept, r2
+
+    x = np.arange(length) - (length - 1) / 2.0 # Centered, so sum(x) == 0
+    sxx = x @ x
+    windows = sliding_window_view(values, length)
+    mean = windows.mean(axis=1)
+    m = windows @ x / sxx
+    ss_tot = ((windows - mean[:, None]) ** 2).sum(axis=1)
+
+    slope[length - 1:] = m
+    intercept[length - 1:] = mean - m * (length - 1) / 2.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r2[length - 1:] = np.where(ss_tot > 0, m * m * sxx / ss_tot, 1.0)
+    return slope, intercept, r2
+
+def linreg_slope(values, length=20):
+    """Least-squares slope of each trailing `length`-value window (x = 0..length-1)."""
+    return linreg(values, length)[0]
+
 
 class Indicators:
     @staticmethod
-    def add_all_indicators(df):
+    def add_all_indicators(df, backend=None):
         """
-        Add RSI, Bollinger Bands, and MACD to the dataframe.
+        Add RSI, Bollinger Bands, MACD and the 20-bar regression slope to the dataframe.
+        backend: "numpy" (default, see config.INDICATOR_BACKEND) or "pandas_ta"
+        for cross-checking. Column names follow pandas_ta in both cases.
         """
         if df is None or df.empty:
             return df
 
+        backend = backend or config.INDICATOR_BACKEND
+        if backend == "pandas_ta":
+            return Indicators._add_all_pandas_ta(df)
+
+        df = df.copy()
+        close = df['close'].to_numpy(dtype=np.float64)
+
         # RSI
         # Check for RSI or RSI_14
         cols = df.columns
         if 'RSI' not in cols and 'RSI_14' not in cols:
-            rsi = ta.rsi(df['close'], length=14)
-            if rsi is not None:
-                # df = pd.concat([df, rsi], axis=1)
-                # Use join to be safe on index alignment
-                df = df.join(rsi)
+            df['RSI_14'] = rsi(close, 14)
 
         # Bollinger Bands
         # Check if BBL/BBU exist
-        cols = df.columns
         if not any(c.startswith('BBL') for c in cols):
-            bbands = ta.bbands(df['close'], length=20, std=2)
-            if bbands is not None:
-                 # df = pd.concat([df, bbands], axis=1)
-                 df = df.join(bbands)
+            lower, mid, upper = bbands(close, 20, 2.0)
+            df['BBL_20_2.0'] = lower
+            df['BBM_20_2.0'] = mid
+            df['BBU_20_2.0'] = upper
+            with np.errstate(invalid='ignore', divide='ignore'):
+                df['BBB_20_2.0'] = 100 * (upper - lower) / mid
+                df['BBP_20_2.0'] = (close - lower) / (upper - lower)
 
         # MACD
         if not any(c.startswith('MACD') for c in cols):
-            macd = ta.macd(df['close'])
-            if macd is not None:
-                # df = pd.concat([df, macd], axis=1)
-                df = df.join(macd)
+            line, hist, sig = macd(close, 12, 26, 9)
+            df['MACD_12_26_9'] = line
+            df['MACDh_12_26_9'] = hist
+            df['MACDs_12_26_9'] = sig
+
+        # Linear regression slope
+        if 'LRm_20' not in cols:
+            df['LRm_20'] = linreg_slope(close, 20)
+
+        return df
+
+    @staticmethod
+    def _add_all_pandas_ta(df):
+        """Reference implementation on pandas_ta (slow import, DataFrame joins)."""
+        ta = load_pandas_ta()
+
+        cols = df.columns
+        if 'RSI' not in cols and 'RSI_14' not in cols:
+            rsi_col = ta.rsi(df['close'], length=14)
+            if rsi_col is not None:
+                # Use join to be safe on index alignment
+                df = df.join(rsi_col)
+
+        cols = df.columns
+        if not any(c.startswith('BBL') for c in cols):
+            bb = ta.bbands(df['close'], length=20, std=2)
+            if bb is not None:
+                 df = df.join(bb)
+
+        if not any(c.startswith('MACD') for c in cols):
+            macd_df = ta.macd(df['close'])
+            if macd_df is not None:
+                df = df.join(macd_df)
+
+        if 'LRm_20' not in cols:
+            slope = ta.linreg(df['close'], length=20, slope=True)
+            if slope is not None:
+                df = df.join(slope)
 
         return df
 
@@ -48,23 +215,28 @@ class Indicators:
     def check_signals(df):
         """
         Return a simple signal dictionary based on the last row.
+        Accepts a DataFrame with indicator columns, or the latest values
+        dict produced by an IndicatorEngine.
         """
-        if df is None or df.empty:
+        if df is None or len(df) == 0:
             return {}
 
-        last_row = df.iloc[-1]
-        
+        if isinstance(df, dict):
+            last_row = df
+            cols = df.keys()
+        else:
+            last_row = df.iloc[-1]
+            cols = df.columns
+
         # Check standard pandas_ta column names
         # RSI
         rsi = last_row.get('RSI_14') if 'RSI_14' in last_row else last_row.get('RSI')
-        
-        # Bollinger Bands
+
         # Bollinger Bands
         # Find BBL and BBU columns
-        cols = df.columns
         bbl_col = next((c for c in cols if c.startswith('BBL')), None)
         bbu_col = next((c for c in cols if c.startswith('BBU')), None)
-        
+
         bbl = last_row.get(bbl_col) if bbl_col else None
         bbu = last_row.get(bbu_col) if bbu_col else None
         close = last_row['close']
@@ -75,7 +247,7 @@ class Indicators:
             'below_bb': bool(close < bbl) if bbl is not None else False,
             'above_bb': bool(close > bbu) if bbu is not None else False
         }
-        
+
         return signal
 
     @staticmethod
@@ -84,15 +256,280 @@ class Indicators:
         Calculate the slope of the linear regression line for the last 'length' closing prices.
         Positive slope = Uptrend, Negative = Downtrend.
         """
-        import numpy as np
-        
         if df is None or len(df) < length:
             return 0.0
 
-        y = df['close'].iloc[-length:].values
-        x = np.arange(len(y))
-        
-        # Linear regression: y = mx + c
-        slope, intercept = np.polyfit(x, y, 1)
-        
-        return slope
+        y = df['close'].to_numpy(dtype=np.float64)[-length:]
+
+        # Linear regression: y = mx + c (closed form)
+        return float(linreg_slope(y, length)[-1])
+
+
+class RollingLinReg:
+    """
+    Rolling least-squares line over the last `length` values (x = 0..length-1),
+    maintained with running sums so each new value is O(1).
+    Values are stored relative to the first value seen to limit cancellation,
+    and the sums are rebuilt from the window every `resync` updates to stop
+    floating-point drift.
+    """
+    def __init__(self, length=20, resync=1000):
+        self.length = length
+        self.resync = resync
+        self.window = deque()
+        self.ref = None
+        self.sy = 0.0
+        self.syy = 0.0
+        self.sxy = 0.0
+        self.updates = 0
+
+    def _next(self, y):
+        """Return the sums after consuming `y` as (sy, syy, sxy, n)."""
+        v = y - self.ref
+        n = len(self.window)
+        if n < self.length:
+            return self.sy + v, self.syy + v * v, self.sxy + n * v, n + 1
+        old = self.window[0]
+        return (self.sy - old + v,
+                self.syy - old * old + v * v,
+                self.sxy - (self.sy - old) + (n - 1) * v,
+                n)
+
+    def _fit(self, sy, syy, sxy, n):
+        if n < self.length:
+            return None
+        sx = n * (n - 1) / 2.0
+        sxx = (n - 1) * n * (2 * n - 1) / 6.0
+        den_x = n * sxx - sx * sx
+        cov = n * sxy - sx * sy
+        slope = cov / den_x
+        intercept = (sy - slope * sx) / n + self.ref
+        den_y = n * syy - sy * sy
+        r2 = cov * cov / (den_x * den_y) if den_y > 1e-12 * max(1.0, n * syy) else 1.0
+        return slope, intercept, min(max(r2, 0.0), 1.0)
+
+    def update(self, y):
+        """Consume a value. Returns (slope, intercept, r2) once the window is full, else None."""
+        if self.ref is None:
+            self.ref = y
+        self.sy, self.syy, self.sxy, n = self._next(y)
+        self.window.append(y - self.ref)
+        if len(self.window) > self.length:
+            self.window.popleft()
+
+        self.updates += 1
+        if self.updates % self.resync == 0:
+            w = np.fromiter(self.window, dtype=np.float64)
+            self.sy, self.syy, self.sxy = w.sum(), w @ w, np.arange(len(w)) @ w
+        return self._fit(self.sy, self.syy, self.sxy, n)
+
+    def peek(self, y):
+        """Fit including `y` without consuming it."""
+        if self.ref is None:
+            return None if self.length > 1 else (0.0, y, 1.0)
+        return self._fit(*self._next(y))
+
+
+class StreamingEMA:
+    """EMA seeded with the SMA of the first `length` values (pandas_ta / TA-Lib convention)."""
+    def __init__(self, length):
+        self.length = length
+        self.k = 2.0 / (length + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value = None
+
+    def _next(self, x):
+        """Return the state after consuming `x` as (count, seed_sum, value)."""
+        if self.value is not None:
+            return self.count + 1, self.seed_sum, self.k * x + (1 - self.k) * self.value
+        count, seed_sum = self.count + 1, self.seed_sum + x
+        return count, seed_sum, (seed_sum / self.length if count == self.length else None)
+
+    def update(self, x):
+        self.count, self.seed_sum, self.value = self._next(x)
+        return self.value
+
+    def peek(self, x):
+        return self._next(x)[2]
+
+
+class StreamingRSI:
+    """Wilder RSI: RMA (alpha=1/length) of gains/losses, seeded with their SMA."""
+    def __init__(self, length=14):
+        self.length = length
+        self.alpha = 1.0 / length
+        self.prev_close = None
+        self.count = 0 # Number of price changes seen
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.avg_gain = None
+        self.avg_loss = None
+
+    def _next(self, close):
+        if self.prev_close is None:
+            return (close, 0, 0.0, 0.0, None, None), None
+
+        change = close - self.prev_close
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        count = self.count + 1
+
+        if self.avg_gain is not None:
+            avg_gain = self.avg_gain + self.alpha * (gain - self.avg_gain)
+            avg_loss = self.avg_loss + self.alpha * (loss - self.avg_loss)
+            gain_sum, loss_sum = self.gain_sum, self.loss_sum
+        else:
+            gain_sum, loss_sum = self.gain_sum + gain, self.loss_sum + loss
+            avg_gain = avg_loss = None
+            if count == self.length:
+                avg_gain, avg_loss = gain_sum / self.length, loss_sum / self.length
+
+        rsi = None
+        if avg_gain is not None:
+            total = avg_gain + avg_loss
+            rsi = 100.0 * avg_gain / total if total > 0 else float('nan')
+        return (close, count, gain_sum, loss_sum, avg_gain, avg_loss), rsi
+
+    def update(self, close):
+        state, rsi = self._next(close)
+        self.prev_close, self.count, self.gain_sum, self.loss_sum, self.avg_gain, self.avg_loss = state
+        return rsi
+
+    def peek(self, close):
+        return self._next(close)[1]
+
+
+class StreamingBollinger:
+    """Bollinger Bands from a sliding-window mean and population variance (Welford updates)."""
+    def __init__(self, length=20, std=2.0):
+        self.length = length
+        self.std = std
+        self.window = deque()
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of squared deviations from the mean
+
+    def _next(self, x):
+        n = len(self.window)
+        if n < self.length:
+            # Growing window (Welford add)
+            mean = self.mean + (x - self.mean) / (n + 1)
+            m2 = self.m2 + (x - self.mean) * (x - mean)
+            n += 1
+        else:
+            # Sliding window: replace the oldest value
+            old = self.window[0]
+            mean = self.mean + (x - old) / n
+            m2 = self.m2 + (x - old) * (x - mean + old - self.mean)
+        return mean, max(m2, 0.0), n
+
+    def _bands(self, mean, m2, n):
+        if n < self.length:
+            return None
+        dev = self.std * math.sqrt(m2 / n)
+        return mean - dev, mean, mean + dev
+
+    def update(self, x):
+        self.mean, self.m2, n = self._next(x)
+        self.window.append(x)
+        if len(self.window) > self.length:
+            self.window.popleft()
+        return self._bands(self.mean, self.m2, n)
+
+    def peek(self, x):
+        return self._bands(*self._next(x))
+
+
+class StreamingMACD:
+    """MACD line, signal and histogram from SMA-seeded EMAs (fast EMA runs from bar fast-1)."""
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    @staticmethod
+    def _result(macd, signal):
+        if macd is None:
+            return None
+        hist = macd - signal if signal is not None else None
+        return macd, hist, signal
+
+    def update(self, close):
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+        macd = fast - slow if slow is not None else None
+        signal = self.signal.update(macd) if macd is not None else None
+        return self._result(macd, signal)
+
+    def peek(self, close):
+        fast = self.fast.peek(close)
+        slow = self.slow.peek(close)
+        macd = fast - slow if slow is not None else None
+        signal = self.signal.peek(macd) if macd is not None else None
+        return self._result(macd, signal)
+
+
+class IndicatorEngine:
+    """
+    Stateful per-symbol RSI / Bollinger / MACD / regression slope, updated in
+    O(1) per closed bar.
+    The forming bar is only evaluated provisionally (state is not mutated).
+    Output keys follow pandas_ta column names.
+    """
+    def __init__(self, rsi_length=14, bb_length=20, bb_std=2.0, fast=12, slow=26, signal=9, slope_length=20):
+        self.params = (rsi_length, bb_length, bb_std, fast, slow, signal, slope_length)
+        self.reset()
+        self.slope_key = f"LRm_{slope_length}"
+        self.rsi_key = f"RSI_{rsi_length}"
+        self.bb_keys = [f"BBL_{bb_length}_{float(bb_std)}", f"BBM_{bb_length}_{float(bb_std)}", f"BBU_{bb_length}_{float(bb_std)}"]
+        self.macd_keys = [f"MACD_{fast}_{slow}_{signal}", f"MACDh_{fast}_{slow}_{signal}", f"MACDs_{fast}_{slow}_{signal}"]
+
+    def reset(self):
+        """Drop all streaming state; the next sync() re-seeds from its frame."""
+        rsi_length, bb_length, bb_std, fast, slow, signal, slope_length = self.params
+        self.rsi = StreamingRSI(rsi_length)
+        self.bb = StreamingBollinger(bb_length, bb_std)
+        self.macd = StreamingMACD(fast, slow, signal)
+        self.linreg = RollingLinReg(slope_length)
+        self.last_time = None # Open time of the last closed bar consumed
+        self.latest = {}
+
+    def _values(self, close, rsi, bands, macd, fit):
+        values = {'close': close, self.rsi_key: rsi, self.slope_key: fit[0] if fit else None}
+        values.update(zip(self.bb_keys, bands or (None, None, None)))
+        values.update(zip(self.macd_keys, macd or (None, None, None)))
+        return values
+
+    def update(self, close):
+        """Consume a closed bar."""
+        self.latest = self._values(close, self.rsi.update(close), self.bb.update(close),
+                                   self.macd.update(close), self.linreg.update(close))
+        return self.latest
+
+    def evaluate(self, close):
+        """Indicator values if the forming bar closed at `close` (no state change)."""
+        return self._values(close, self.rsi.peek(close), self.bb.peek(close),
+                            self.macd.peek(close), self.linreg.peek(close))
+
+    def sync(self, df):
+        """
+        Catch up on bars closed since the last call (all rows but the last),
+        then provisionally evaluate the forming bar (last row).
+        If the last bar consumed is no longer in the frame, more bars closed
+        than it holds (or the history was replaced): the state restarts from
+        the frame, as a full recompute over it would.
+        """
+        if df is None or df.empty:
+            return {}
+
+        closes = df['close']
+        times = df.index
+        if self.last_time is not None and len(df) > 1 and self.last_time not in times[:-1]:
+            logger.info(f"Indicator state gap: last bar {self.last_time} not in frame, re-seeding from {len(df) - 1} bars")
+            self.reset()
+        for i in range(len(df) - 1):
+            if self.last_time is None or times[i] > self.last_time:
+                self.update(float(closes.iloc[i]))
+                self.last_time = times[i]
+
+        return self.evaluate(float(closes.iloc[-1]))
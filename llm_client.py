@@ -1,6 +1,6 @@
-import requests
 import json
 import config
+from http_pool import get_session
 from logger import setup_logger
 
 logger = setup_logger("LLMClient")
@@ -9,6 +9,7 @@ class LLMClient:
     def __init__(self):
         self.api_url = config.LLM_API_URL
         self.model = config.LLM_MODEL_NAME
+        self.http = get_session("llm", timeouts={"chat/completions": 60})
 
     def get_market_sentiment(self, data_summary):
         """
@@ -43,7 +44,7 @@ class LLMClient:
 
         try:
             logger.debug(f"Sending request to LLM: {self.model}")
-            response = requests.post(f"{self.api_url}/chat/completions", json=payload, timeout=60)
+            response = self.http.post(f"{self.api_url}/chat/completions", endpoint="chat/completions", json=payload)
             if response.status_code == 200:
                 result = response.json()
                 content = result['choices'][0]['message']['content']
@@ -1,15 +1,19 @@
 import time
+_T0 = time.perf_counter() # Process start, for the startup timing report
 import threading
+from functools import partial
 import config
 from ctrader_fix_client import CTraderFixClient
-from data_loader import DataLoader
+from data_loader import DataLoader, DirtySymbols
+from tick_archive import TickArchive
+import http_pool
 from strategy import Strategy
 from llm_client import LLMClient
 from datetime import datetime
 from logger import setup_logger
+from startup_timer import StartupTimer
 
-from notification import NotificationManager, TelegramProvider
-from charting import generate_candlestick_chart
+from notification import NotificationManager, TelegramProvider, CRITICAL, INFO
 
 logger = setup_logger("Main")
 
@@ -18,119 +22,161 @@ active_symbols = list(config.TARGET_SYMBOLS)
 running = True
 last_chart_time = time.time()
 
-def listen_for_commands(notifier, fix_client, loader): # Added loader to args
+def build_commands(notifier, fix_client, loader, charts):
+    """Register the Telegram commands. Heavy ones run on the command worker pool."""
+    from commands import CommandRegistry
+    registry = CommandRegistry(notifier)
+
+    def symbol(ctx):
+        global active_symbols
+        # Format: /symbol 1
+        if len(ctx.args) != 1:
+            ctx.reply("❌ Invalid format. Use: `/symbol <id>`")
+            return
+        raw_input = ctx.args[0]
+        
+        # Try to resolve name -> ID
+        resolved_id = fix_client.get_symbol_id(raw_input)
+        
+        if resolved_id:
+            new_symbol = resolved_id
+            logger.info(f"Resolved command '{raw_input}' -> ID {new_symbol}")
+        else:
+            # Assume it's a raw ID
+            new_symbol = raw_input
+        
+        # Normalize (remove old, add new - simplified single symbol mode for now)
+        old_symbol = active_symbols[0] if active_symbols else "None"
+        active_symbols = [new_symbol] 
+        
+        logger.info(f"Command received: Switch {old_symbol} -> {new_symbol} ({raw_input})")
+        ctx.reply(f"🔄 **SWITCHING INSTRUMENT**\nOld: {old_symbol}\nNew: {new_symbol} ({raw_input})")
+        
+        # Restore recent bars from the archive, then subscribe to new symbol
+        warm_start(loader, new_symbol)
+        fix_client.subscribe_market_data(new_symbol, f"req_{new_symbol}")
+
+    def status(ctx):
+        msg = f"ℹ️ **STATUS**\nComputed Active Symbol: {active_symbols}\nConnected: {fix_client.quote_session.connected}"
+        
+        if active_symbols:
+            sym = active_symbols[0]
+            # Debug: Print what we are looking for vs what we have
+            logger.info(f"STATUS DEBUG: Looking for '{sym}' (type: {type(sym)}) in keys: {list(fix_client.latest_prices.keys())}")
+            
+            price = fix_client.latest_prices.get(sym, "Waiting...")
+            quote = fix_client.top_of_book.quote(sym)
+            t_str = datetime.fromtimestamp(quote['time'] / 1e9).strftime("%H:%M:%S") if quote and quote['time'] else "N/A"
+            msg += f"\n\nPrice: {price}"
+            if quote:
+                msg += f"\nBid: {quote['bid']} ({quote['bid_size']}) / Ask: {quote['ask']} ({quote['ask_size']})\nSpread: {quote['spread']:.5f}"
+            msg += f"\nUpdated: {t_str}"
+            book = fix_client.get_book_stats(sym)
+            if book:
+                msg += (f"\nBook: {book['bid_levels']} bid / {book['ask_levels']} ask levels"
+                        f"\nDepth({book['levels']}): {book['bid_depth']:g} / {book['ask_depth']:g}")
+                if book['imbalance'] is not None:
+                    msg += f"\nImbalance: {book['imbalance']:+.2f}"
+
+        pending = sum(m['depth'] for m in notifier.metrics().values())
+        msg += f"\nNotify Queue: {pending}"
+        sends = fix_client.trade_session.send_latency()
+        if sends['sent']:
+            msg += (f"\nFIX Send: p50 {sends['p50_ms']:.2f} ms / p99 {sends['p99_ms']:.2f} ms"
+                    f" ({sends['sent']} msgs in {sends['batches']} writes)")
+        running_cmds = list(registry.running)
+        if running_cmds:
+            msg += f"\nRunning: {', '.join('/' + name for name in running_cmds)}"
+            
+        ctx.reply(msg)
+
+    def sync(ctx):
+        ctx.reply("🔄 **SYNCING STATE**\nClearing local cache & Requesting fresh data...")
+        fix_client.clear_state()
+        fix_client.send_order_mass_status_request()
+        fix_client.send_positions_request()
+        
+        # Give it a moment to populate, then confirm
+        if ctx.sleep(3):
+            return
+        fix_client.reconcile_protections()
+        ctx.reply(f"✅ **SYNC COMPLETE**\n\n{fix_client.get_orders_string()}\n\n{fix_client.get_position_pnl_string()}")
+
+    def chart(ctx):
+        sym = active_symbols[0] if active_symbols else None
+        if not sym:
+            ctx.reply("⚠️ No active symbol.")
+            return
+
+        from charting import parse_horizon, downsample_frame
+        kind = 'candle'
+        if ctx.args:
+            # Long horizon (e.g. /chart 1d, /chart 1w): downsample to a fixed bar budget
+            label = ctx.args[0].lower()
+            horizon = parse_horizon(label)
+            if horizon is None:
+                ctx.reply("❌ Invalid format. Use: `/chart`, `/chart 12h`, `/chart 1d` or `/chart 1w`")
+                return
+            ctx.reply(f"📊 Generating {label} chart for {sym}...")
+            bars = loader.get_history(sym, horizon)
+            df = downsample_frame(bars, config.CHART_MAX_BARS, config.CHART_DOWNSAMPLE) if bars else None
+            if config.CHART_DOWNSAMPLE == "lttb":
+                kind = 'line'
+            timeframe = label
+            title = f"{sym} {label}"
+        else:
+            ctx.reply(f"📊 Generating chart for {sym}...")
+            df = loader.get_latest_bars(sym, length=100)
+            timeframe = loader.default_timeframe(sym)
+            title = sym
+        
+        if df is not None:
+            logger.info(f"Chart Request: Retrieved {len(df)} bars for {sym}")
+        else:
+             logger.info(f"Chart Request: No bars for {sym}")
+
+        if df is None or len(df) < 1:
+            ctx.reply("⚠️ Not enough data for chart.")
+            return
+        # Rendered in the chart process; this worker thread just waits
+        png = charts.render(df, title, timeframe, kind=kind, cancel_event=ctx.cancel_event)
+        if png:
+            ctx.reply_image(png, f"Chart: {title}")
+        else:
+            ctx.reply("❌ Failed to generate chart.")
+
+    registry.register("status", status, "Check connection", aliases=["statis"]) # Handle typo
+    registry.register("orders", lambda ctx: ctx.reply(fix_client.get_orders_string()), "List active orders")
+    registry.register("positions", lambda ctx: ctx.reply(fix_client.get_position_pnl_string()), "List open positions", aliases=["pos"])
+    registry.register("report", lambda ctx: ctx.reply(fix_client.get_daily_report()), "Daily Trade Report")
+    registry.register("sync", sync, "Manual State Sync", heavy=True, timeout=30)
+    registry.register("chart", chart, "Generate Price Chart (`/chart 1d`, `/chart 1w` for long horizons)", heavy=True, timeout=60)
+    registry.register("symbol", symbol, "Switch instrument (`/symbol <id>`)", heavy=True, timeout=30)
+    registry.register("help", lambda ctx: ctx.reply(registry.help_text()), "Show this menu")
+    return registry
+
+def send_chart(notifier, caption, future, priority=INFO):
+    """Done-callback for ChartRenderer futures: queue the PNG once rendered."""
+    try:
+        png = future.result()
+    except Exception as e:
+        logger.error(f"Chart render failed: {e}")
+        return
+    if png:
+        notifier.notify_image(png, caption, priority=priority)
+
+def listen_for_commands(notifier, registry):
     """Background thread to listen for Telegram commands."""
-    global active_symbols, running
-    
     logger.info("Command listener started.")
     
     while running:
         try:
-            cmds = notifier.check_commands()
-            for cmd in cmds:
-                # Handle Telegram group syntax (e.g., /status@my_bot -> /status)
-                if "@" in cmd:
-                    cmd_parts = cmd.split()
-                    cmd_parts[0] = cmd_parts[0].split('@')[0]
-                    cmd = " ".join(cmd_parts)
-                
-                if cmd.startswith("/symbol"):
-                    # Format: /symbol 1
-                    try:
-                        parts = cmd.split()
-                        if len(parts) == 2:
-                            raw_input = parts[1]
-                            
-                            # Try to resolve name -> ID
-                            resolved_id = fix_client.get_symbol_id(raw_input)
-                            
-                            if resolved_id:
-                                new_symbol = resolved_id
-                                logger.info(f"Resolved command '{raw_input}' -> ID {new_symbol}")
-                            else:
-                                # Assume it's a raw ID
-                                new_symbol = raw_input
-                            
-                            # Normalize (remove old, add new - simplified single symbol mode for now)
-                            old_symbol = active_symbols[0] if active_symbols else "None"
-                            active_symbols = [new_symbol] 
-                            
-                            logger.info(f"Command received: Switch {old_symbol} -> {new_symbol} ({raw_input})")
-                            notifier.notify(f"🔄 **SWITCHING INSTRUMENT**\nOld: {old_symbol}\nNew: {new_symbol} ({raw_input})")
-                            
-                            # Subscribe to new symbol
-                            fix_client.subscribe_market_data(new_symbol, f"req_{new_symbol}")
-                            
-                        else:
-                            notifier.notify("❌ Invalid format. Use: `/symbol <id>`")
-                    except Exception as e:
-                        logger.error(f"Command processing error: {e}")
-                        notifier.notify(f"❌ Error processing command: {e}")
-                
-                elif cmd == "/status" or cmd == "/statis": # Handle typo
-                    msg = f"ℹ️ **STATUS**\nComputed Active Symbol: {active_symbols}\nConnected: {fix_client.quote_session.connected}"
-                    
-                    if active_symbols:
-                        sym = active_symbols[0]
-                        # Debug: Print what we are looking for vs what we have
-                        logger.info(f"STATUS DEBUG: Looking for '{sym}' (type: {type(sym)}) in keys: {list(fix_client.latest_prices.keys())}")
-                        
-                        price = fix_client.latest_prices.get(sym, "Waiting...")
-                        t_check = fix_client.last_price_times.get(sym)
-                        t_str = t_check.strftime("%H:%M:%S") if t_check else "N/A"
-                        msg += f"\n\nPrice: {price}\nUpdated: {t_str}"
-                        
-                    notifier.notify(msg)
-                
-                elif cmd == "/help":
-                    notifier.notify(f"🤖 **AVAILABLE COMMANDS**\n`/status` - Check connection\n`/orders` - List active orders\n`/positions` - List open positions\n`/report` - Daily Trade Report\n`/sync` - Manual State Sync\n`/chart` - Generate Price Chart\n`/symbol <id>` - Switch instrument\n`/help` - Show this menu")
-                
-                elif cmd == "/orders":
-                    notifier.notify(fix_client.get_orders_string())
-
-                elif cmd in ["/positions", "/pos"]:
-                    notifier.notify(fix_client.get_position_pnl_string())
-
-                elif cmd == "/sync":
-                    notifier.notify("🔄 **SYNCING STATE**\nClearing local cache & Requesting fresh data...")
-                    fix_client.clear_state()
-                    fix_client.send_order_mass_status_request()
-                    fix_client.send_positions_request()
-                    
-                    # Give it a moment to populate, then confirm
-                    time.sleep(3) 
-                    fix_client.reconcile_protections()
-                    notifier.notify(f"✅ **SYNC COMPLETE**\n\n{fix_client.get_orders_string()}\n\n{fix_client.get_position_pnl_string()}")
-
-                elif cmd == "/report":
-                    notifier.notify(fix_client.get_daily_report())
-
-                elif cmd == "/chart":
-                    sym = active_symbols[0] if active_symbols else None
-                    if sym:
-                        notifier.notify(f"📊 Generating chart for {sym}...")
-                        df = loader.get_latest_bars(sym, length=100)
-                        
-                        if df is not None:
-                            logger.info(f"Chart Request: Retrieved {len(df)} bars for {sym}")
-                        else:
-                             logger.info(f"Chart Request: No bars for {sym}")
+            for cmd in notifier.check_commands():
+                # Light commands answer here; heavy ones go to the worker pool
+                registry.dispatch(cmd)
 
-                        if df is not None and len(df) >= 1:
-                            fpath = generate_candlestick_chart(df, sym)
-                            if fpath:
-                                notifier.notify_image(fpath, f"Chart: {sym}")
-                            else:
-                                notifier.notify("❌ Failed to generate chart (File error).")
-                        else:
-                             notifier.notify("⚠️ Not enough data for chart.")
-                    else:
-                        notifier.notify("⚠️ No active symbol.")
-
-                else:
-                     notifier.notify(f"❓ **UNKNOWN COMMAND**\nI didn't understand `{cmd}`.\nTry `/help`.")
-
-            time.sleep(2) # Poll interval
+            if not notifier.commands_block:
+                time.sleep(2) # Poll interval (long poll / webhook re-arm immediately)
         except Exception as e:
             logger.error(f"Listener error: {e}")
             time.sleep(5)
@@ -141,6 +187,8 @@ import sys
 
 def main():
     global active_symbols, running, last_chart_time
+    startup = StartupTimer(_T0)
+    startup.mark("imports")
     logger.info("Starting AI Day Trader (cTrader FIX)...")
     
     # Log Configuration (Safe)
@@ -159,7 +207,30 @@ def main():
     # Initialize Clients
     fix_client = CTraderFixClient(notifier=notifier)
     llm = LLMClient()
-    loader = DataLoader(fix_client)
+    archive = None
+    if config.TICK_ARCHIVE_ENABLED:
+        archive = TickArchive(config.TICK_ARCHIVE_DIR)
+        archive.start()
+    loader = DataLoader(fix_client, archive=archive)
+
+    # Wake the main loop only for symbols with new market data
+    dirty = DirtySymbols()
+    if config.STRATEGY_TRIGGER == "bar_closed":
+        def on_bar_closed(symbol_id, timeframe, bar):
+            if timeframe == loader.default_timeframe(symbol_id):
+                dirty.mark(symbol_id)
+        loader.subscribe("bar_closed", on_bar_closed)
+    else:
+        loader.subscribe("bar_updated", dirty.mark)
+
+    def on_first_tick(*_):
+        loader.unsubscribe("tick", on_first_tick)
+        startup.mark("first_tick")
+    loader.subscribe("tick", on_first_tick)
+    
+    # Chart rendering process; spawned after logon so it doesn't compete with startup
+    from charting import ChartRenderer
+    charts = ChartRenderer(config.CHART_WORKERS, config.CHART_CACHE_SIZE)
     
     # Strategy
     strategy = Strategy(fix_client, llm) 
@@ -169,6 +240,9 @@ def main():
     # --- Signal Handling ---
     def shutdown_handler(signum, frame):
         print(f"\nSignal {signum} received. Forcing exit...")
+        if archive:
+            archive.flush() # Persist buffered ticks (fast, local disk)
+        notifier.flush(timeout=2) # Give queued alerts a moment to go out
         # Force exit immediately, skipping cleanup that might hang
         os._exit(0)
 
@@ -176,38 +250,23 @@ def main():
     signal.signal(signal.SIGTERM, shutdown_handler)
     # -----------------------
 
+    # Initial state sync fires the moment TRADE logs on, even while QUOTE is still connecting
+    def on_logon(session_type):
+        if session_type == "TRADE":
+            startup.mark("logon")
+            threading.Thread(target=initial_sync, args=(fix_client,), name="InitialSync", daemon=True).start()
+    fix_client.logon_callbacks.append(on_logon)
+
+    commands = None
     try:
-        # Start Connection
-        fix_client.start()
-        
         # Fetch all symbols (Name -> ID)
         fix_client.fetch_symbols()
-        
-        # Request Initial Positions - Wait for connection first
-        logger.info("Waiting for Trade Session to be ready for Position Request...")
-        retries = 20
-        while not fix_client.trade_session.logged_on and retries > 0:
-            time.sleep(1)
-            retries -= 1
-            # Note: No need to check 'running' here if signal handler kills process
-            
-        if fix_client.trade_session.logged_on:
-            fix_client.clear_state()
-            fix_client.send_order_mass_status_request()
-            time.sleep(1)
-            fix_client.send_positions_request()
-            fix_client.send_positions_request()
-            # Reconcile after initial sync
-            def safe_reconcile():
-                time.sleep(5)
-                try:
-                    fix_client.reconcile_protections()
-                except Exception as e:
-                    logger.error(f"Reconciliation failed: {e}")
-
-            threading.Thread(target=safe_reconcile, daemon=True).start()
-        else:
-            logger.error("Trade Session not logged on after wait. Skipping initial position request.")
+
+        # Start Connection (QUOTE and TRADE in parallel; returns once both are settled)
+        fix_client.start()
+
+        if not fix_client.trade_session.logged_on:
+            logger.error("Trade Session not logged on. Skipping initial position request.")
 
         # Initial Subscription
         # Resolve initial symbols if they are names
@@ -225,12 +284,17 @@ def main():
         active_symbols = initial_ids
 
         for symbol in active_symbols:
+            warm_start(loader, symbol)
             logger.info(f"Subscribing to {symbol}...")
             fix_client.subscribe_market_data(symbol, f"req_{symbol}")
+
+        # Preload matplotlib in the chart process now that we're connected
+        charts.start()
         
         # Start Command Listener
-        # Pass 'loader' to listener for chart generation
-        cmd_thread = threading.Thread(target=listen_for_commands, args=(notifier, fix_client, loader), daemon=True)
+        # Pass 'loader' to the command handlers for chart generation
+        commands = build_commands(notifier, fix_client, loader, charts)
+        cmd_thread = threading.Thread(target=listen_for_commands, args=(notifier, commands), daemon=True)
         cmd_thread.start()
         
         logger.info("Entering Main Loop...")
@@ -268,7 +332,7 @@ def main():
                          # Simple logic: If outside hours and positions > 0 -> Close positions
                          if fix_client.positions:
                              logger.warning("Outside Trading Hours. Closing all positions.")
-                             notifier.notify("🛑 **MARKET CLOSE**\nClosing positions and pausing trading.")
+                             notifier.notify("🛑 **MARKET CLOSE**\nClosing positions and pausing trading.", priority=CRITICAL)
                              fix_client.close_all_positions()
                     
                     # Pause Logic
@@ -280,6 +344,10 @@ def main():
                 
                 # --- Trading Logic (Only runs if is_open) ---
 
+                # Block until a subscribed market data event arrives; the timeout
+                # keeps the stop / market hours / chart checks running while idle
+                updated = dirty.wait(timeout=1.0)
+
                 # Periodic Chart Check (Default 2 Hours = 7200s, Configurable)
                 if time.time() - last_chart_time > config.CHART_INTERVAL:
                     last_chart_time = time.time()
@@ -294,15 +362,14 @@ def main():
                              logger.info(f"Periodic Chart: No bars for {sym}")
 
                         if df is not None and len(df) >= 1:
-                            fpath = generate_candlestick_chart(df, sym)
-                            if fpath:
-                                notifier.notify_image(fpath, f"🕑 Periodic Chart: {sym}")
+                            # Rendered out of process; sent from the done-callback
+                            future = charts.submit(df, sym, loader.default_timeframe(sym))
+                            future.add_done_callback(partial(send_chart, notifier, f"🕑 Periodic Chart: {sym}"))
 
                 # Main strategy loop
-                # Use copy of active_symbols to handle dynamic changes safely
-                current_targets = list(active_symbols)
-                
-                current_targets = list(active_symbols)
+                # Use copy of active_symbols to handle dynamic changes safely,
+                # evaluating only symbols that received data since the last pass
+                current_targets = [s for s in active_symbols if s in updated]
                 
                 # Check Global Position Limit
                 # Removed early exit to allow "Signal Only" mode when full.
@@ -318,15 +385,21 @@ def main():
                     # if current_open_count >= config.MAX_OPEN_POSITIONS:
                     #      logger.info(f"Max positions reached ({current_open_count}/{config.MAX_OPEN_POSITIONS}). Skipping {symbol}.")
                     #      continue
-                    df = loader.get_latest_bars(symbol)
+                    if config.STRATEGY_TRIGGER == "bar_closed":
+                        # Woken by a bar close: the last row is the bar that just opened, evaluate the closed ones
+                        df = loader.get_latest_bars(symbol, length=51)
+                        df = df.iloc[:-1] if df is not None else None
+                    else:
+                        df = loader.get_latest_bars(symbol)
                     if df is not None and len(df) > 20:
                          # Run Strategy
                          signal_data = strategy.check_signal(df, symbol)
+                         startup.mark("first_signal")
                          if signal_data:
                              symbol_name = fix_client.get_symbol_name(symbol)
                              msg = f"🚨 **SIGNAL DETECTED** 🚨\nSymbol: {symbol_name}\nAction: {signal_data['action']}\nReason: {signal_data['reason']}"
                              logger.info(msg)
-                             notifier.notify(msg)
+                             notifier.notify(msg, priority=INFO)
                              
                              # Check Position Limit BEFORE placing order (Signal Only Mode)
                              current_open_count = fix_client.get_open_position_count()
@@ -335,7 +408,7 @@ def main():
                              if current_open_count >= config.MAX_OPEN_POSITIONS:
                                  limit_msg = f"⚠️ **LIMIT REACHED** ({current_open_count}/{config.MAX_OPEN_POSITIONS})\nSignal detected but Order SUPPRESSED."
                                  logger.info(limit_msg)
-                                 notifier.notify(limit_msg)
+                                 notifier.notify(limit_msg, priority=INFO)
                                  continue
                              
                              # Determine Side
@@ -377,10 +450,6 @@ def main():
                              if smart_sleep(10): # Shorter wait after entry
                                  running = False
                                  break
-                
-                if smart_sleep(1):
-                    running = False
-                    break
                     
             except Exception as e:
                 import traceback
@@ -402,12 +471,46 @@ def main():
 
     except Exception as e:
         logger.critical(f"Fatal Startup Error: {e}")
-        notifier.notify(f"❌ **FATAL ERROR**\nBot crashed:\n{e}")
-        time.sleep(10) # Wait before exit to allow notification to send
+        notifier.notify(f"❌ **FATAL ERROR**\nBot crashed:\n{e}", priority=CRITICAL)
+        notifier.flush(timeout=10) # Wait before exit to allow notification to send
     finally:
         logger.info("Cleaning up...")
+        if commands:
+            commands.shutdown()
         fix_client.stop()
+        if archive:
+            archive.stop()
+        charts.stop()
+        notifier.stop(timeout=5)
+        for name, endpoints in http_pool.connection_stats().items():
+            for endpoint, stats in endpoints.items():
+                logger.info(f"HTTP {name}/{endpoint}: {stats['requests']} calls, {stats['new_connections']} connections opened, "
+                            f"{stats['reused']} reused (saved ~{stats['saved_ms'] or 0:.0f} ms/call)")
+
+
+def initial_sync(fix_client):
+    """Request orders and positions after a TRADE Logon, then reconcile protections."""
+    try:
+        fix_client.clear_state()
+        fix_client.send_order_mass_status_request()
+        time.sleep(1)
+        fix_client.send_positions_request()
+        fix_client.send_positions_request()
+        # Reconcile after initial sync
+        time.sleep(5)
+        fix_client.reconcile_protections()
+    except Exception as e:
+        logger.error(f"Initial sync failed: {e}")
 
+def warm_start(loader, symbol):
+    """Hydrate `symbol` bars from the tick archive so the strategy isn't blind after a restart."""
+    try:
+        t0 = time.perf_counter()
+        loaded = loader.warm_start(symbol)
+        if loaded:
+            logger.info(f"Warm start: {symbol} restored from {loaded} archived ticks in {time.perf_counter() - t0:.3f}s")
+    except Exception as e:
+        logger.error(f"Warm start failed for {symbol}: {e}")
 
 def check_stop():
     import os
@@ -1,5 +1,12 @@
 from abc import ABC, abstractmethod
-import requests
+from collections import deque
+import json
+import os
+import queue
+import threading
+import time
+import config
+from http_pool import get_session
 from logger import setup_logger
 
 logger = setup_logger("Notifier")
@@ -11,17 +18,156 @@ class NotificationProvider(ABC):
         pass
 
     @abstractmethod
-    def send_image(self, image_path: str, caption: str = ""):
+    def send_image(self, image, caption: str = ""):
+        """image: PNG bytes or a file path."""
         pass
 
+class WebhookReceiver:
+    """
+    Minimal local HTTP endpoint for Telegram webhook updates (typically behind
+    a TLS reverse proxy). Each POSTed update is handed to `on_update`.
+    If `secret` is set, requests must carry it in X-Telegram-Bot-Api-Secret-Token.
+    """
+    def __init__(self, on_update, host="127.0.0.1", port=8443, path="/telegram", secret=None):
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler # Only needed in webhook mode
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != receiver.path:
+                    self.send_error(404)
+                    return
+                if receiver.secret and self.headers.get("X-Telegram-Bot-Api-Secret-Token") != receiver.secret:
+                    self.send_error(403)
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    update = json.loads(self.rfile.read(length))
+                except ValueError:
+                    self.send_error(400)
+                    return
+                receiver.on_update(update)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.on_update = on_update
+        self.path = path
+        self.secret = secret
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="TelegramWebhook", daemon=True)
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def start(self):
+        self.thread.start()
+        logger.info(f"Telegram webhook receiver listening on {self.address[0]}:{self.address[1]}{self.path}")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
 class TelegramProvider(NotificationProvider):
-    """Sends notifications via Telegram Bot API."""
-    def __init__(self, token: str, chat_id: str):
+    """
+    Sends notifications via Telegram Bot API.
+
+    Commands arrive by long polling getUpdates (mode="longpoll": the request
+    is held open by Telegram for up to `poll_timeout` seconds and re-armed
+    immediately) or through a local WebhookReceiver (mode="webhook").
+    The last processed update_id is persisted to `offset_file`, so
+    commands are not replayed after a restart.
+    """
+    # Seconds per Bot API method (overridable via HTTP_TIMEOUTS)
+    TIMEOUTS = {"setMyCommands": 5, "sendMessage": 10, "sendPhoto": 20, "setWebhook": 10}
+
+    def __init__(self, token: str, chat_id: str, mode=None, poll_timeout=None, offset_file=None,
+                 api_url="https://api.telegram.org", webhook=None):
+        """webhook: kwargs for WebhookReceiver (host, port, path, secret) in webhook mode."""
         self.token = token
         self.chat_id = str(chat_id)
-        self.base_url = f"https://api.telegram.org/bot{self.token}"
-        self.last_update_id = 0
+        self.base_url = f"{api_url}/bot{self.token}"
+        self.mode = mode or config.TELEGRAM_MODE
+        self.poll_timeout = config.TELEGRAM_POLL_TIMEOUT if poll_timeout is None else poll_timeout
+        self.offset_file = offset_file if offset_file is not None else config.TELEGRAM_OFFSET_FILE
+        self.last_update_id = self._load_offset()
+        self.http = get_session("telegram", timeouts=self.TIMEOUTS)
+        self.receiver = None
+        self.updates = queue.Queue()
+        webhook_url = None
+
+        if self.mode == "webhook":
+            if webhook is None:
+                webhook = {"host": config.TELEGRAM_WEBHOOK_HOST, "port": config.TELEGRAM_WEBHOOK_PORT,
+                           "path": config.TELEGRAM_WEBHOOK_PATH, "secret": config.TELEGRAM_WEBHOOK_SECRET}
+            self.receiver = WebhookReceiver(self.updates.put, **webhook)
+            self.receiver.start()
+            webhook_url = config.TELEGRAM_WEBHOOK_URL
+        elif self.mode != "longpoll":
+            raise ValueError(f"Unknown Telegram mode '{self.mode}', expected 'longpoll' or 'webhook'")
+
+        # Bot API registration is a few round trips; keep it off the startup path
+        self.registration = threading.Thread(target=self._register, args=(webhook_url, (webhook or {}).get("secret")),
+                                             name="TelegramSetup", daemon=True)
+        self.registration.start()
+
+    def _register(self, webhook_url, secret):
         self.set_bot_commands()
+        if webhook_url:
+            self.set_webhook(webhook_url, secret)
+
+    @property
+    def blocks_for_commands(self):
+        """check_for_commands() waits for updates itself; callers need no sleep between calls."""
+        return bool(self.token and self.chat_id) and self.poll_timeout > 0
+
+    def _load_offset(self):
+        if not self.offset_file:
+            return 0
+        try:
+            with open(self.offset_file) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read Telegram offset file {self.offset_file}: {e}")
+            return 0
+
+    def _save_offset(self):
+        if not self.offset_file:
+            return
+        try:
+            folder = os.path.dirname(self.offset_file)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            tmp = f"{self.offset_file}.tmp"
+            with open(tmp, "w") as f:
+                f.write(str(self.last_update_id))
+            os.replace(tmp, self.offset_file)
+        except OSError as e:
+            logger.error(f"Could not persist Telegram offset: {e}")
+
+    def set_webhook(self, url, secret=None):
+        """Point Telegram at our public webhook URL (getUpdates stops working while set)."""
+        payload = {"url": url}
+        if secret:
+            payload["secret_token"] = secret
+        try:
+            response = self.http.post(f"{self.base_url}/setWebhook", json=payload)
+            if response.status_code != 200:
+                logger.warning(f"Failed to set Telegram webhook: {response.text}")
+        except Exception as e:
+            logger.error(f"Error setting Telegram webhook: {e}")
+
+    def close(self):
+        if self.receiver:
+            self.receiver.stop()
+            self.receiver = None
 
     def set_bot_commands(self):
         """Registers commands with Telegram Bot API for the menu."""
@@ -33,12 +179,12 @@ class TelegramProvider(NotificationProvider):
             {"command": "positions", "description": "List open positions"},
             {"command": "report", "description": "Daily Trade Report"},
             {"command": "sync", "description": "Fetch active Orders/Positions from server"},
-            {"command": "chart", "description": "Generate price chart"},
+            {"command": "chart", "description": "Generate price chart (e.g. /chart 1d)"},
             {"command": "symbol", "description": "Switch instrument (e.g. /symbol 1)"},
             {"command": "help", "description": "Show available commands"}
         ]
         try:
-            response = requests.post(f"{self.base_url}/setMyCommands", json={"commands": commands}, timeout=5)
+            response = self.http.post(f"{self.base_url}/setMyCommands", json={"commands": commands})
             if response.status_code == 200:
                 logger.info("Telegram commands registered successfully.")
             else:
@@ -49,11 +195,12 @@ class TelegramProvider(NotificationProvider):
     def _send_request_with_retry(self, method, url, **kwargs):
         """Helper to send requests with rate limit handling (429)."""
         import time
+        import requests # Already loaded by the session by the time we get here
         max_retries = 3
         
         for attempt in range(max_retries + 1):
             try:
-                response = requests.request(method, url, **kwargs)
+                response = self.http.request(method, url, **kwargs)
                 
                 if response.status_code == 429:
                     # Rate Limit Hit
@@ -84,55 +231,89 @@ class TelegramProvider(NotificationProvider):
             "text": message
         }
         
-        response = self._send_request_with_retry("POST", f"{self.base_url}/sendMessage", json=payload, timeout=10)
+        response = self._send_request_with_retry("POST", f"{self.base_url}/sendMessage", json=payload)
         
         if response and response.status_code != 200:
             logger.error(f"Telegram send failed: {response.text}")
 
-    def send_image(self, image_path: str, caption: str = ""):
+    def send_image(self, image, caption: str = ""):
+        """image: PNG bytes (e.g. from ChartRenderer) or a file path."""
         if not self.token or not self.chat_id:
             return
 
         try:
-            with open(image_path, 'rb') as photo:
-                payload = {"chat_id": self.chat_id, "caption": caption}
-                files = {"photo": photo}
-                
-                response = self._send_request_with_retry("POST", f"{self.base_url}/sendPhoto", data=payload, files=files, timeout=20)
-                
-                if response and response.status_code != 200:
-                    logger.error(f"Telegram send photo failed: {response.text}")
+            if isinstance(image, (bytes, bytearray, memoryview)):
+                photo = bytes(image)
+            else:
+                with open(image, 'rb') as f:
+                    photo = f.read()
+
+            payload = {"chat_id": self.chat_id, "caption": caption}
+            # Bytes (not a file object) so a rate-limit retry re-sends the whole image
+            files = {"photo": ("chart.png", photo, "image/png")}
+            
+            response = self._send_request_with_retry("POST", f"{self.base_url}/sendPhoto", data=payload, files=files)
+            
+            if response and response.status_code != 200:
+                logger.error(f"Telegram send photo failed: {response.text}")
         except Exception as e:
             logger.error(f"Telegram photo error: {e}")
 
 
+    def _process_updates(self, results):
+        """Extract authorized command texts from getUpdates / webhook results and advance the offset."""
+        commands = []
+        last_seen = self.last_update_id
+        for result in results:
+            update_id = result.get("update_id")
+            if update_id is None or update_id <= self.last_update_id:
+                continue # Already handled (webhook redelivery)
+            last_seen = max(last_seen, update_id)
+
+            message = result.get("message", {})
+            chat = message.get("chat", {})
+            text = message.get("text", "")
+
+            # Security: Only accept commands from the configured chat_id
+            if str(chat.get("id")) == self.chat_id and text:
+                commands.append(text)
+
+        if last_seen != self.last_update_id:
+            self.last_update_id = last_seen
+            self._save_offset()
+        return commands
+
     def check_for_commands(self):
-        """Polls for new commands from the authorized chat_id."""
+        """
+        Wait up to `poll_timeout` seconds for new commands from the authorized
+        chat_id and return them (returns as soon as any arrive).
+        """
         if not self.token or not self.chat_id:
             return []
 
+        if self.mode == "webhook":
+            try:
+                results = [self.updates.get(timeout=self.poll_timeout) if self.poll_timeout else self.updates.get_nowait()]
+            except queue.Empty:
+                return []
+            while not self.updates.empty():
+                results.append(self.updates.get_nowait())
+            return self._process_updates(results)
+
         commands = []
         try:
-            # timeout=0 for immediate return (we will control polling interval in main)
-            # Use 10s socket timeout for 1s long-poll to prevent ReadTimeout
-            # Add timeout to prevent blocking if network is slow
-            url = f"{self.base_url}/getUpdates?offset={self.last_update_id + 1}&limit=10&timeout=1"
-            response = requests.get(url, timeout=5) # 5s timeout total
+            # Long poll: Telegram holds the request until an update arrives or
+            # poll_timeout passes; the socket timeout must outlast it
+            url = f"{self.base_url}/getUpdates?offset={self.last_update_id + 1}&limit=10&timeout={self.poll_timeout}"
+            response = self.http.get(url, endpoint="getUpdates", timeout=self.poll_timeout + 10)
             
             if response.status_code == 200:
                 data = response.json()
                 if data.get("ok"):
-                    for result in data.get("result", []):
-                        update_id = result.get("update_id")
-                        self.last_update_id = max(self.last_update_id, update_id)
-                        
-                        message = result.get("message", {})
-                        chat = message.get("chat", {})
-                        text = message.get("text", "")
-                        
-                        # Security: Only accept commands from the configured chat_id
-                        if str(chat.get("id")) == self.chat_id and text:
-                            commands.append(text)
+                    commands = self._process_updates(data.get("result", []))
+            else:
+                logger.error(f"Telegram polling failed: {response.status_code} {response.text}")
+                time.sleep(5) # Don't hammer the API on e.g. 409 (webhook set) or 401
                             
         except Exception as e:
             # Suppress ReadTimeout noise
@@ -140,26 +321,239 @@ class TelegramProvider(NotificationProvider):
                 pass
             else:
                 logger.error(f"Telegram polling error: {e}")
+                time.sleep(5)
             
         return commands
 
+# Notification priorities (lower is delivered first)
+CRITICAL = 0 # Fills, rejects, disconnects, fatal errors
+NORMAL = 1 # Command replies and anything untagged
+INFO = 2 # Signals, order acks, periodic charts; bursts are merged into digests
+PRIORITIES = (CRITICAL, NORMAL, INFO)
+
+# Telegram rejects messages over 4096 characters
+MAX_DIGEST_CHARS = 4000
+
+class Outbox:
+    """
+    Bounded queue of outgoing notifications for one provider, drained by a
+    dedicated worker thread so callers (e.g. the FIX reader) never block on
+    HTTP, retries or rate-limit sleeps.
+
+    Items wait in one lane per priority and higher lanes always go first.
+    INFO messages are sent at most once per `digest_window` seconds: anything
+    that arrives in between is merged into a single digest message.
+
+    overflow: "drop_oldest" evicts the oldest item of the least important
+    lane when full, "drop_newest" rejects the new one. A new item never
+    evicts a more important one.
+    coalesce: an item identical to one still queued is merged into it
+    (messages get an "(xN)" suffix) instead of taking another slot.
+    """
+    OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+    def __init__(self, provider, maxsize=100, overflow="drop_oldest", coalesce=True, digest_window=5.0):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}', expected one of {self.OVERFLOW_POLICIES}")
+        self.provider = provider
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.coalesce = coalesce
+        self.digest_window = digest_window
+        self.lanes = {priority: deque() for priority in PRIORITIES} # [kind, payload, caption, count]
+        self.cond = threading.Condition()
+        self.busy = False
+        self.running = True
+        self.draining = 0 # flush() callers waiting; digests are sent without delay
+        self.last_info_sent = float('-inf')
+        self.stats = {'enqueued': 0, 'sent': 0, 'failed': 0, 'dropped': 0, 'coalesced': 0, 'digested': 0, 'max_depth': 0}
+        self.thread = threading.Thread(target=self._run, name=f"Outbox-{type(provider).__name__}", daemon=True)
+        self.thread.start()
+
+    @property
+    def depth(self):
+        return sum(len(lane) for lane in self.lanes.values())
+
+    def put(self, kind, payload, caption="", priority=NORMAL):
+        """Queue a "message" or "image". Returns False if it was dropped."""
+        if priority not in self.lanes:
+            raise ValueError(f"Unknown notification priority {priority}")
+        with self.cond:
+            if not self.running:
+                return False
+            self.stats['enqueued'] += 1
+            lane = self.lanes[priority]
+
+            if self.coalesce:
+                for item in lane:
+                    if item[0] == kind and item[1] == payload and item[2] == caption:
+                        item[3] += 1
+                        self.stats['coalesced'] += 1
+                        return True
+
+            if self.depth >= self.maxsize:
+                self.stats['dropped'] += 1
+                victim = next(p for p in reversed(PRIORITIES) if self.lanes[p])
+                if victim < priority or (victim == priority and self.overflow == "drop_newest"):
+                    logger.warning(f"{type(self.provider).__name__} outbox full, dropping new {kind}")
+                    return False
+                dropped = self.lanes[victim].popleft()
+                logger.warning(f"{type(self.provider).__name__} outbox full, dropping oldest {dropped[0]}")
+
+            lane.append([kind, payload, caption, 1])
+            self.stats['max_depth'] = max(self.stats['max_depth'], self.depth)
+            self.cond.notify_all()
+        return True
+
+    def _next(self):
+        """
+        Pop the next (kind, payload, caption) to send, or return the seconds
+        to wait before the INFO lane may send again. Called with the lock held.
+        """
+        for priority in (CRITICAL, NORMAL):
+            if self.lanes[priority]:
+                return self._render(self.lanes[priority].popleft())
+
+        lane = self.lanes[INFO]
+        wait = self.last_info_sent + self.digest_window - time.monotonic()
+        if wait > 0 and self.running and not self.draining:
+            return wait
+        self.last_info_sent = time.monotonic()
+
+        if lane[0][0] == "image":
+            return self._render(lane.popleft())
+
+        # Merge queued INFO messages (up to the size limit) into one digest
+        parts = []
+        size = 0
+        while lane and lane[0][0] == "message":
+            text = self._render(lane[0])[1]
+            if parts and size + len(text) > MAX_DIGEST_CHARS:
+                break
+            lane.popleft()
+            parts.append(text)
+            size += len(text) + 2
+        if len(parts) == 1:
+            return "message", parts[0], ""
+        self.stats['digested'] += len(parts)
+        return "message", f"📋 **DIGEST** ({len(parts)} updates)\n\n" + "\n\n".join(parts), ""
+
+    @staticmethod
+    def _render(item):
+        kind, payload, caption, count = item
+        if kind == "message" and count > 1:
+            payload = f"{payload}\n(x{count})"
+        return kind, payload, caption
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while True:
+                    if not self.depth:
+                        if not self.running:
+                            return # Stopped and drained
+                        self.cond.wait()
+                        continue
+                    item = self._next()
+                    if isinstance(item, tuple):
+                        break
+                    self.cond.wait(item) # INFO lane rate limit
+                kind, payload, caption = item
+                self.busy = True
+
+            try:
+                if kind == "image":
+                    self.provider.send_image(payload, caption)
+                else:
+                    self.provider.send_message(payload)
+                outcome = 'sent'
+            except Exception as e:
+                logger.error(f"{type(self.provider).__name__} send failed: {e}")
+                outcome = 'failed'
+
+            with self.cond:
+                self.stats[outcome] += 1
+                self.busy = False
+                self.cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Wait until everything queued has been handed to the provider, sending
+        pending digests immediately. Returns False on timeout.
+        """
+        with self.cond:
+            self.draining += 1
+            self.cond.notify_all()
+            try:
+                return self.cond.wait_for(lambda: not self.depth and not self.busy, timeout)
+            finally:
+                self.draining -= 1
+
+    def stop(self, timeout=None):
+        """Stop accepting items; the worker exits once the queue is drained."""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join(timeout)
+
+    def metrics(self):
+        with self.cond:
+            depths = {name: len(self.lanes[p]) for name, p in (('critical', CRITICAL), ('normal', NORMAL), ('info', INFO))}
+            return dict(self.stats, depth=self.depth, **{f"depth_{name}": n for name, n in depths.items()})
+
+
 class NotificationManager:
-    """Manages multiple notification providers."""
-    def __init__(self):
+    """
+    Manages multiple notification providers.
+    notify / notify_image only enqueue; each provider has its own Outbox worker.
+    """
+    def __init__(self, queue_size=None, overflow=None, coalesce=None, digest_window=None):
         self.providers = []
+        self.outboxes = []
+        self.queue_size = queue_size or config.NOTIFY_QUEUE_SIZE
+        self.overflow = overflow or config.NOTIFY_OVERFLOW
+        self.coalesce = config.NOTIFY_COALESCE if coalesce is None else coalesce
+        self.digest_window = config.NOTIFY_DIGEST_WINDOW if digest_window is None else digest_window
     
     def add_provider(self, provider: NotificationProvider):
         self.providers.append(provider)
+        self.outboxes.append(Outbox(provider, self.queue_size, self.overflow, self.coalesce, self.digest_window))
         
-    def notify(self, message: str):
-        """Send message to all registered providers."""
-        for p in self.providers:
-            p.send_message(message)
+    def notify(self, message: str, priority: int = NORMAL):
+        """Queue message for all registered providers."""
+        for outbox in self.outboxes:
+            outbox.put("message", message, priority=priority)
 
-    def notify_image(self, image_path: str, caption: str = ""):
-        """Send image to all registered providers."""
+    def notify_image(self, image, caption: str = "", priority: int = NORMAL):
+        """Queue image (PNG bytes or a file path) for all registered providers."""
+        for outbox in self.outboxes:
+            outbox.put("image", image, caption, priority=priority)
+
+    def flush(self, timeout=None):
+        """Wait (up to `timeout` seconds in total) for all outboxes to drain. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for outbox in self.outboxes:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not outbox.flush(remaining):
+                return False
+        return True
+
+    def stop(self, timeout=5):
+        self.flush(timeout)
+        for outbox in self.outboxes:
+            outbox.stop(timeout=1)
         for p in self.providers:
-            p.send_image(image_path, caption)
+            if hasattr(p, 'close'):
+                p.close()
+
+    def metrics(self):
+        """Queue depth and delivery counters per provider."""
+        return {type(o.provider).__name__: o.metrics() for o in self.outboxes}
+
+    @property
+    def commands_block(self):
+        """True if check_commands() itself waits for new commands (long poll / webhook)."""
+        return any(getattr(p, 'blocks_for_commands', False) for p in self.providers)
 
     def check_commands(self):
         """Collect commands from all providers."""
@@ -0,0 +1,255 @@
+from bisect import bisect_left, insort
+from collections.abc import MutableMapping
+import numpy as np
+
+BID = b"0" # MDEntryType
+ASK = b"1"
+NEW, CHANGE, DELETE = b"0", b"1", b"2" # MDUpdateAction
+
+class TopOfBook:
+    """
+    Best bid/ask, their sizes, a reference price and the last update time
+    per symbol, kept in preallocated arrays (one row per symbol, grown by
+    doubling) so a quote update is a few in-place stores.
+
+    The reference price is the mid once both sides are known, else the side
+    that is; it is what `latest_prices` and the bar/tick pipeline see.
+    """
+    FIELDS = ('bid', 'ask', 'bid_size', 'ask_size', 'price')
+    BID, ASK, BID_SIZE, ASK_SIZE, PRICE = range(5)
+
+    def __init__(self, capacity=16):
+        self.rows = {} # symbol -> row index
+        self.values = np.full((capacity, len(self.FIELDS)), np.nan)
+        self.times = np.zeros(capacity, dtype=np.int64) # Epoch ns of the last update
+
+    def row(self, symbol):
+        row = self.rows.get(symbol)
+        if row is None:
+            row = self.rows[symbol] = len(self.rows)
+            if row == len(self.times):
+                self.values = np.vstack([self.values, np.full_like(self.values, np.nan)])
+                self.times = np.concatenate([self.times, np.zeros_like(self.times)])
+        return row
+
+    def update(self, symbol, entry_type, price, size, ts_ns):
+        """Apply one MDEntry (269=0 bid / 269=1 ask). Returns the symbol's row."""
+        row = self.row(symbol)
+        values = self.values[row]
+        if entry_type == BID:
+            values[self.BID] = price
+            values[self.BID_SIZE] = np.nan if size is None else size
+        elif entry_type == ASK:
+            values[self.ASK] = price
+            values[self.ASK_SIZE] = np.nan if size is None else size
+        else:
+            return row
+        bid, ask = values[self.BID], values[self.ASK]
+        if bid == bid and ask == ask: # Neither is NaN
+            values[self.PRICE] = (bid + ask) * 0.5
+        else:
+            values[self.PRICE] = price
+        self.times[row] = ts_ns
+        return row
+
+    def set_quote(self, symbol, bid, bid_size, ask, ask_size, ts_ns):
+        """Overwrite the whole row, e.g. from an OrderBook's best levels. None = side empty."""
+        row = self.row(symbol)
+        values = self.values[row]
+        values[self.BID] = np.nan if bid is None else bid
+        values[self.BID_SIZE] = np.nan if bid_size is None else bid_size
+        values[self.ASK] = np.nan if ask is None else ask
+        values[self.ASK_SIZE] = np.nan if ask_size is None else ask_size
+        if bid is not None and ask is not None:
+            values[self.PRICE] = (bid + ask) * 0.5
+        elif bid is not None or ask is not None:
+            values[self.PRICE] = ask if bid is None else bid
+        self.times[row] = ts_ns
+        return row
+
+    def top(self, symbol):
+        """Copy of the symbol's (bid, ask, price) array, or None (NaN = unknown)."""
+        row = self.rows.get(symbol)
+        if row is None:
+            return None
+        return self.values[row, [self.BID, self.ASK, self.PRICE]]
+
+    def quote(self, symbol):
+        """{'bid', 'ask', 'bid_size', 'ask_size', 'price', 'spread', 'time'} or None (NaN = unknown)."""
+        row = self.rows.get(symbol)
+        if row is None:
+            return None
+        quote = dict(zip(self.FIELDS, self.values[row].tolist()))
+        quote['spread'] = quote['ask'] - quote['bid']
+        quote['time'] = int(self.times[row]) or None
+        return quote
+
+    def get(self, symbol, field):
+        row = self.rows.get(symbol)
+        if row is None:
+            return None
+        value = float(self.values[row, self.FIELDS.index(field)])
+        return None if value != value else value
+
+
+class LatestPrices(MutableMapping):
+    """
+    The `latest_prices` dict interface (symbol -> price) over a TopOfBook.
+    Assigning sets only the reference price, as manual / test overrides did.
+    """
+    def __init__(self, book):
+        self.book = book
+
+    def __getitem__(self, symbol):
+        row = self.book.rows.get(symbol)
+        if row is not None:
+            value = float(self.book.values[row, TopOfBook.PRICE])
+            if value == value:
+                return value
+        raise KeyError(symbol)
+
+    def __setitem__(self, symbol, price):
+        self.book.values[self.book.row(symbol), TopOfBook.PRICE] = price
+
+    def __delitem__(self, symbol):
+        row = self.book.rows.get(symbol)
+        if row is None:
+            raise KeyError(symbol)
+        self.book.values[row] = np.nan
+        self.book.times[row] = 0
+
+    def __iter__(self):
+        prices = self.book.values[:, TopOfBook.PRICE]
+        return iter([s for s, row in self.book.rows.items() if prices[row] == prices[row]])
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class BookSide:
+    """
+    Price levels of one side of an L2 book: a sorted list of prices plus the
+    aggregated size and entry count of each level. Best price is O(1),
+    inserting or removing a level is a bisect plus a list shift.
+    """
+    def __init__(self, descending):
+        self.descending = descending # Bids: best is the highest price
+        self.prices = [] # Ascending
+        self.sizes = {} # price -> total size
+        self.counts = {} # price -> number of entries at that price
+
+    def __len__(self):
+        return len(self.prices)
+
+    def add(self, price, size):
+        count = self.counts.get(price)
+        if count is None:
+            insort(self.prices, price)
+            self.counts[price] = 1
+            self.sizes[price] = size
+        else:
+            self.counts[price] = count + 1
+            self.sizes[price] += size
+
+    def remove(self, price, size):
+        count = self.counts[price] - 1
+        if count:
+            self.counts[price] = count
+            self.sizes[price] -= size
+        else:
+            del self.counts[price]
+            del self.sizes[price]
+            del self.prices[bisect_left(self.prices, price)]
+
+    def best(self):
+        """(price, size) of the best level, or None."""
+        if not self.prices:
+            return None
+        price = self.prices[-1] if self.descending else self.prices[0]
+        return price, self.sizes[price]
+
+    def levels(self, n):
+        """[(price, size), ...] of the best `n` levels, best first."""
+        prices = self.prices[:-n - 1:-1] if self.descending else self.prices[:n]
+        return [(price, self.sizes[price]) for price in prices]
+
+    def depth(self, n):
+        """Total size of the best `n` levels."""
+        prices = self.prices[:-n - 1:-1] if self.descending else self.prices[:n]
+        sizes = self.sizes
+        return sum(sizes[price] for price in prices)
+
+    def clear(self):
+        self.prices.clear()
+        self.sizes.clear()
+        self.counts.clear()
+
+
+class OrderBook:
+    """
+    Full-depth (L2) book of one symbol, maintained from MDEntries keyed by
+    MDEntryID: a snapshot (W) rebuilds it, incremental refreshes (X) add,
+    change or delete single entries.
+    """
+    def __init__(self):
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.entries = {} # MDEntryID -> (BookSide, price, size)
+
+    def side(self, entry_type):
+        if entry_type == BID:
+            return self.bids
+        if entry_type == ASK:
+            return self.asks
+        return None
+
+    def apply(self, action, entry_type, entry_id, price, size):
+        """One MDEntry; `action` None (snapshot) means NEW."""
+        if action == DELETE:
+            self.delete(entry_id)
+            return
+        side = self.side(entry_type)
+        old = self.entries.get(entry_id)
+        if old is not None:
+            self.delete(entry_id) # CHANGE, or a NEW re-using an id
+            # A CHANGE may carry only the fields that changed
+            if side is None:
+                side = old[0]
+            price = old[1] if price is None else price
+            size = old[2] if size is None else size
+        elif size is None:
+            size = 0.0
+        if side is None or price is None:
+            return
+        side.add(price, size)
+        self.entries[entry_id] = (side, price, size)
+
+    def delete(self, entry_id):
+        entry = self.entries.pop(entry_id, None)
+        if entry is not None:
+            side, price, size = entry
+            side.remove(price, size)
+
+    def clear(self):
+        self.bids.clear()
+        self.asks.clear()
+        self.entries.clear()
+
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def spread(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        return ask[0] - bid[0] if bid and ask else None
+
+    def imbalance(self, levels=5):
+        """(bid depth - ask depth) / total over the best `levels` levels, in [-1, 1]; None if empty."""
+        bid, ask = self.bids.depth(levels), self.asks.depth(levels)
+        total = bid + ask
+        return (bid - ask) / total if total > 0 else None
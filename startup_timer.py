@@ -0,0 +1,40 @@
+import threading
+import time
+from logger import setup_logger
+
+logger = setup_logger("Startup")
+
+class StartupTimer:
+    """
+    Seconds from process start to the startup milestones (imports done, FIX
+    logon, first tick, first signal evaluation). Each mark is recorded once,
+    from any thread; the summary is logged when the last expected one lands.
+    """
+    MARKS = ("imports", "logon", "first_tick", "first_signal")
+
+    def __init__(self, t0=None, marks=MARKS):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.expected = tuple(marks)
+        self.marks = {}
+        self.lock = threading.Lock()
+        self.reported = False
+
+    def mark(self, name):
+        """Record `name` now. Returns False if it was already recorded."""
+        with self.lock:
+            if name in self.marks:
+                return False
+            elapsed = self.marks[name] = time.perf_counter() - self.t0
+            complete = not self.reported and all(m in self.marks for m in self.expected)
+            self.reported = self.reported or complete
+        logger.info(f"Startup: {name} after {elapsed:.3f}s")
+        if complete:
+            logger.info(self.report())
+        return True
+
+    def elapsed(self, name):
+        return self.marks.get(name)
+
+    def report(self):
+        parts = [f"{name} {self.marks[name]:.3f}s" if name in self.marks else f"{name} n/a" for name in self.expected]
+        return "Startup timings: " + ", ".join(parts)
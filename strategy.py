@@ -1,4 +1,4 @@
-from indicators import Indicators
+from indicators import Indicators, IndicatorEngine
 import config
 from datetime import datetime, timedelta
 from logger import setup_logger
@@ -12,10 +12,12 @@ class Strategy:
         self.last_llm_check = None
         self.current_bias = "NEUTRAL"
         self.last_signal_times = {} # Symbol -> Last Signal Candle Query Time
+        self.indicator_engines = {} # Symbol -> IndicatorEngine (streaming RSI/BB/MACD)
 
-    def update_llm_bias(self, df):
+    def update_llm_bias(self, df, indicators=None):
         """
         Update the biased based on LLM analysis every 30 minutes.
+        `indicators` is the latest IndicatorEngine values dict, if available.
         """
         if df is None or df.empty:
             return
@@ -25,12 +27,16 @@ class Strategy:
             logger.info("Updating LLM Bias...")
             
             # Create a technical summary from the dataframe
-            last_row = df.iloc[-1]
+            last_row = indicators or df.iloc[-1]
             close = last_row['close']
             rsi = last_row.get('RSI_14', last_row.get('RSI', 'N/A'))
+            if rsi is None:
+                rsi = 'N/A'
             
-            # Trend Check
-            trend_slope = Indicators.get_trend_slope(df)
+            # Trend Check (streaming regression slope when available)
+            trend_slope = last_row.get('LRm_20') if indicators else None
+            if trend_slope is None:
+                trend_slope = Indicators.get_trend_slope(df)
             trend_str = "UP" if trend_slope > 0 else "DOWN"
             
             summary = f"Price: {close:.2f}, RSI: {rsi}, Trend: {trend_str}"
@@ -47,6 +53,14 @@ class Strategy:
             except Exception as e:
                 logger.error(f"Failed to update LLM bias: {e}")
 
+    def book_imbalance(self, symbol):
+        """Bid/ask size imbalance of the best levels in the L2 book (-1..1), or None without a book."""
+        get_stats = getattr(self.trading, 'get_book_stats', None)
+        stats = get_stats(symbol) if get_stats else None
+        if not isinstance(stats, dict):
+            return None
+        return stats.get('imbalance')
+
     def check_signal(self, df, symbol):
         """
         Analyze dataframe and return a trading signal.
@@ -60,17 +74,21 @@ class Strategy:
         if symbol in self.last_signal_times and self.last_signal_times[symbol] == last_time:
             return None
 
-        # Add Indicators
+        # Update streaming indicators: O(1) per newly closed bar, forming bar evaluated provisionally
+        engine = self.indicator_engines.get(symbol)
+        if engine is None:
+            engine = self.indicator_engines[symbol] = IndicatorEngine()
         try:
-             df = Indicators.add_all_indicators(df)
+             indicators = engine.sync(df)
         except Exception as e:
-             return None # Not enough data
-        
+             logger.error(f"Indicator update failed for {symbol}: {e}")
+             return None
+
         # Update LLM Bias (throttled inside)
-        self.update_llm_bias(df)
-        
+        self.update_llm_bias(df, indicators)
+
         # Get latest technical signals
-        signals = Indicators.check_signals(df)
+        signals = Indicators.check_signals(indicators)
         
         signal = None
         
@@ -90,6 +108,14 @@ class Strategy:
                  logger.debug(f"Signal IGNORED: Overbought but Bias is {self.current_bias}")
 
         if signal:
+            # Liquidity check: a book stacked against the trade (e.g. asks >> bids for a BUY)
+            imbalance = self.book_imbalance(symbol)
+            if imbalance is not None:
+                signal['reason'] += f" | Book {imbalance:+.2f}"
+                against = -imbalance if signal['action'] == "BUY_CALL" else imbalance
+                if config.BOOK_IMBALANCE_MIN > 0 and against >= config.BOOK_IMBALANCE_MIN:
+                    logger.info(f"Signal IGNORED: {signal['action']} but book imbalance is {imbalance:+.2f}")
+                    return None
             self.last_signal_times[symbol] = last_time
             return signal
             
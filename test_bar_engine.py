@@ -0,0 +1,163 @@
+import unittest
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from data_loader import DataLoader
+from bar_engine import BarEngine, make_aggregator
+
+class MockFixClient:
+    def __init__(self):
+        self.market_data_callbacks = []
+
+def resample_reference(times, prices, rule='1min', offset=None):
+    """The previous full-resample implementation of get_latest_bars."""
+    df = pd.DataFrame({'price': prices}, index=pd.DatetimeIndex(times.view('datetime64[ns]')))
+    bars = df['price'].resample(rule, offset=offset).ohlc()
+    bars['volume'] = df['price'].resample(rule, offset=offset).count()
+    bars.dropna(inplace=True)
+    bars.columns = ['open', 'high', 'low', 'close', 'volume']
+    return bars
+
+class TestIncrementalBars(unittest.TestCase):
+    def setUp(self):
+        self.loader = DataLoader(MockFixClient(), retention=10000)
+        rng = np.random.default_rng(7)
+        # ~40 minutes of irregular ticks, including a quiet gap with no ticks
+        gaps = rng.integers(200_000_000, 3_000_000_000, size=2000)
+        gaps[800] = 5 * 60 * 1_000_000_000
+        gaps[1500] = 20 * 3600 * 1_000_000_000
+        self.times = np.cumsum(gaps).astype(np.int64) + 1_700_000_000_000_000_000
+        self.prices = 2000 + np.cumsum(rng.normal(0, 0.1, size=2000))
+        for t, p in zip(self.times, self.prices):
+            self.loader.on_tick("41", float(p), timestamp=int(t))
+
+    def test_matches_full_resample(self):
+        expected = resample_reference(self.times, self.prices)
+        df = self.loader.get_latest_bars("41", length=len(expected))
+
+        self.assertEqual(len(df), len(expected))
+        self.assertTrue((df.index == expected.index).all())
+        np.testing.assert_allclose(df.values, expected.values)
+
+    def test_higher_timeframes_match_resample(self):
+        for tf, rule in [('5m', '5min'), ('15m', '15min'), ('1h', '1h')]:
+            expected = resample_reference(self.times, self.prices, rule)
+            df = self.loader.get_latest_bars("41", length=len(expected), timeframe=tf)
+
+            self.assertEqual(len(df), len(expected), tf)
+            self.assertTrue((df.index == expected.index).all(), tf)
+            np.testing.assert_allclose(df.values, expected.values, err_msg=tf)
+
+    def test_session_bars_use_market_open(self):
+        offset = pd.Timedelta(seconds=self.loader.session_offset)
+        expected = resample_reference(self.times, self.prices, '1D', offset=offset)
+        df = self.loader.get_latest_bars("41", length=10, timeframe='session')
+
+        self.assertGreaterEqual(len(expected), 2)
+        self.assertTrue((df.index == expected.index).all())
+        np.testing.assert_allclose(df.values, expected.values)
+
+    def test_length_includes_forming_bar(self):
+        df = self.loader.get_latest_bars("41", length=10)
+        self.assertEqual(len(df), 10)
+        self.assertEqual(df['close'].iloc[-1], self.prices[-1])
+
+    def test_not_enough_data(self):
+        loader = DataLoader(MockFixClient())
+        loader.on_tick("41", 2000.0, timestamp=0)
+        loader.on_tick("41", 2001.0, timestamp=1_000_000_000)
+        self.assertIsNone(loader.get_latest_bars("41"))
+
+class TestActivityBars(unittest.TestCase):
+    def feed(self, loader, prices):
+        for i, p in enumerate(prices):
+            loader.on_tick("41", p, timestamp=i * 1_000_000_000)
+
+    def test_tick_bars(self):
+        loader = DataLoader(MockFixClient())
+        loader.bar_types["41"] = "tick:3"
+        self.feed(loader, [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0])
+
+        df = loader.get_latest_bars("41")
+        self.assertEqual(list(df.columns), ['open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(df['open'].tolist(), [1.0, 4.0, 7.0])
+        self.assertEqual(df['close'].tolist(), [3.0, 6.0, 7.0])
+        self.assertEqual(df['volume'].tolist(), [3.0, 3.0, 1.0])
+
+    def test_volume_bars(self):
+        loader = DataLoader(MockFixClient())
+        loader.bar_types["41"] = "volume:5"
+        for i, (p, v) in enumerate([(1.0, 2), (2.0, 2), (3.0, 2), (4.0, 4), (5.0, 1)]):
+            loader.on_tick("41", p, timestamp=i, volume=v)
+
+        df = loader.get_latest_bars("41")
+        self.assertEqual(df['close'].tolist(), [3.0, 5.0])
+        self.assertEqual(df['volume'].tolist(), [6.0, 5.0])
+
+    def test_range_bars(self):
+        loader = DataLoader(MockFixClient())
+        loader.bar_types["41"] = "range:1.0"
+        self.feed(loader, [100.0, 100.5, 99.9, 101.0, 101.2, 100.1, 99.0])
+
+        df = loader.get_latest_bars("41")
+        self.assertTrue(((df['high'] - df['low']) <= 1.0 + 1e-9).all())
+        self.assertEqual(df['open'].tolist(), [100.0, 101.0, 100.1, 99.0])
+        self.assertEqual(df['close'].tolist(), [99.9, 101.2, 100.1, 99.0])
+
+    def test_on_demand_bar_type_is_seeded(self):
+        loader = DataLoader(MockFixClient())
+        self.feed(loader, [float(i) for i in range(10)])
+
+        df = loader.get_latest_bars("41", timeframe="tick:4")
+        self.assertEqual(df['open'].tolist(), [0.0, 4.0, 8.0])
+        # Live ticks keep extending it
+        loader.on_tick("41", 10.0, timestamp=10_000_000_000)
+        loader.on_tick("41", 11.0, timestamp=11_000_000_000)
+        df = loader.get_latest_bars("41", timeframe="tick:4")
+        self.assertEqual(df['close'].tolist(), [3.0, 7.0, 11.0])
+
+    def test_vectorized_seed_matches_replay(self):
+        rng = np.random.default_rng(11)
+        n = 20_000
+        times = np.arange(n, dtype=np.int64) * 1_000_000_000
+        prices = np.round(2000 + np.cumsum(rng.normal(0, 0.1, size=n)), 2)
+        unit = np.ones(n)
+        sizes = rng.integers(1, 6, size=n).astype(float)
+        for spec, volumes in [("tick:7", unit), ("volume:10", unit), ("volume:12", sizes),
+                              ("range:0.5", unit), ("range:0.01", unit), ("range:50", unit)]:
+            seeded, replayed = make_aggregator(spec, n), make_aggregator(spec, n)
+            seeded.seed(times, prices, volumes)
+            for t, p, v in zip(times.tolist(), prices.tolist(), volumes.tolist()):
+                replayed.update(t, p, v)
+            got, ref = seeded.arrays(), replayed.arrays()
+            for name in ref:
+                np.testing.assert_allclose(got[name], ref[name], err_msg=f"{spec} {name}")
+
+    def test_invalid_or_too_many_specs_rejected(self):
+        loader = DataLoader(MockFixClient())
+        self.feed(loader, [float(i) for i in range(10)])
+        for spec in ("tick:0", "tick:-5", "tick:2.5", "volume:0", "range:-1", "range:nan", "range:", "renko:1"):
+            with self.assertRaises(ValueError, msg=spec):
+                loader.get_latest_bars("41", timeframe=spec)
+        self.assertEqual(loader.bars["41"].custom, {})
+
+        for i in range(BarEngine.MAX_CUSTOM):
+            loader.get_latest_bars("41", timeframe=f"tick:{i + 2}")
+        with self.assertRaises(ValueError):
+            loader.get_latest_bars("41", timeframe="tick:50")
+        self.assertEqual(len(loader.bars["41"].custom), BarEngine.MAX_CUSTOM)
+
+        for spec in ("range:0", "30m", "1mn"):
+            with patch("config.BAR_TYPES", {"41": spec}):
+                with self.assertRaises(ValueError, msg=spec):
+                    DataLoader(MockFixClient())
+        with patch("config.BAR_TYPES", {"41": "1min", "1": "tick:100"}):
+            DataLoader(MockFixClient())
+
+        with self.assertRaises(ValueError):
+            loader.get_latest_bars("41", timeframe="30m")
+        with self.assertRaises(ValueError):
+            loader.bars["41"].arrays("30m")
+
+if __name__ == '__main__':
+    unittest.main()
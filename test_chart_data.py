@@ -22,27 +22,30 @@ print("Tick 1 added.")
 
 # T=60s: Second tick (should start new bar)
 # We can't easily jump time in `datetime.now()` inside `DataLoader` without mocking datetime.
-# Instead, we will inspect `loader.ticks` and manually modify timestamps for testing.
+# Instead, we start a fresh loader and inject ticks with explicit timestamps.
 
 loader.on_tick(symbol, 2001.0) # Tick 2
 loader.on_tick(symbol, 2002.0) # Tick 3
 
-# Manually retain the ticks but skew their times to simulate elapsed time
+# Replace the live ticks with ticks skewed to simulate elapsed time
 # Tick 1: T-3 min
 # Tick 2: T-2 min
 # Tick 3: T-1 min
 # Tick 4: Now
 
 now = pd.Timestamp.now()
-loader.ticks[symbol] = [
-    {'time': now - pd.Timedelta(minutes=3), 'price': 2000.0},
-    {'time': now - pd.Timedelta(minutes=2), 'price': 2001.0}, # New Bar
-    {'time': now - pd.Timedelta(minutes=2, seconds=30), 'price': 2001.5}, # Same Bar
-    {'time': now - pd.Timedelta(minutes=1), 'price': 2002.0}, # New Bar
-    {'time': now, 'price': 2003.0} # New Bar
+loader = DataLoader(MockFixClient())
+injected = [
+    (now - pd.Timedelta(minutes=3), 2000.0),
+    (now - pd.Timedelta(minutes=2, seconds=30), 2001.5), # Same Bar
+    (now - pd.Timedelta(minutes=2), 2001.0), # New Bar
+    (now - pd.Timedelta(minutes=1), 2002.0), # New Bar
+    (now, 2003.0) # New Bar
 ]
+for t, p in injected:
+    loader.on_tick(symbol, p, timestamp=t)
 
-print(f"Injecting {len(loader.ticks[symbol])} ticks spanning 3 minutes.")
+print(f"Injecting {len(injected)} ticks spanning 3 minutes.")
 
 # Try to get bars
 df = loader.get_latest_bars(symbol)
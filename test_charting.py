@@ -0,0 +1,175 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future
+import numpy as np
+import pandas as pd
+from charting import ChartRenderer, render_candlestick_png, lttb, downsample_bars, downsample_frame, parse_horizon
+from data_loader import DataLoader
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+def make_bars(n=60):
+    rng = np.random.default_rng(2)
+    close = 2000 + np.cumsum(rng.normal(0, 1, size=n))
+    index = pd.date_range("2024-01-01", periods=n, freq="1min", name="time")
+    return pd.DataFrame({'open': close - 0.3, 'high': close + 1, 'low': close - 1, 'close': close, 'volume': 1.0}, index=index)
+
+class TestCharting(unittest.TestCase):
+    def setUp(self):
+        # Renders must not write chart files; run in an empty directory to prove it
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_render_in_memory(self):
+        png = render_candlestick_png(make_bars(), "XAUUSD")
+        self.assertTrue(png.startswith(PNG_MAGIC))
+        self.assertIsNone(render_candlestick_png(pd.DataFrame({'close': [1.0]}), "XAUUSD"))
+        self.assertEqual([f for f in os.listdir(self.dir) if f.endswith(".png")], [])
+
+    def test_process_pool_renders_concurrently(self):
+        renderer = ChartRenderer(workers=1).start()
+        self.addCleanup(renderer.stop)
+
+        # A periodic chart and a /chart request in flight together get separate buffers
+        futures = [renderer.submit(make_bars(40), "A"), renderer.submit(make_bars(80), "B")]
+        pngs = [f.result(timeout=120) for f in futures]
+        for png in pngs:
+            self.assertTrue(png.startswith(PNG_MAGIC))
+        self.assertNotEqual(pngs[0], pngs[1])
+        self.assertNotEqual(renderer.pool._processes, {}) # Rendered out of process
+        self.assertEqual([f for f in os.listdir(self.dir) if f.endswith(".png")], [])
+
+    def test_render_cancellation(self):
+        renderer = ChartRenderer(workers=1)
+        self.addCleanup(renderer.stop)
+        cancel = threading.Event()
+        cancel.set()
+        self.assertIsNone(renderer.render(make_bars(), "XAUUSD", cancel_event=cancel))
+
+
+class TestChartCache(unittest.TestCase):
+    def setUp(self):
+        # Render in-process so the test only exercises the cache bookkeeping
+        self.renderer = ChartRenderer(cache_size=2)
+        self.renders = []
+
+        def fake_submit(df, symbol, style, kind):
+            self.renders.append((symbol, len(df)))
+            future = Future()
+            future.set_result(f"png:{symbol}:{len(df)}:{df.index[-1]}".encode())
+            return future
+        self.renderer._submit = fake_submit
+
+    def test_hits_reuse_bytes(self):
+        bars = make_bars()
+        first = self.renderer.render(bars, "XAUUSD", "1m")
+        again = self.renderer.render(bars.copy(), "XAUUSD", "1m")
+        self.assertIs(first, again)
+        self.assertEqual(self.renderer.hits, 1)
+        self.assertEqual(len(self.renders), 1)
+
+        # A new bar, another timeframe or style means a fresh render
+        self.renderer.render(make_bars(61).iloc[1:], "XAUUSD", "1m")
+        self.renderer.render(bars, "XAUUSD", "5m")
+        self.renderer.render(bars, "XAUUSD", "1m", style="yahoo")
+        self.assertEqual(len(self.renders), 4)
+
+    def test_lru_eviction(self):
+        a, b, c = make_bars(10), make_bars(20), make_bars(30)
+        for df in (a, b, a, c): # `a` refreshed, so `b` is the one evicted
+            self.renderer.render(df, "XAUUSD", "1m")
+        self.assertEqual(len(self.renderer.cache), 2)
+        self.renderer.render(a, "XAUUSD", "1m")
+        self.renderer.render(b, "XAUUSD", "1m")
+        self.assertEqual(self.renders, [("XAUUSD", 10), ("XAUUSD", 20), ("XAUUSD", 30), ("XAUUSD", 20)])
+
+    def test_inflight_requests_share_a_render(self):
+        pending = Future()
+        self.renderer._submit = lambda df, symbol, style, kind: pending
+        bars = make_bars()
+        f1 = self.renderer.submit(bars, "XAUUSD", "1m")
+        f2 = self.renderer.submit(bars, "XAUUSD", "1m")
+        self.assertIs(f1, f2)
+        pending.set_result(b"png")
+        self.assertEqual(self.renderer.render(bars, "XAUUSD", "1m"), b"png")
+        self.assertEqual(self.renderer.inflight, {})
+
+
+class MockFixClient:
+    def __init__(self):
+        self.market_data_callbacks = []
+
+def make_bar_arrays(n, seed=4):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 1, size=n))
+    return {
+        'time': 1_700_000_000_000_000_000 + np.arange(n, dtype=np.int64) * 60_000_000_000,
+        'open': close - rng.random(n), 'high': close + rng.random(n) + 1,
+        'low': close - rng.random(n) - 1, 'close': close, 'volume': np.ones(n),
+    }
+
+class TestDownsampling(unittest.TestCase):
+    def test_parse_horizon(self):
+        self.assertEqual(parse_horizon("1d"), 86400)
+        self.assertEqual(parse_horizon("1W"), 7 * 86400)
+        self.assertEqual(parse_horizon("90m"), 5400)
+        self.assertIsNone(parse_horizon("soon"))
+
+    def test_lttb_keeps_endpoints_and_spikes(self):
+        x = np.arange(10_000)
+        y = np.sin(x / 500.0)
+        y[4321] = 50.0 # A spike must survive downsampling
+        idx = lttb(x, y, 200)
+        self.assertEqual(len(idx), 200)
+        self.assertEqual((idx[0], idx[-1]), (0, 9999))
+        self.assertTrue(np.all(np.diff(idx) > 0))
+        self.assertIn(4321, idx)
+        np.testing.assert_array_equal(lttb(x[:50], y[:50], 200), np.arange(50))
+
+    def test_ohlc_reaggregation(self):
+        bars = make_bar_arrays(10_080) # One week of 1m bars
+        out = downsample_bars(bars, 300)
+        self.assertLessEqual(len(out['time']), 300)
+        self.assertEqual(out['open'][0], bars['open'][0])
+        self.assertEqual(out['close'][-1], bars['close'][-1])
+        self.assertEqual(out['high'].max(), bars['high'].max())
+        self.assertEqual(out['low'].min(), bars['low'].min())
+        self.assertEqual(out['volume'].sum(), bars['volume'].sum())
+
+        small = make_bar_arrays(100)
+        self.assertIs(downsample_bars(small, 300), small)
+
+    def test_render_size_is_bounded(self):
+        for n in (1_000, 50_000):
+            df = downsample_frame(make_bar_arrays(n), 300, "lttb")
+            self.assertEqual(len(df), 300)
+            self.assertIsInstance(df.index, pd.DatetimeIndex)
+
+    def test_history_picks_a_covering_timeframe(self):
+        loader = DataLoader(MockFixClient())
+        loader.bar_retention = 1000 # 1m history covers < 1 day
+        bars = make_bar_arrays(3000) # ~2 days of ticks, one per minute
+        loader._get_store("41")
+        for t, price in zip(bars['time'].tolist(), bars['close'].tolist()):
+            loader.bars["41"].update(t, price) # Live: higher time frames outlive the 1m ring
+
+        hour = loader.get_history("41", 3600)
+        self.assertEqual(np.diff(hour['time'])[0], 60_000_000_000) # Served from 1m bars
+        self.assertEqual(len(hour['time']), 61)
+
+        day = loader.get_history("41", 86400)
+        self.assertEqual(np.diff(day['time'])[0], 300_000_000_000) # 1m too short, 5m covers it
+        self.assertGreaterEqual(day['time'][-1] - day['time'][0], 86400 * 10**9 - 300 * 10**9)
+        self.assertIsNone(loader.get_history("99", 3600))
+
+
+if __name__ == '__main__':
+    unittest.main()
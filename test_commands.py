@@ -0,0 +1,94 @@
+import unittest
+import threading
+import time
+from commands import CommandRegistry
+
+class RecordingNotifier:
+    def __init__(self):
+        self.messages = []
+        self.images = []
+
+    def notify(self, message, priority=None):
+        self.messages.append(message)
+
+    def notify_image(self, image, caption="", priority=None):
+        self.images.append((image, caption))
+
+class TestCommandRegistry(unittest.TestCase):
+    def setUp(self):
+        self.notifier = RecordingNotifier()
+        self.registry = CommandRegistry(self.notifier, workers=2)
+        self.release = threading.Event()
+        self.addCleanup(self.registry.shutdown)
+        self.addCleanup(self.release.set)
+
+        def slow(ctx):
+            ctx.reply("sync started")
+            if ctx.sleep(5):
+                return
+            ctx.reply("sync done")
+
+        def blocked(ctx):
+            self.release.wait(5)
+            ctx.reply("chart done")
+
+        self.registry.register("status", lambda ctx: ctx.reply(f"status {ctx.args}"), "Check connection", aliases=["statis"])
+        self.registry.register("sync", slow, "Manual State Sync", heavy=True, timeout=10)
+        self.registry.register("chart", blocked, "Generate Price Chart", heavy=True, timeout=0.2)
+
+    def test_light_commands_answer_while_heavy_runs(self):
+        future = self.registry.dispatch("/sync")
+        time.sleep(0.05)
+        t0 = time.perf_counter()
+        self.registry.dispatch("/status@my_bot now")
+        self.assertLess(time.perf_counter() - t0, 0.5)
+        self.assertEqual(self.notifier.messages, ["sync started", "status ['now']"])
+        self.assertFalse(future.done())
+
+        self.registry.dispatch("/sync")
+        self.assertIn("already running", self.notifier.messages[-1])
+
+        self.registry.dispatch("/cancel sync")
+        future.result(timeout=2)
+        self.assertEqual(self.notifier.messages[-1], "🛑 `/sync` cancelled.")
+        self.assertNotIn("sync done", self.notifier.messages)
+        self.assertEqual(self.registry.running, {})
+
+    def test_timeout_cancels_and_suppresses_late_reply(self):
+        future = self.registry.dispatch("/chart")
+        time.sleep(0.4)
+        self.assertIn("timed out", self.notifier.messages[-1])
+
+        # Still occupying a worker: a second /chart must not start until it returns
+        self.assertIsNone(self.registry.dispatch("/chart"))
+        self.assertIn("still stopping", self.notifier.messages[-1])
+        self.assertFalse(self.registry.cancel("chart"))
+
+        self.release.set()
+        future.result(timeout=2)
+        self.assertNotIn("chart done", self.notifier.messages)
+        self.assertNotIn("chart", self.registry.running)
+        self.assertIsNotNone(self.registry.dispatch("/chart"))
+
+    def test_aliases_unknown_and_help(self):
+        self.registry.dispatch("/statis")
+        self.registry.dispatch("/nope")
+        self.registry.dispatch("/cancel")
+        self.assertEqual(self.notifier.messages[0], "status []")
+        self.assertIn("UNKNOWN COMMAND", self.notifier.messages[1])
+        self.assertEqual(self.notifier.messages[2], "Nothing to cancel.")
+
+        help_text = self.registry.help_text()
+        self.assertIn("`/sync` - Manual State Sync", help_text)
+        self.assertIn("`/cancel`", help_text)
+
+    def test_handler_errors_are_reported(self):
+        def broken(ctx):
+            raise RuntimeError("boom")
+        self.registry.register("orders", broken)
+        self.registry.dispatch("/orders")
+        self.assertEqual(self.notifier.messages, ["❌ Error processing command: boom"])
+
+
+if __name__ == '__main__':
+    unittest.main()
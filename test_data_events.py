@@ -0,0 +1,88 @@
+import unittest
+import threading
+from data_loader import DataLoader, DirtySymbols
+
+class MockFixClient:
+    def __init__(self):
+        self.market_data_callbacks = []
+
+T0 = 1_700_000_100_000_000_000 # 5-minute aligned, so only 1m bars close below
+MIN = 60_000_000_000
+
+class TestDataEvents(unittest.TestCase):
+    def setUp(self):
+        self.loader = DataLoader(MockFixClient())
+        self.events = []
+        self.loader.subscribe("tick", lambda *a: self.events.append(("tick",) + a))
+        self.loader.subscribe("bar_closed", lambda *a: self.events.append(("bar_closed",) + a))
+        self.loader.subscribe("bar_updated", lambda *a: self.events.append(("bar_updated",) + a))
+
+    def test_tick_and_bar_events(self):
+        self.loader.on_tick("41", 100.0, timestamp=T0)
+        self.loader.on_tick("41", 101.0, timestamp=T0 + MIN // 2)
+        self.assertEqual([e[0] for e in self.events], ["tick", "bar_updated", "tick", "bar_updated"])
+        self.assertEqual(self.events[0], ("tick", "41", T0, 100.0))
+
+        self.events.clear()
+        self.loader.on_tick("41", 99.0, timestamp=T0 + MIN)
+        closed = [e for e in self.events if e[0] == "bar_closed"]
+        self.assertEqual(closed, [("bar_closed", "41", "1m", (T0, 100.0, 101.0, 100.0, 101.0, 2.0))])
+        self.assertEqual(self.events[-1], ("bar_updated", "41", T0 + MIN))
+
+    def test_handlers_can_read_bars(self):
+        seen = []
+        self.loader.subscribe("bar_closed", lambda sym, tf, bar: seen.append(self.loader.get_latest_bars(sym, timeframe=tf)))
+        for i in range(3):
+            self.loader.on_tick("41", 100.0 + i, timestamp=T0 + i * MIN)
+        self.assertEqual(len(seen), 2)
+        self.assertEqual(len(seen[-1]), 3)
+
+    def test_failing_handler_does_not_break_feed(self):
+        def boom(*_):
+            raise RuntimeError("boom")
+        self.loader.subscribe("tick", boom)
+        self.loader.on_tick("41", 100.0, timestamp=T0)
+        self.assertEqual(len(self.loader.ticks["41"]), 1)
+        self.assertIn(("bar_updated", "41", T0), self.events)
+
+    def test_one_shot_handler_unsubscribes_itself(self):
+        first = []
+        def once(*args):
+            self.loader.unsubscribe("tick", once)
+            first.append(args)
+        self.loader.subscribe("tick", once)
+        self.loader.on_tick("41", 100.0, timestamp=T0)
+        self.loader.on_tick("41", 101.0, timestamp=T0 + 1)
+        self.assertEqual(first, [("41", T0, 100.0)])
+        self.assertEqual(len([e for e in self.events if e[0] == "tick"]), 2) # Later handlers still ran
+
+    def test_default_timeframe_matches_event_names(self):
+        closed = []
+        self.loader.bar_types["41"] = "1min"
+        self.loader.subscribe("bar_closed", lambda sym, tf, bar: closed.append(tf == self.loader.default_timeframe(sym)))
+        self.loader.on_tick("41", 100.0, timestamp=T0)
+        self.loader.on_tick("41", 101.0, timestamp=T0 + MIN)
+        self.assertEqual(closed, [True])
+
+    def test_unknown_event(self):
+        with self.assertRaises(ValueError):
+            self.loader.subscribe("quote", print)
+
+
+class TestDirtySymbols(unittest.TestCase):
+    def test_coalesces_and_wakes(self):
+        dirty = DirtySymbols()
+        self.assertEqual(dirty.wait(timeout=0.01), set())
+
+        for _ in range(5):
+            dirty.mark("41", 0)
+        dirty.mark("1")
+        self.assertEqual(dirty.wait(timeout=0), {"41", "1"})
+        self.assertEqual(dirty.wait(timeout=0), set())
+
+        threading.Timer(0.05, dirty.mark, args=("41",)).start()
+        self.assertEqual(dirty.wait(timeout=5), {"41"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import time
+import simplefix
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from ctrader_fix_client import FixSession, CTraderFixClient
+from fix_encoder import FixClock, NewOrderEncoder
+
+T = 1718023599.9995 # 2024-06-10 12:46:39.999 UTC, last millisecond before a new second
+
+def simplefix_order(session, seq, timestamp, cl_ord_id, symbol_id, side, qty, order_type,
+                    price=None, stop_px=None, position_id=None):
+    """The NewOrderSingle exactly as submit_order built it with simplefix."""
+    msg = simplefix.FixMessage()
+    msg.append_pair(8, "FIX.4.4")
+    msg.append_pair(35, "D")
+    msg.append_pair(49, session.sender_comp_id)
+    msg.append_pair(56, session.target_comp_id)
+    msg.append_pair(50, session.sender_sub_id)
+    msg.append_pair(57, session.sender_sub_id)
+    msg.append_pair(34, seq)
+    msg.append_pair(52, timestamp)
+    msg.append_pair(11, cl_ord_id)
+    msg.append_pair(55, symbol_id)
+    msg.append_pair(54, side)
+    msg.append_pair(60, timestamp)
+    msg.append_pair(38, qty)
+    msg.append_pair(40, order_type)
+    msg.append_pair(59, "1")
+    if price:
+        msg.append_pair(44, price)
+    if stop_px:
+        msg.append_pair(99, stop_px)
+    if position_id:
+        msg.append_pair(721, position_id)
+    return msg.encode()
+
+class TestFixEncoder(unittest.TestCase):
+    def test_clock_matches_datetime(self):
+        clock = FixClock()
+        for t in (T, T + 0.0005, 0.0, 1e9 + 0.123456):
+            expected = datetime.fromtimestamp(t, timezone.utc).strftime("%Y%m%d-%H:%M:%S.%f")[:-3]
+            ts, ts_sum = clock.now(t)
+            self.assertEqual(ts, expected.encode())
+            self.assertEqual(ts_sum, sum(ts))
+
+    def test_byte_identical_to_simplefix(self):
+        session = FixSession("h", 0, "demo.ctrader.5211712", "cServer", "p", "TRADE", None)
+        encoder = session.order_encoder
+        ts = session.clock.now(T)[0].decode()
+        cases = [
+            (7, "ord1718023599999_1", "41", "1", 1000, "1"),
+            (8, "ord1718023599999_2", "41", "2", 1000, "3", None, "2034.51000"),
+            (9, "ord1718023599999_3", "1", "2", 0.01, "2", "1.10250", None, "12345678"),
+            (12345, "ord_x", 41, 1, "100000", 4, "2040.5", "2040.0", 987),
+        ]
+        for case in cases:
+            raw = encoder.encode(*case, t=T)
+            self.assertEqual(raw, simplefix_order(session, case[0], ts, *case[1:]), case)
+
+            parser = simplefix.FixParser()
+            parser.append_buffer(raw)
+            self.assertEqual(parser.get_message().get(35), b"D")
+
+    def test_submit_order_goes_through_the_template(self):
+        client = CTraderFixClient()
+        session = client.trade_session
+        session._send_raw = MagicMock()
+
+        client.submit_order("41", 1000, "1", order_type="2", price="2034.50", position_id="777")
+        raw = session._send_raw.call_args[0][0](5) # The writer thread supplies the sequence number
+
+        parser = simplefix.FixParser()
+        parser.append_buffer(raw)
+        msg = parser.get_message()
+        ts = msg.get(52).decode()
+        self.assertEqual(msg.get(60).decode(), ts)
+        self.assertEqual(raw, simplefix_order(session, 5, ts, msg.get(11).decode(), "41", "1", 1000, "2",
+                                              price="2034.50", position_id="777"))
+
+    def test_faster_than_simplefix(self):
+        session = FixSession("h", 0, "demo.ctrader.5211712", "cServer", "p", "TRADE", None)
+        encoder = session.order_encoder
+        ts = session.clock.now(T)[0].decode()
+        n = 2000
+
+        t0 = time.perf_counter()
+        for i in range(n):
+            simplefix_order(session, i, ts, f"ord_{i}", "41", "1", 1000, "2", price="2034.50")
+        reference = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for i in range(n):
+            encoder.encode(i, f"ord_{i}", "41", "1", 1000, "2", price="2034.50")
+        self.assertLess(time.perf_counter() - t0, reference)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import simplefix
+from ctrader_fix_client import FixSession
+from fix_scanner import frame_message, scan_market_data, market_data_entries
+
+def encode(msg_type, *pairs, seq=1):
+    msg = simplefix.FixMessage()
+    msg.append_pair(8, "FIX.4.4")
+    msg.append_pair(35, msg_type)
+    msg.append_pair(49, "cServer")
+    msg.append_pair(56, "demo.x.1")
+    msg.append_pair(34, seq)
+    msg.append_pair(52, "20240101-12:00:00.000")
+    for tag, value in pairs:
+        msg.append_pair(tag, value)
+    return msg.encode()
+
+SNAPSHOT = encode("W", (262, "req_41"), (55, "41"), (268, 2),
+                  (269, "0"), (270, "2034.51"), (271, "100000"), (269, "1"), (270, "2034.87"))
+INCREMENTAL = encode("X", (262, "req_41"), (268, 1),
+                     (279, "0"), (269, "1"), (278, "777"), (55, "41"), (270, "2035.10"), (271, "50000"), seq=2)
+HEARTBEAT = encode("0", seq=3)
+
+class ChunkedSocket:
+    """recv_into() hands out `data` in fixed-size chunks, splitting messages anywhere."""
+    def __init__(self, data, chunk):
+        self.data = data
+        self.chunk = chunk
+
+    def recv_into(self, view):
+        n = min(self.chunk, len(view), len(self.data))
+        view[:n] = self.data[:n]
+        self.data = self.data[n:]
+        return n
+
+class RecordingApp:
+    def __init__(self):
+        self.quotes = []
+        self.messages = []
+
+    def on_market_data(self, source, msg_type, entries):
+        self.quotes.append((msg_type, entries))
+
+    def on_message(self, source, msg):
+        self.messages.append(msg.get(35))
+
+    def on_disconnected(self, source, reason):
+        pass
+
+class TestFixScanner(unittest.TestCase):
+    def test_scan_matches_simplefix(self):
+        for raw in (SNAPSHOT, INCREMENTAL):
+            buf = bytearray(raw)
+            msg_type, body_start, body_end, end = frame_message(buf, 0, len(buf))
+            self.assertEqual(end, len(raw))
+            parser = simplefix.FixParser()
+            parser.append_buffer(raw)
+            msg = parser.get_message()
+            self.assertEqual(msg_type, msg.get(35))
+
+            entries = scan_market_data(buf, body_start, body_end)
+            self.assertEqual(entries, market_data_entries(msg))
+            self.assertEqual([e[1] for e in entries], [msg.get(269, n) for n in range(1, len(entries) + 1)])
+
+        buf = bytearray(SNAPSHOT)
+        _, body_start, body_end, _ = frame_message(buf, 0, len(buf))
+        self.assertEqual(scan_market_data(buf, body_start, body_end),
+                         [("41", b"0", 2034.51, 100000.0, None, None), ("41", b"1", 2034.87, None, None, None)])
+
+    def test_incomplete_message_waits_for_more(self):
+        buf = bytearray(SNAPSHOT)
+        self.assertIsNone(frame_message(buf, 0, len(buf) - 1))
+        self.assertIsNone(frame_message(buf, 0, 10))
+
+    def test_read_loop_fast_path_and_fallback(self):
+        for chunk in (7, 64, 4096):
+            app = RecordingApp()
+            session = FixSession("h", 0, "demo.x.1", "cServer", "p", "QUOTE", app)
+            session.RECV_BUFFER_SIZE = 32
+            session.buffer = bytearray(32) # Smaller than one message: must grow
+            session.sock = ChunkedSocket(b"junk" + SNAPSHOT + HEARTBEAT + INCREMENTAL, chunk)
+            session.running = True
+            session.read_loop()
+
+            self.assertEqual([q[0] for q in app.quotes], [b"W", b"X"], chunk)
+            self.assertEqual(app.quotes[1][1], [("41", b"1", 2035.10, 50000.0, b"0", "777")])
+            self.assertEqual(app.messages, [b"0"]) # Only the heartbeat built a FixMessage
+            self.assertEqual(session.filled, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import threading
+import time
+import simplefix
+from unittest.mock import patch
+from ctrader_fix_client import CTraderFixClient, FixSession
+
+def fix_message(msg_type):
+    msg = simplefix.FixMessage()
+    msg.append_pair(35, msg_type)
+    return msg
+
+def fake_connect(session, delay, reply="A"):
+    """Stand-in for FixSession.connect: the server answers our Logon after `delay` seconds."""
+    def connect():
+        session.connected = True
+        session.running = True
+        threading.Timer(delay, session.handle_message, args=(fix_message(reply),)).start()
+    return connect
+
+class TestParallelStartup(unittest.TestCase):
+    def setUp(self):
+        self.client = CTraderFixClient()
+        self.logons = []
+        self.t0 = time.monotonic()
+        self.both = threading.Event()
+
+        def on_logon(source):
+            self.logons.append((source, time.monotonic() - self.t0))
+            if len(self.logons) == 2:
+                self.both.set()
+        self.client.logon_callbacks.append(on_logon)
+
+    def test_sessions_connect_concurrently(self):
+        self.client.quote_session.connect = fake_connect(self.client.quote_session, 0.6)
+        self.client.trade_session.connect = fake_connect(self.client.trade_session, 0.2)
+        self.client.start()
+        elapsed = time.monotonic() - self.t0
+
+        self.assertTrue(self.client.quote_session.logged_on and self.client.trade_session.logged_on)
+        self.assertLess(elapsed, 0.75) # Not 0.6 + 0.2 back to back
+        self.assertTrue(self.both.wait(1)) # Callbacks run on the reader thread, just after logged_on flips
+        # TRADE's callback fired as soon as it logged on, before QUOTE was ready
+        self.assertEqual([source for source, _ in self.logons], ["TRADE", "QUOTE"])
+        self.assertLess(self.logons[0][1], 0.45)
+
+    def test_wait_for_logon_returns_on_logout(self):
+        session = self.client.trade_session
+        fake_connect(session, 0.1, reply="5")()
+        t0 = time.monotonic()
+        self.assertFalse(session.wait_for_logon(5))
+        self.assertLess(time.monotonic() - t0, 1)
+
+        session.logged_on = True
+        self.assertTrue(session.wait_for_logon(0))
+
+    def test_retry_stops_the_failed_attempt(self):
+        session = self.client.quote_session
+        calls = []
+        session.connect = lambda: (calls.append("connect"), setattr(session, "running", True))
+        session.stop = lambda: (calls.append("stop"), setattr(session, "running", False))
+        results = [False, True] # First attempt times out without a Logon, second logs on
+        session.wait_for_logon = lambda timeout: results.pop(0)
+        self.client.trade_session.connect = fake_connect(self.client.trade_session, 0.05)
+
+        with patch("ctrader_fix_client.time.sleep"):
+            self.client.start()
+        self.assertEqual(calls, ["connect", "stop", "connect"])
+
+    def test_app_without_on_logon(self):
+        class App: # Like fetch_symbols.FetcherApp
+            def __init__(self):
+                self.messages = []
+
+            def on_message(self, source, msg):
+                self.messages.append(msg.get(35))
+
+        app = App()
+        session = FixSession("h", 0, "demo.x.1", "cServer", "p", "TRADE", app)
+        session.handle_message(fix_message("A"))
+        self.assertEqual(app.messages, [b"A"])
+        self.assertTrue(session.logged_on)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+import threading
+import time
+import simplefix
+from ctrader_fix_client import FixSession
+
+class GatedSocket:
+    """sendall() records each write; the first one blocks until `gate` is set."""
+    def __init__(self):
+        self.writes = []
+        self.gate = threading.Event()
+        self.first = threading.Event()
+
+    def sendall(self, data):
+        if not self.first.is_set():
+            self.first.set()
+            self.gate.wait(5)
+        self.writes.append(data)
+
+def parse_all(data):
+    parser = simplefix.FixParser()
+    parser.append_buffer(data)
+    msgs = []
+    while True:
+        msg = parser.get_message()
+        if msg is None:
+            return msgs
+        msgs.append(msg)
+
+class TestFixWriter(unittest.TestCase):
+    def start_session(self):
+        session = FixSession("h", 0, "demo.x.1", "cServer", "p", "TRADE", None)
+        session.sock = sock = GatedSocket()
+        session.running = True
+        writer = threading.Thread(target=session.write_loop, args=(sock,), daemon=True)
+        writer.start()
+        return session, sock, writer
+
+    def heartbeat(self, session, test_req_id):
+        msg = simplefix.FixMessage()
+        msg.append_pair(112, test_req_id)
+        session._add_header(msg, "0") # Body first: the header still goes in front
+        session._send_raw(msg)
+
+    def test_sequenced_in_wire_order(self):
+        session, sock, writer = self.start_session()
+        sock.first.set() # No blocking
+        threads = [threading.Thread(target=self.heartbeat, args=(session, f"h{i}")) for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        session.send_new_order("ord_2", "41", "2", 1000, "2", price="2034.5")
+        while session.send_stats['sent'] < 6:
+            threading.Event().wait(0.01)
+
+        msgs = parse_all(b"".join(sock.writes))
+        self.assertEqual([int(m.get(34)) for m in msgs], list(range(1, 7)))
+        self.assertEqual([m.get(35) for m in msgs], [b"0"] * 5 + [b"D"])
+        for m in msgs:
+            self.assertEqual([tag for tag, _ in m.pairs[:8]],
+                             [b"8", b"9", b"35", b"49", b"56", b"50", b"57", b"34"])
+            self.assertEqual(m.pairs[8][0], b"52")
+        self.assertEqual(sorted(m.get(112) for m in msgs[:5]), [f"h{i}".encode() for i in range(5)])
+
+        stats = session.send_latency()
+        self.assertEqual(stats['sent'], 6)
+        self.assertLessEqual(stats['batches'], 6)
+        self.assertGreaterEqual(stats['max_ms'], stats['p50_ms'])
+        session.stop()
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+
+    def test_batch_is_one_sendall(self):
+        session, sock, writer = self.start_session()
+        self.heartbeat(session, "first")
+        self.assertTrue(sock.first.wait(5))
+        for i in range(10):
+            self.heartbeat(session, f"q{i}")
+        sock.gate.set()
+        while session.send_stats['sent'] < 11:
+            threading.Event().wait(0.01)
+
+        self.assertEqual(len(sock.writes), 2)
+        self.assertEqual(session.send_stats['max_batch'], 10)
+        self.assertEqual([int(m.get(34)) for m in parse_all(sock.writes[1])], list(range(2, 12)))
+        session.stop()
+
+    def test_reconnect_while_old_writer_waits(self):
+        session, old_sock, old_writer = self.start_session()
+        time.sleep(0.05) # Old writer is now waiting for messages
+
+        # A reconnect on a new socket while the old writer still waits
+        session.sock = new_sock = GatedSocket()
+        new_sock.first.set()
+        new_writer = threading.Thread(target=session.write_loop, args=(new_sock,), daemon=True)
+        new_writer.start()
+        time.sleep(0.05)
+
+        self.heartbeat(session, "logon")
+        deadline = time.monotonic() + 2
+        while not new_sock.writes and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(new_sock.writes), 1)
+        self.assertEqual(old_sock.writes, [])
+        old_writer.join(2)
+        self.assertFalse(old_writer.is_alive()) # Woken too, saw its socket was replaced and exited
+        session.stop()
+
+    def test_stop_drains_the_queue(self):
+        session, sock, writer = self.start_session()
+        self.heartbeat(session, "first")
+        self.assertTrue(sock.first.wait(5))
+        for i in range(3):
+            self.heartbeat(session, f"close{i}") # Queued right before stop(), like close_all_positions()
+        stopper = threading.Thread(target=session.stop)
+        stopper.start()
+        time.sleep(0.05)
+        self.assertTrue(stopper.is_alive()) # Waiting for the writer, not dropping
+        sock.gate.set()
+        stopper.join(5)
+
+        self.assertFalse(stopper.is_alive())
+        msgs = parse_all(b"".join(sock.writes))
+        self.assertEqual([m.get(112) for m in msgs], [b"first", b"close0", b"close1", b"close2"])
+        writer.join(5)
+        self.assertFalse(writer.is_alive())
+
+    def test_stop_reports_what_it_could_not_send(self):
+        session, sock, writer = self.start_session()
+        self.heartbeat(session, "stuck")
+        self.assertTrue(sock.first.wait(5))
+        for i in range(3):
+            self.heartbeat(session, f"close{i}")
+        with self.assertLogs("FixClient", "WARNING") as logs:
+            session.stop(drain_timeout=0.1)
+        self.assertIn("4 outbound message(s) not sent", logs.output[0])
+        self.assertEqual(len(session.outbound), 0)
+        sock.gate.set()
+        writer.join(5)
+        self.assertEqual(len(sock.writes), 1) # Only the batch already in sendall
+
+    def test_not_connected_drops(self):
+        session = FixSession("h", 0, "demo.x.1", "cServer", "p", "TRADE", None)
+        self.heartbeat(session, "x")
+        self.assertEqual(len(session.outbound), 0)
+        self.assertIsNone(session.send_latency()['p99_ms'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from http_pool import PooledSession
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+class TestPooledSession(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        http = PooledSession("test", pool_maxsize=2)
+        for _ in range(5):
+            self.assertEqual(http.get(f"{self.base}/getUpdates?offset=1").json(), {"ok": True})
+        http.post(f"{self.base}/sendMessage", json={"text": "hi"})
+
+        stats = http.connection_stats()
+        self.assertEqual(stats['getUpdates']['requests'], 5)
+        self.assertEqual(stats['getUpdates']['new_connections'], 1)
+        self.assertEqual(stats['getUpdates']['reused'], 4)
+        self.assertIsNotNone(stats['getUpdates']['saved_ms'])
+        # Same host: the message rides the existing connection
+        self.assertEqual(stats['sendMessage']['new_connections'], 0)
+        http.close()
+
+    def test_per_endpoint_timeouts(self):
+        http = PooledSession("test", timeouts={"sendPhoto": 20, "chat/completions": 60}, default_timeout=7)
+        self.assertEqual(http.timeout_for("sendPhoto"), 20)
+        self.assertEqual(http.timeout_for("getUpdates"), 7)
+
+        seen = []
+        original = http.session.request
+        http.session.request = lambda method, url, **kw: seen.append(kw['timeout']) or original(method, url, **kw)
+        http.post(f"{self.base}/v1/chat/completions", endpoint="chat/completions", json={})
+        http.post(f"{self.base}/sendPhoto", timeout=3)
+        self.assertEqual(seen, [60, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import numpy as np
+import pandas as pd
+import indicators
+from indicators import Indicators, IndicatorEngine
+
+try:
+    indicators.load_pandas_ta()
+    HAS_PANDAS_TA = True
+except ImportError:
+    HAS_PANDAS_TA = False
+
+class TestIndicatorEngine(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        closes = 2000 + np.cumsum(rng.normal(0, 1.5, size=300))
+        index = pd.date_range("2024-01-01", periods=300, freq="1min")
+        self.df = pd.DataFrame({'close': closes}, index=index)
+        self.reference = Indicators.add_all_indicators(self.df)
+
+    def assert_matches(self, values, row):
+        for key, value in values.items():
+            expected = row[key]
+            if value is None or pd.isna(expected):
+                self.assertTrue(value is None and pd.isna(expected), f"{key}: {value} vs {expected}")
+            else:
+                self.assertAlmostEqual(value, expected, places=7, msg=key)
+
+    @unittest.skipUnless(HAS_PANDAS_TA, "pandas_ta not installed (optional cross-check backend)")
+    def test_matches_pandas_ta_bar_by_bar(self):
+        reference = Indicators.add_all_indicators(self.df, backend="pandas_ta")
+        engine = IndicatorEngine()
+        for i, close in enumerate(self.df['close']):
+            values = engine.update(close)
+            self.assert_matches(values, reference.iloc[i])
+
+    def test_known_values_on_a_linear_series(self):
+        # Closes 1, 2, 3, ...: no losses (RSI 100), Bollinger over 1..20 (mean 10.5,
+        # population std sqrt((20^2 - 1) / 12)), SMA-seeded EMAs lag a unit slope by
+        # (n - 1) / 2 exactly (MACD 12.5 - 5.5 = 7, signal 7, histogram 0), slope 1
+        engine = IndicatorEngine()
+        for close in range(1, 20):
+            values = engine.update(float(close))
+        self.assertIsNone(values['BBM_20_2.0'])
+        values = engine.update(20.0)
+        self.assertEqual(values['RSI_14'], 100.0)
+        self.assertAlmostEqual(values['BBM_20_2.0'], 10.5)
+        self.assertAlmostEqual(values['BBU_20_2.0'], 10.5 + 2 * np.sqrt(399 / 12))
+        self.assertAlmostEqual(values['LRm_20'], 1.0)
+        self.assertIsNone(values['MACD_12_26_9'])
+
+        for close in range(21, 35):
+            values = engine.update(float(close))
+        self.assertAlmostEqual(values['MACD_12_26_9'], 7.0)
+        self.assertAlmostEqual(values['MACDs_12_26_9'], 7.0)
+        self.assertAlmostEqual(values['MACDh_12_26_9'], 0.0)
+        self.assertAlmostEqual(values['BBM_20_2.0'], 24.5)
+
+    def test_provisional_forming_bar(self):
+        engine = IndicatorEngine()
+        for close in self.df['close'].iloc[:-1]:
+            engine.update(close)
+
+        state_before = (engine.rsi.avg_gain, engine.bb.mean, engine.macd.signal.value)
+        values = engine.evaluate(self.df['close'].iloc[-1])
+        self.assert_matches(values, self.reference.iloc[-1])
+
+        # Evaluating the forming bar must not advance the state
+        self.assertEqual(state_before, (engine.rsi.avg_gain, engine.bb.mean, engine.macd.signal.value))
+        self.assertNotEqual(engine.evaluate(1.0)['RSI_14'], values['RSI_14'])
+
+    def test_sync_consumes_each_closed_bar_once(self):
+        engine = IndicatorEngine()
+        # Sliding 50-bar windows, as returned by DataLoader.get_latest_bars
+        for end in range(50, len(self.df) + 1):
+            values = engine.sync(self.df.iloc[end - 50:end])
+        self.assert_matches(values, self.reference.iloc[-1])
+
+    def test_gap_larger_than_frame_reseeds(self):
+        engine = IndicatorEngine()
+        engine.sync(self.df.iloc[:50])
+        # 120 bars close while nobody looks (e.g. market-closed window), more than the 50-bar frame holds
+        frame = self.df.iloc[170:220]
+        values = engine.sync(frame)
+        self.assert_matches(values, Indicators.add_all_indicators(frame).iloc[-1])
+        self.assertEqual(engine.last_time, frame.index[-2])
+
+        # Contiguous frames afterwards keep streaming from there
+        values = engine.sync(self.df.iloc[171:221])
+        self.assert_matches(values, Indicators.add_all_indicators(self.df.iloc[170:221]).iloc[-1])
+
+    def test_check_signals_reads_engine_values(self):
+        engine = IndicatorEngine()
+        values = engine.sync(self.df)
+        from_engine = Indicators.check_signals(values)
+        from_frame = Indicators.check_signals(self.reference)
+        self.assertEqual(from_engine, from_frame)
+
+if __name__ == '__main__':
+    unittest.main()
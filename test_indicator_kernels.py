@@ -0,0 +1,95 @@
+import unittest
+import numpy as np
+import pandas as pd
+import indicators
+from indicators import Indicators
+
+try:
+    indicators.load_pandas_ta()
+    HAS_PANDAS_TA = True
+except ImportError:
+    HAS_PANDAS_TA = False
+
+COLUMNS = ['RSI_14', 'BBL_20_2.0', 'BBM_20_2.0', 'BBU_20_2.0', 'BBB_20_2.0', 'BBP_20_2.0',
+           'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9', 'LRm_20']
+
+def make_frame(n, seed=5):
+    rng = np.random.default_rng(seed)
+    closes = 2000 + np.cumsum(rng.normal(0, 1.5, size=n))
+    return pd.DataFrame({'close': closes}, index=pd.date_range("2024-01-01", periods=n, freq="1min"))
+
+class TestIndicatorKernels(unittest.TestCase):
+    @unittest.skipUnless(HAS_PANDAS_TA, "pandas_ta not installed (optional cross-check backend)")
+    def test_numpy_matches_pandas_ta(self):
+        for n in [60, 500]:
+            df = make_frame(n)
+            fast = Indicators.add_all_indicators(df, backend="numpy")
+            ref = Indicators.add_all_indicators(df, backend="pandas_ta")
+            for col in COLUMNS:
+                np.testing.assert_allclose(fast[col].to_numpy(), ref[col].to_numpy(), rtol=1e-9, atol=1e-9, err_msg=f"{col} (n={n})")
+
+    def test_short_frames_have_nan_columns(self):
+        df = Indicators.add_all_indicators(make_frame(10))
+        self.assertTrue(df['RSI_14'].isna().all())
+        self.assertTrue(df['MACDs_12_26_9'].isna().all())
+        self.assertEqual(Indicators.check_signals(df)['rsi_oversold'], False)
+
+    def test_linreg_slope(self):
+        y = 3.0 * np.arange(30) + 7.0
+        slopes = indicators.linreg_slope(y, 20)
+        self.assertTrue(np.isnan(slopes[:19]).all())
+        np.testing.assert_allclose(slopes[19:], 3.0)
+
+        noisy = make_frame(100)['close'].to_numpy()
+        expected = np.polyfit(np.arange(20), noisy[-20:], 1)[0]
+        self.assertAlmostEqual(indicators.linreg_slope(noisy, 20)[-1], expected, places=9)
+
+    def test_input_frame_is_not_modified(self):
+        df = make_frame(50)
+        Indicators.add_all_indicators(df)
+        self.assertEqual(list(df.columns), ['close'])
+
+class TestRollingLinReg(unittest.TestCase):
+    def polyfit(self, y):
+        x = np.arange(len(y))
+        m, c = np.polyfit(x, y, 1)
+        r2 = np.corrcoef(x, y)[0, 1] ** 2
+        return m, c, r2
+
+    def test_batch_matches_polyfit(self):
+        closes = make_frame(200)['close'].to_numpy()
+        slope, intercept, r2 = indicators.linreg(closes, 20)
+        self.assertTrue(np.isnan(slope[:19]).all())
+        for end in [20, 57, 200]:
+            m, c, r = self.polyfit(closes[end - 20:end])
+            np.testing.assert_allclose([slope[end - 1], intercept[end - 1], r2[end - 1]], [m, c, r], rtol=1e-7)
+
+    def test_streaming_matches_batch(self):
+        closes = make_frame(3000, seed=9)['close'].to_numpy()
+        slope, intercept, r2 = indicators.linreg(closes, 20)
+        reg = indicators.RollingLinReg(20, resync=500)
+        for i, close in enumerate(closes):
+            if i >= 19:
+                peeked = reg.peek(close)
+            fit = reg.update(close)
+            if i < 19:
+                self.assertIsNone(fit)
+                continue
+            np.testing.assert_allclose(peeked, fit, rtol=1e-9)
+            np.testing.assert_allclose(fit, [slope[i], intercept[i], r2[i]], rtol=1e-6, atol=1e-9)
+
+    def test_flat_series(self):
+        reg = indicators.RollingLinReg(5)
+        for _ in range(10):
+            fit = reg.update(42.0)
+        self.assertEqual(fit, (0.0, 42.0, 1.0))
+
+    def test_get_trend_slope(self):
+        df = make_frame(100)
+        expected = np.polyfit(np.arange(20), df['close'].to_numpy()[-20:], 1)[0]
+        self.assertAlmostEqual(Indicators.get_trend_slope(df), expected, places=9)
+        self.assertEqual(Indicators.get_trend_slope(df.iloc[:5]), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
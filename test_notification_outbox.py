@@ -0,0 +1,143 @@
+import unittest
+import threading
+import time
+from notification import NotificationManager, NotificationProvider, CRITICAL, INFO
+
+class SlowProvider(NotificationProvider):
+    """Blocks every send until `gate` is set, like a provider stuck in a 429 back-off."""
+    def __init__(self):
+        self.gate = threading.Event()
+        self.messages = []
+        self.images = []
+
+    def send_message(self, message):
+        self.gate.wait(5)
+        self.messages.append(message)
+
+    def send_image(self, image_path, caption=""):
+        self.gate.wait(5)
+        self.images.append((image_path, caption))
+
+class FailingProvider(SlowProvider):
+    def send_message(self, message):
+        raise RuntimeError("network down")
+
+class TestNotificationOutbox(unittest.TestCase):
+    def make(self, **kwargs):
+        manager = NotificationManager(**kwargs)
+        provider = SlowProvider()
+        manager.add_provider(provider)
+        self.addCleanup(manager.stop, 1)
+        self.addCleanup(provider.gate.set)
+        return manager, provider
+
+    def test_notify_does_not_block(self):
+        manager, provider = self.make(queue_size=10)
+        t0 = time.perf_counter()
+        for i in range(5):
+            manager.notify(f"fill {i}")
+        self.assertLess(time.perf_counter() - t0, 0.5)
+
+        provider.gate.set()
+        self.assertTrue(manager.flush(timeout=5))
+        self.assertEqual(provider.messages, [f"fill {i}" for i in range(5)])
+        metrics = manager.metrics()['SlowProvider']
+        self.assertEqual((metrics['sent'], metrics['depth']), (5, 0))
+
+    def test_coalesces_identical_messages(self):
+        manager, provider = self.make(queue_size=10, coalesce=True)
+        manager.notify("first") # Taken by the worker, blocked on the gate
+        time.sleep(0.1)
+        for _ in range(3):
+            manager.notify("⚠️ disconnected")
+        manager.notify_image("chart.png", "Chart")
+        manager.notify_image("chart.png", "Chart")
+
+        provider.gate.set()
+        manager.flush(timeout=5)
+        self.assertEqual(provider.messages, ["first", "⚠️ disconnected\n(x3)"])
+        self.assertEqual(provider.images, [("chart.png", "Chart")])
+        self.assertEqual(manager.metrics()['SlowProvider']['coalesced'], 3)
+
+    def test_overflow_policies(self):
+        for overflow, expected in [("drop_oldest", ["busy", "m3", "m4"]), ("drop_newest", ["busy", "m0", "m1"])]:
+            manager, provider = self.make(queue_size=2, overflow=overflow, coalesce=False)
+            manager.notify("busy")
+            time.sleep(0.1)
+            for i in range(5):
+                manager.notify(f"m{i}")
+            metrics = manager.metrics()['SlowProvider']
+            self.assertEqual((metrics['depth'], metrics['max_depth'], metrics['dropped']), (2, 2, 3))
+
+            provider.gate.set()
+            manager.flush(timeout=5)
+            self.assertEqual(provider.messages, expected, overflow)
+
+    def test_flush_timeout_and_failures(self):
+        manager, provider = self.make()
+        manager.notify("stuck")
+        self.assertFalse(manager.flush(timeout=0.1))
+
+        failing = FailingProvider()
+        manager.add_provider(failing)
+        manager.notify("x")
+        provider.gate.set()
+        self.assertTrue(manager.flush(timeout=5))
+        self.assertEqual(manager.metrics()['FailingProvider']['failed'], 1)
+
+    def test_critical_jumps_the_queue(self):
+        manager, provider = self.make(digest_window=0)
+        manager.notify("busy")
+        time.sleep(0.1)
+        manager.notify("signal", priority=INFO)
+        manager.notify("reply")
+        manager.notify("FILLED", priority=CRITICAL)
+        provider.gate.set()
+        manager.flush(timeout=5)
+        self.assertEqual(provider.messages, ["busy", "FILLED", "reply", "signal"])
+
+    def test_info_bursts_become_digests(self):
+        manager, provider = self.make(digest_window=0.3)
+        provider.gate.set()
+        manager.notify("accepted 1", priority=INFO)
+        time.sleep(0.1) # First one goes out immediately
+        for i in range(2, 6):
+            manager.notify(f"accepted {i}", priority=INFO)
+        manager.notify("FILLED", priority=CRITICAL)
+
+        time.sleep(0.1) # Inside the window: only the critical message is sent
+        self.assertEqual(provider.messages, ["accepted 1", "FILLED"])
+
+        time.sleep(0.4)
+        self.assertEqual(len(provider.messages), 3)
+        digest = provider.messages[-1]
+        self.assertTrue(digest.startswith("📋 **DIGEST** (4 updates)"))
+        self.assertIn("accepted 2\n\naccepted 3", digest)
+        self.assertEqual(manager.metrics()['SlowProvider']['digested'], 4)
+
+    def test_flush_sends_pending_digest(self):
+        manager, provider = self.make(digest_window=60)
+        provider.gate.set()
+        manager.notify("a", priority=INFO)
+        time.sleep(0.1)
+        manager.notify("b", priority=INFO) # Held back by the 60s window...
+        time.sleep(0.1)
+        self.assertEqual(provider.messages, ["a"])
+        self.assertTrue(manager.flush(timeout=2)) # ...until flushed
+        self.assertEqual(provider.messages, ["a", "b"])
+
+    def test_overflow_never_evicts_more_important(self):
+        manager, provider = self.make(queue_size=2, digest_window=0, coalesce=False)
+        manager.notify("busy")
+        time.sleep(0.1)
+        manager.notify("fill 1", priority=CRITICAL)
+        manager.notify("signal", priority=INFO)
+        manager.notify("fill 2", priority=CRITICAL) # Evicts the signal
+        manager.notify("signal 2", priority=INFO) # Rejected
+        provider.gate.set()
+        manager.flush(timeout=5)
+        self.assertEqual(provider.messages, ["busy", "fill 1", "fill 2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+import math
+import time
+import numpy as np
+from unittest.mock import MagicMock, patch
+from ctrader_fix_client import CTraderFixClient
+from order_book import TopOfBook, LatestPrices, OrderBook
+from strategy import Strategy
+
+class TestTopOfBook(unittest.TestCase):
+    def test_bid_ask_and_mid(self):
+        book = TopOfBook(capacity=1)
+        book.update("41", b"0", 2034.5, 100000.0, 1)
+        self.assertEqual(book.get("41", "price"), 2034.5) # One side only: that side
+        book.update("41", b"1", 2034.9, None, 2)
+        book.update("1", b"1", 1.1002, 5.0, 3) # Second symbol grows the arrays
+
+        quote = book.quote("41")
+        self.assertEqual((quote['bid'], quote['ask'], quote['bid_size']), (2034.5, 2034.9, 100000.0))
+        self.assertTrue(math.isnan(quote['ask_size']))
+        self.assertAlmostEqual(quote['spread'], 0.4)
+        self.assertAlmostEqual(quote['price'], 2034.7)
+        self.assertEqual(quote['time'], 2)
+        self.assertEqual(book.get("1", "ask"), 1.1002)
+        self.assertIsNone(book.get("1", "bid"))
+        self.assertIsNone(book.quote("99"))
+
+    def test_latest_prices_mapping(self):
+        prices = LatestPrices(TopOfBook())
+        self.assertNotIn("41", prices)
+        self.assertEqual(prices.get("41", "Waiting..."), "Waiting...")
+        prices["41"] = 2001.0
+        self.assertEqual(prices["41"], 2001.0)
+        self.assertEqual(dict(prices), {"41": 2001.0})
+        del prices["41"]
+        self.assertEqual(len(prices), 0)
+
+
+class TestClientQuotes(unittest.TestCase):
+    def test_entries_update_book_and_callbacks(self):
+        client = CTraderFixClient()
+        ticks = []
+        client.market_data_callbacks.append(lambda *args, **kw: ticks.append((args, kw)))
+
+        client.market_depth = 1
+        client.on_market_data("QUOTE", b"W", [("41", b"0", 2034.5, 1e5, None, None), ("41", b"1", 2034.9, 2e5, None, None)])
+        client.on_market_data("QUOTE", b"X", [("41", b"1", None, None, b"2", None), ("1", b"0", 1.1, 1.0, b"0", None)]) # Price-less delete skipped
+
+        self.assertEqual(len(ticks), 2) # One per touched symbol and message
+        (symbol, price), kw = ticks[0]
+        self.assertEqual((symbol, kw['bid'], kw['ask']), ("41", 2034.5, 2034.9))
+        self.assertAlmostEqual(price, 2034.7)
+        self.assertEqual(ticks[1][1]['ask'], None)
+        self.assertAlmostEqual(client.latest_prices["41"], 2034.7)
+        self.assertEqual(client.top_of_book.quote("41")['ask_size'], 2e5)
+
+
+class TestOrderBook(unittest.TestCase):
+    def test_levels_aggregate_by_price(self):
+        book = OrderBook()
+        book.apply(None, b"0", "b1", 99.0, 5.0)
+        book.apply(None, b"0", "b2", 100.0, 1.0)
+        book.apply(None, b"0", "b3", 100.0, 2.0) # Same level, second entry
+        book.apply(None, b"1", "a1", 101.0, 4.0)
+        book.apply(None, b"1", "a2", 102.0, 6.0)
+
+        self.assertEqual(book.best_bid(), (100.0, 3.0))
+        self.assertEqual(book.best_ask(), (101.0, 4.0))
+        self.assertEqual(book.spread(), 1.0)
+        self.assertEqual(book.bids.levels(5), [(100.0, 3.0), (99.0, 5.0)])
+        self.assertEqual(book.asks.depth(1), 4.0)
+        self.assertAlmostEqual(book.imbalance(2), (8.0 - 10.0) / 18.0)
+
+        book.apply(b"2", None, "b2", None, None) # Delete by MDEntryID only
+        self.assertEqual(book.best_bid(), (100.0, 2.0))
+        book.apply(b"2", None, "b3", None, None)
+        self.assertEqual(book.best_bid(), (99.0, 5.0))
+        book.apply(b"1", None, "a1", None, 7.0) # Change: size only, keeps side and price
+        self.assertEqual(book.best_ask(), (101.0, 7.0))
+        book.apply(b"1", None, "a2", 103.0, None) # Change: price only, keeps side and size
+        self.assertEqual(book.asks.levels(5), [(101.0, 7.0), (103.0, 6.0)])
+        self.assertAlmostEqual(book.imbalance(2), (5.0 - 13.0) / 18.0)
+        book.apply(b"2", None, "unknown", None, None)
+        self.assertEqual(len(book.bids), 1)
+
+    def test_matches_brute_force_and_keeps_up(self):
+        rng = np.random.default_rng(7)
+        book = OrderBook()
+        live = {} # entry id -> (side, price, size)
+        updates = []
+        for i in range(50_000):
+            if live and rng.random() < 0.45:
+                entry_id = list(live)[int(rng.integers(len(live)))] if len(live) < 64 else next(iter(live))
+                updates.append((b"2", None, entry_id, None, None))
+                del live[entry_id]
+            else:
+                side = b"0" if rng.random() < 0.5 else b"1"
+                price = round(2000 + (-1 if side == b"0" else 1) * rng.integers(1, 200) * 0.01, 2)
+                size = float(rng.integers(1, 10))
+                updates.append((b"0", side, str(i), price, size))
+                live[str(i)] = (side, price, size)
+
+        t0 = time.perf_counter()
+        for update in updates:
+            book.apply(*update)
+        rate = len(updates) / (time.perf_counter() - t0)
+        self.assertGreater(rate, 20_000) # Entries per second
+
+        bids = {}
+        for side, price, size in live.values():
+            if side == b"0":
+                bids[price] = bids.get(price, 0.0) + size
+        best = max(bids)
+        self.assertEqual(book.best_bid()[0], best)
+        self.assertAlmostEqual(book.best_bid()[1], bids[best])
+        self.assertAlmostEqual(book.bids.depth(5), sum(bids[p] for p in sorted(bids, reverse=True)[:5]))
+
+
+class TestClientDepth(unittest.TestCase):
+    def test_snapshot_then_incremental(self):
+        client = CTraderFixClient()
+        client.market_depth = 0
+        ticks = []
+        client.market_data_callbacks.append(lambda *args, **kw: ticks.append(kw))
+
+        client.on_market_data("QUOTE", b"W", [
+            ("41", b"0", 2034.4, 1.0, None, "b1"), ("41", b"0", 2034.5, 2.0, None, "b2"),
+            ("41", b"1", 2034.9, 3.0, None, "a1"),
+        ])
+        self.assertEqual((ticks[-1]['bid'], ticks[-1]['ask']), (2034.5, 2034.9))
+
+        client.on_market_data("QUOTE", b"X", [
+            ("41", None, None, None, b"2", "b2"), ("41", b"1", 2034.8, 5.0, b"0", "a2"),
+        ])
+        self.assertEqual((ticks[-1]['bid'], ticks[-1]['ask']), (2034.4, 2034.8))
+        stats = client.get_book_stats("41", levels=5)
+        self.assertEqual((stats['bid_depth'], stats['ask_depth']), (1.0, 8.0))
+        self.assertAlmostEqual(stats['imbalance'], -7.0 / 9.0)
+
+        client.on_market_data("QUOTE", b"W", [("41", b"0", 2035.0, 1.0, None, "b9")]) # Snapshot replaces the book
+        self.assertEqual(client.get_book_stats("41")['ask_levels'], 0)
+        self.assertIsNone(client.get_book_stats("99"))
+
+    def test_only_top_of_book_changes_publish(self):
+        client = CTraderFixClient()
+        client.market_depth = 0
+        ticks = []
+        client.market_data_callbacks.append(lambda *args, **kw: ticks.append((args, kw)))
+        client.on_market_data("QUOTE", b"W", [("41", b"0", 100.0, 1.0, None, "b1"), ("41", b"1", 101.0, 1.0, None, "a1")])
+        self.assertEqual(len(ticks), 1)
+
+        client.on_market_data("QUOTE", b"X", [("41", b"0", 99.5, 3.0, b"0", "b2")]) # New level below the best bid
+        client.on_market_data("QUOTE", b"X", [("41", None, None, 4.0, b"1", "b1")]) # Size change at the best bid
+        client.on_market_data("QUOTE", b"X", [("41", None, None, None, b"2", "b2")])
+        self.assertEqual(len(ticks), 1)
+        self.assertEqual(client.get_book_stats("41")['bid_depth'], 4.0) # The book itself did update
+
+        client.on_market_data("QUOTE", b"X", [("41", b"1", 100.8, 1.0, b"0", "a2")]) # New best ask
+        self.assertEqual(len(ticks), 2)
+        self.assertEqual((ticks[-1][0], ticks[-1][1]['ask']), (("41", 100.4), 100.8))
+
+    def test_strategy_skips_signals_against_the_book(self):
+        client = CTraderFixClient()
+        client.order_books["41"] = book = OrderBook()
+        book.apply(None, b"0", "b1", 99.0, 1.0)
+        book.apply(None, b"1", "a1", 101.0, 9.0) # Asks dominate: imbalance -0.8
+
+        strategy = Strategy(client, MagicMock())
+        self.assertAlmostEqual(strategy.book_imbalance("41"), -0.8)
+        self.assertIsNone(Strategy(MagicMock(), MagicMock()).book_imbalance("41"))
+
+        with patch("strategy.Indicators.check_signals", return_value={'rsi_oversold': True, 'below_bb': True}), \
+             patch.object(strategy, "update_llm_bias"), patch("strategy.IndicatorEngine") as engine:
+            engine.return_value.sync.return_value = {}
+            df = MagicMock()
+            df.empty = False
+            with patch("config.BOOK_IMBALANCE_MIN", 0.5):
+                self.assertIsNone(strategy.check_signal(df, "41"))
+            signal = strategy.check_signal(df, "41")
+        self.assertEqual(signal['action'], "BUY_CALL")
+        self.assertIn("Book -0.80", signal['reason'])
+
+
+if __name__ == '__main__':
+    unittest.main()
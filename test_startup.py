@@ -0,0 +1,39 @@
+import unittest
+import os
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+from startup_timer import StartupTimer
+
+HEAVY_MODULES = ("pandas", "requests", "matplotlib", "mplfinance", "pandas_ta_classic", "charting")
+
+class TestStartupTimer(unittest.TestCase):
+    def test_marks_once_and_reports_when_complete(self):
+        timer = StartupTimer(time.perf_counter() - 1.0, marks=("logon", "first_tick"))
+        with patch("startup_timer.logger") as log:
+            self.assertTrue(timer.mark("logon"))
+            self.assertFalse(timer.mark("logon"))
+            self.assertGreaterEqual(timer.elapsed("logon"), 1.0)
+            self.assertIn("first_tick n/a", timer.report())
+            self.assertEqual(log.info.call_count, 1)
+
+            timer.mark("first_tick")
+            self.assertTrue(log.info.call_args[0][0].startswith("Startup timings: logon 1."))
+            timer.mark("extra")
+            self.assertEqual(sum("timings" in c[0][0] for c in log.info.call_args_list), 1)
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_importing_main_skips_heavy_dependencies(self):
+        env = dict(os.environ, CT_SENDER_COMP_ID=os.environ.get("CT_SENDER_COMP_ID", "demo.x.1"),
+                   CT_PASSWORD=os.environ.get("CT_PASSWORD", "p"))
+        code = f"import sys, main; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
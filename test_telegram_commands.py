@@ -0,0 +1,156 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import requests
+from notification import TelegramProvider
+
+CHAT_ID = "777"
+
+class FakeBotAPI:
+    """Local stand-in for api.telegram.org: getUpdates honours offset and long-poll timeout."""
+    def __init__(self):
+        self.updates = []
+        self.cond = threading.Condition()
+        self.polls = 0
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def reply(self, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                offset = int(query.get("offset", ["0"])[0])
+                deadline = time.monotonic() + int(query.get("timeout", ["0"])[0])
+                with api.cond:
+                    api.polls += 1
+                    while True:
+                        pending = [u for u in api.updates if u["update_id"] >= offset]
+                        remaining = deadline - time.monotonic()
+                        if pending or remaining <= 0:
+                            break
+                        api.cond.wait(remaining)
+                self.reply({"ok": True, "result": pending})
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.reply({"ok": True, "result": True})
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def push(self, text, chat_id=CHAT_ID):
+        with self.cond:
+            update_id = 1000 + len(self.updates)
+            self.updates.append({"update_id": update_id, "message": {"chat": {"id": int(chat_id)}, "text": text}})
+            self.cond.notify_all()
+        return update_id
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def update(update_id, text, chat_id=CHAT_ID):
+    return {"update_id": update_id, "message": {"chat": {"id": int(chat_id)}, "text": text}}
+
+
+class TestTelegramLongPoll(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeBotAPI()
+        self.dir = tempfile.mkdtemp()
+        self.offset_file = os.path.join(self.dir, "state", "offset")
+
+    def tearDown(self):
+        self.api.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def provider(self, poll_timeout=5):
+        return TelegramProvider("TOKEN", CHAT_ID, mode="longpoll", poll_timeout=poll_timeout,
+                                offset_file=self.offset_file, api_url=self.api.url)
+
+    def test_long_poll_returns_as_soon_as_command_arrives(self):
+        provider = self.provider()
+        self.assertTrue(provider.blocks_for_commands)
+        threading.Timer(0.3, self.api.push, args=("/status",)).start()
+
+        t0 = time.monotonic()
+        self.assertEqual(provider.check_for_commands(), ["/status"])
+        self.assertLess(time.monotonic() - t0, 2)
+        self.assertEqual(self.api.polls, 1)
+
+    def test_empty_poll_waits_server_side(self):
+        provider = self.provider(poll_timeout=1)
+        t0 = time.monotonic()
+        self.assertEqual(provider.check_for_commands(), [])
+        self.assertGreaterEqual(time.monotonic() - t0, 0.9)
+
+    def test_offset_survives_restart(self):
+        self.api.push("/orders")
+        self.api.push("/chart", chat_id="666") # Unauthorized chat, skipped but acknowledged
+        last = self.api.push("/positions")
+        self.assertEqual(self.provider(poll_timeout=0).check_for_commands(), ["/orders", "/positions"])
+        with open(self.offset_file) as f:
+            self.assertEqual(int(f.read()), last)
+
+        restarted = self.provider(poll_timeout=0)
+        self.assertEqual(restarted.last_update_id, last)
+        self.assertEqual(restarted.check_for_commands(), [])
+        self.api.push("/sync")
+        self.assertEqual(restarted.check_for_commands(), ["/sync"])
+
+
+class TestTelegramWebhook(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.api = FakeBotAPI() # Only answers setMyCommands here
+        self.provider = TelegramProvider(
+            "TOKEN", CHAT_ID, mode="webhook", poll_timeout=2, offset_file=os.path.join(self.dir, "offset"),
+            api_url=self.api.url, webhook={"host": "127.0.0.1", "port": 0, "path": "/hook", "secret": "s3cret"})
+        host, port = self.provider.receiver.address
+        self.hook = f"http://{host}:{port}/hook"
+
+    def tearDown(self):
+        self.provider.close()
+        self.api.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def post(self, payload, secret="s3cret"):
+        return requests.post(self.hook, json=payload, headers={"X-Telegram-Bot-Api-Secret-Token": secret}, timeout=5)
+
+    def test_webhook_delivers_commands(self):
+        threading.Timer(0.2, self.post, args=(update(5, "/status"),)).start()
+        t0 = time.monotonic()
+        self.assertEqual(self.provider.check_for_commands(), ["/status"])
+        self.assertLess(time.monotonic() - t0, 1.5)
+
+        # Redelivery of an already handled update is ignored
+        self.assertEqual(self.post(update(5, "/status")).status_code, 200)
+        self.assertEqual(self.post(update(6, "/orders")).status_code, 200)
+        self.assertEqual(self.provider.check_for_commands(), ["/orders"])
+        self.assertEqual(self.provider.last_update_id, 6)
+
+    def test_webhook_rejects_bad_secret(self):
+        self.assertEqual(self.post(update(7, "/sync"), secret="nope").status_code, 403)
+        self.assertTrue(self.provider.updates.empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
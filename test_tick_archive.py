@@ -0,0 +1,89 @@
+import unittest
+import tempfile
+import shutil
+import numpy as np
+from tick_archive import TickArchive, NS_PER_DAY
+from data_loader import DataLoader
+
+class MockFixClient:
+    def __init__(self):
+        self.market_data_callbacks = []
+
+class TestTickArchive(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.archive = TickArchive(self.root)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_append_is_buffered_until_flush(self):
+        self.archive.append("41", 1, 2000.0, 1999.9, 2000.1)
+        self.assertEqual(self.archive.days("41"), [])
+
+        self.archive.flush()
+        day = self.archive.days("41")[0]
+        cols = self.archive.read_day("41", day)
+        self.assertIsInstance(cols['time'], np.memmap)
+        self.assertEqual(cols['time'].tolist(), [1])
+        self.assertEqual(cols['bid'].tolist(), [1999.9])
+        self.assertEqual(cols['ask'].tolist(), [2000.1])
+
+    def test_split_per_day_and_append_only(self):
+        day0 = 20000 * NS_PER_DAY
+        ticks = [(day0 + 10, 1.0), (day0 + NS_PER_DAY - 1, 2.0), (day0 + NS_PER_DAY, 3.0)]
+        for t, p in ticks[:2]:
+            self.archive.append("41", t, p, np.nan, np.nan)
+        self.archive.flush()
+        self.archive.append("41", *ticks[2], np.nan, np.nan)
+        self.archive.append("41", day0 + 20, 1.5, np.nan, np.nan) # Late tick lands in its own day
+        self.archive.flush()
+
+        days = self.archive.days("41")
+        self.assertEqual(len(days), 2)
+        self.assertEqual(self.archive.read_day("41", days[1])['price'].tolist(), [3.0])
+
+    def test_truncated_column_is_ignored(self):
+        for i in range(3):
+            self.archive.append("41", i, float(i), np.nan, np.nan)
+        self.archive.flush()
+        day = self.archive.days("41")[0]
+        # Simulate a crash mid-write: one column has an extra partial row
+        with open(f"{self.root}/41/{day}/time.bin", 'ab') as f:
+            f.write(b'\x00' * 12)
+        self.assertEqual(len(self.archive.read_day("41", day)['time']), 3)
+
+    def test_append_after_torn_write(self):
+        for i in range(3):
+            self.archive.append("41", i, float(i), np.nan, np.nan)
+        self.archive.flush()
+        day = self.archive.days("41")[0]
+        # Crash mid-flush: time got a full row plus part of one, price a partial row, bid/ask nothing
+        with open(f"{self.root}/41/{day}/time.bin", 'ab') as f:
+            f.write(np.int64(3).tobytes() + b'\x00' * 3)
+        with open(f"{self.root}/41/{day}/price.bin", 'ab') as f:
+            f.write(b'\x00' * 5)
+
+        archive = TickArchive(self.root) # Next session
+        for i in range(4, 6):
+            archive.append("41", i, float(i), np.nan, np.nan)
+        archive.flush()
+        cols = archive.read_day("41", day)
+        self.assertEqual(cols['time'].tolist(), [0, 1, 2, 4, 5])
+        self.assertEqual(cols['price'].tolist(), [0.0, 1.0, 2.0, 4.0, 5.0])
+        self.assertEqual(len(cols['ask']), 5)
+
+    def test_loader_persists_ticks_via_writer_thread(self):
+        self.archive.flush_interval = 0.05
+        self.archive.start()
+        loader = DataLoader(MockFixClient(), archive=self.archive)
+        for i in range(100):
+            loader.on_tick("41", 2000.0 + i, bid=1999.0 + i, ask=2001.0 + i, timestamp=i)
+        self.archive.stop()
+
+        cols = self.archive.read_day("41", self.archive.days("41")[0])
+        self.assertEqual(cols['time'].tolist(), list(range(100)))
+        np.testing.assert_array_equal(cols['ask'], 2001.0 + np.arange(100))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from tick_store import RingBuffer, TickStore
+from data_loader import DataLoader
+
+class MockFixClient:
+    def __init__(self):
+        self.market_data_callbacks = []
+
+class TestTickStore(unittest.TestCase):
+    def test_views_are_chronological_after_wrap(self):
+        store = TickStore(4)
+        for i in range(10):
+            store.add(i, float(i))
+
+        times, prices, bids, asks = store.arrays()
+        self.assertEqual(list(times), [6, 7, 8, 9])
+        self.assertEqual(list(prices), [6.0, 7.0, 8.0, 9.0])
+        self.assertTrue(np.isnan(bids).all())
+        self.assertEqual(list(store.view('time', 2)), [8, 9])
+        self.assertEqual(store.last('price'), 9.0)
+
+        # Views alias the preallocated storage (no copy)
+        self.assertTrue(np.shares_memory(times, store.columns['time']))
+
+    def test_extend_matches_append(self):
+        a = RingBuffer(5, {'x': np.int64})
+        b = RingBuffer(5, {'x': np.int64})
+        for i in range(3):
+            a.append(x=i)
+        a.extend(x=np.arange(3, 12))
+        for i in range(12):
+            b.append(x=i)
+        self.assertEqual(list(a.view('x')), list(b.view('x')))
+
+    def test_memory_is_fixed(self):
+        loader = DataLoader(MockFixClient(), retention=1000)
+        for i in range(5000):
+            loader.on_tick("41", 2000.0 + i, timestamp=i * 1_000_000_000)
+
+        self.assertEqual(len(loader.ticks["41"]), 1000)
+        usage = loader.memory_usage()
+        # Ticks: 4 columns * 8 bytes * 2 (mirrored) * capacity, plus bar history
+        bar_bytes = loader.bars["41"].nbytes
+        self.assertEqual(usage["41"], 4 * 8 * 2 * 1000 + bar_bytes)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import tempfile
+import shutil
+import time
+import numpy as np
+from tick_archive import TickArchive
+from data_loader import DataLoader
+
+class MockFixClient:
+    def __init__(self):
+        self.market_data_callbacks = []
+
+class TestWarmStart(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.archive = TickArchive(self.root)
+
+        # ~3 days of ticks, 1M+ rows, written straight to the archive buffer
+        rng = np.random.default_rng(3)
+        n = 1_200_000
+        self.times = 1_700_000_000_000_000_000 + np.cumsum(rng.integers(50_000_000, 400_000_000, size=n))
+        self.prices = 2000 + np.cumsum(rng.normal(0, 0.05, size=n))
+        self.archive.pending["41"] = list(zip(self.times.tolist(), self.prices.tolist(), [np.nan] * n, [np.nan] * n))
+        self.archive.flush()
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def live_loader(self):
+        """Reference: the same ticks replayed through on_tick."""
+        loader = DataLoader(MockFixClient(), retention=1000)
+        for t, p in zip(self.times[-200_000:].tolist(), self.prices[-200_000:].tolist()):
+            loader.on_tick("41", p, timestamp=t)
+        return loader
+
+    def test_bulk_load_is_fast_and_matches_replay(self):
+        loader = DataLoader(MockFixClient(), retention=1000, archive=self.archive)
+        t0 = time.perf_counter()
+        loaded = loader.warm_start("41", bars=2000)
+        elapsed = time.perf_counter() - t0
+
+        self.assertGreater(loaded, 0)
+        self.assertLess(elapsed, 1.0)
+
+        expected = self.live_loader()
+        for tf, length in [('1m', 30), ('5m', 30), ('1h', 10)]:
+            got = loader.get_latest_bars("41", length=length, timeframe=tf)
+            ref = expected.get_latest_bars("41", length=length, timeframe=tf)
+            self.assertTrue((got.index == ref.index).all(), tf)
+            np.testing.assert_allclose(got.values, ref.values, err_msg=tf)
+
+        # Ticks are restored too, capped at the retention window
+        times, prices, _, _ = loader.get_tick_arrays("41")
+        self.assertEqual(len(times), 1000)
+        self.assertEqual(times[-1], self.times[-1])
+
+    def test_live_ticks_continue_restored_bars(self):
+        loader = DataLoader(MockFixClient(), archive=self.archive)
+        loader.warm_start("41", bars=100)
+        last = loader.get_latest_bars("41", length=1)
+        next_minute = (int(self.times[-1]) // 60_000_000_000 + 1) * 60_000_000_000
+        loader.on_tick("41", 1.0, timestamp=next_minute)
+
+        df = loader.get_latest_bars("41", length=2)
+        self.assertEqual(df.index[0], last.index[0])
+        self.assertEqual(df['close'].iloc[-1], 1.0)
+
+    def test_skipped_when_live_data_exists(self):
+        loader = DataLoader(MockFixClient(), archive=self.archive)
+        loader.on_tick("41", 2000.0)
+        self.assertEqual(loader.warm_start("41"), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import threading
+import numpy as np
+from datetime import datetime, timezone
+from logger import setup_logger
+
+logger = setup_logger("TickArchive")
+
+NS_PER_DAY = 86400 * 1_000_000_000
+
+class TickArchive:
+    """
+    Append-only on-disk tick archive: one directory per symbol and UTC day,
+    one raw little-endian file per column (<root>/<symbol>/<YYYYMMDD>/<column>.bin).
+
+    `append()` only buffers in memory, so the FIX reader thread never touches
+    the disk; a background writer flushes the buffer every `flush_interval`
+    seconds. Reads are memory-mapped.
+    """
+    COLUMNS = {
+        'time': np.dtype('<i8'), # Epoch ns
+        'price': np.dtype('<f8'),
+        'bid': np.dtype('<f8'),
+        'ask': np.dtype('<f8'),
+    }
+
+    def __init__(self, root, flush_interval=1.0):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.pending = {} # symbol -> list of (time, price, bid, ask)
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.checked = set() # Day folders aligned by _repair() this session
+        self.running = False
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        self.running = True
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+        logger.info(f"Tick archive writing to {os.path.abspath(self.root)}")
+
+    def stop(self):
+        """Stop the writer and flush anything still buffered."""
+        self.running = False
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+            self.thread = None
+        self.flush()
+
+    def append(self, symbol_id, ts_ns, price, bid, ask):
+        with self.lock:
+            rows = self.pending.get(symbol_id)
+            if rows is None:
+                rows = self.pending[symbol_id] = []
+            rows.append((ts_ns, price, bid, ask))
+
+    def _writer_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Tick archive flush failed: {e}")
+
+    def flush(self):
+        """Write buffered ticks to disk."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+
+        with self.write_lock:
+            for symbol_id, rows in pending.items():
+                if not rows:
+                    continue
+                times = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+                values = np.array([r[1:] for r in rows], dtype=np.float64).reshape(-1, 3)
+                days = times // NS_PER_DAY
+
+                # Split on UTC day changes (rows arrive in time order)
+                cuts = np.flatnonzero(np.diff(days)) + 1
+                for start, end in zip(np.r_[0, cuts], np.r_[cuts, len(rows)]):
+                    folder = self._day_dir(symbol_id, int(days[start]))
+                    os.makedirs(folder, exist_ok=True)
+                    if folder not in self.checked:
+                        self._repair(folder)
+                        self.checked.add(folder)
+                    columns = {
+                        'time': times[start:end],
+                        'price': values[start:end, 0],
+                        'bid': values[start:end, 1],
+                        'ask': values[start:end, 2],
+                    }
+                    for name, dtype in self.COLUMNS.items():
+                        with open(os.path.join(folder, f"{name}.bin"), 'ab') as f:
+                            np.ascontiguousarray(columns[name], dtype=dtype).tofile(f)
+
+    def _repair(self, folder):
+        """
+        Truncate every column file of a day to the same whole-row count before
+        the first append of this session, so rows torn by a crash mid-flush
+        don't leave later appends misaligned between columns.
+        """
+        paths = {name: os.path.join(folder, f"{name}.bin") for name in self.COLUMNS}
+        rows = {name: os.path.getsize(path) // self.COLUMNS[name].itemsize if os.path.exists(path) else 0
+                for name, path in paths.items()}
+        n = min(rows.values())
+        for name, path in paths.items():
+            size = n * self.COLUMNS[name].itemsize
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                logger.warning(f"Tick archive: truncating {path} to {n} rows after an interrupted write")
+                os.truncate(path, size)
+
+    def _day_dir(self, symbol_id, day_index):
+        day = datetime.fromtimestamp(day_index * 86400, tz=timezone.utc).strftime("%Y%m%d")
+        return os.path.join(self.root, str(symbol_id), day)
+
+    def days(self, symbol_id):
+        """Archived days for a symbol, oldest first (YYYYMMDD strings)."""
+        folder = os.path.join(self.root, str(symbol_id))
+        if not os.path.isdir(folder):
+            return []
+        return sorted(d for d in os.listdir(folder) if d.isdigit())
+
+    def read_day(self, symbol_id, day):
+        """
+        Memory-mapped, read-only column arrays for one archived day, or None.
+        Columns are truncated to a common length in case a write was interrupted.
+        """
+        folder = os.path.join(self.root, str(symbol_id), day)
+        sizes = {}
+        for name, dtype in self.COLUMNS.items():
+            path = os.path.join(folder, f"{name}.bin")
+            if not os.path.exists(path):
+                return None
+            sizes[name] = os.path.getsize(path) // dtype.itemsize
+
+        n = min(sizes.values())
+        if n == 0:
+            return None
+        return {
+            name: np.memmap(os.path.join(folder, f"{name}.bin"), dtype=dtype, mode='r', shape=(n,))
+            for name, dtype in self.COLUMNS.items()
+        }
+
+    def load_recent(self, symbol_id, minutes):
+        """
+        Bulk-read the newest archived ticks covering at least `minutes` distinct
+        minutes. Returns a dict of column arrays (oldest first), or None.
+        """
+        self.flush()
+        chunks = []
+        covered = 0
+        for day in reversed(self.days(symbol_id)):
+            cols = self.read_day(symbol_id, day)
+            if cols is None:
+                continue
+            chunks.append(cols)
+            mins = cols['time'] // 60_000_000_000
+            covered += int(np.count_nonzero(np.diff(mins))) + 1
+            if covered >= minutes:
+                break
+
+        if not chunks:
+            return None
+
+        chunks.reverse()
+        data = {name: np.concatenate([c[name] for c in chunks]) for name in self.COLUMNS}
+
+        # Trim to the newest `minutes` minutes
+        mins = data['time'] // 60_000_000_000
+        starts = np.flatnonzero(np.diff(mins)) + 1
+        if len(starts) >= minutes:
+            first = starts[len(starts) - minutes]
+            data = {name: arr[first:] for name, arr in data.items()}
+        return data
@@ -0,0 +1,92 @@
+import numpy as np
+
+class RingBuffer:
+    """
+    Fixed-capacity columnar ring buffer backed by preallocated NumPy arrays.
+
+    Every row is written twice (at `i` and `i + capacity`), so the most recent
+    `capacity` rows are always one contiguous slice of each column. `view()`
+    therefore returns zero-copy, chronologically ordered arrays even after the
+    buffer has wrapped around.
+    """
+    def __init__(self, capacity, columns):
+        """
+        columns: dict of column name -> numpy dtype
+        """
+        if capacity <= 0:
+            raise ValueError("RingBuffer capacity must be positive")
+        self.capacity = int(capacity)
+        self.columns = {name: np.zeros(2 * self.capacity, dtype=dtype) for name, dtype in columns.items()}
+        self.head = 0 # Next write slot in [0, capacity)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, **values):
+        i = self.head
+        j = i + self.capacity
+        for name, arr in self.columns.items():
+            v = values[name]
+            arr[i] = v
+            arr[j] = v
+        self.head = i + 1 if i + 1 < self.capacity else 0
+        if self.size < self.capacity:
+            self.size += 1
+
+    def extend(self, **arrays):
+        """Bulk append equal-length arrays (oldest first)."""
+        n = len(next(iter(arrays.values())))
+        if n == 0:
+            return
+        if n > self.capacity:
+            # Only the newest `capacity` rows can survive
+            arrays = {k: v[-self.capacity:] for k, v in arrays.items()}
+            n = self.capacity
+
+        idx = (self.head + np.arange(n)) % self.capacity
+        for name, arr in self.columns.items():
+            v = arrays[name]
+            arr[idx] = v
+            arr[idx + self.capacity] = v
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def view(self, name, length=None):
+        """Zero-copy view of the newest `length` rows of a column (oldest first)."""
+        n = self.size if length is None else min(int(length), self.size)
+        end = self.head + self.capacity if self.size == self.capacity else self.head
+        return self.columns[name][end - n:end]
+
+    def last(self, name):
+        if self.size == 0:
+            return None
+        return self.columns[name][(self.head - 1) % self.capacity]
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+
+    @property
+    def nbytes(self):
+        return sum(arr.nbytes for arr in self.columns.values())
+
+
+class TickStore(RingBuffer):
+    """Per-symbol tick history: int64 epoch-ns timestamps plus float64 price/bid/ask."""
+    COLUMNS = {
+        'time': np.int64,
+        'price': np.float64,
+        'bid': np.float64,
+        'ask': np.float64,
+    }
+
+    def __init__(self, capacity):
+        super().__init__(capacity, self.COLUMNS)
+
+    def add(self, ts_ns, price, bid=np.nan, ask=np.nan):
+        self.append(time=ts_ns, price=price, bid=bid, ask=ask)
+
+    def arrays(self, length=None):
+        """Return (time, price, bid, ask) views of the newest `length` ticks."""
+        return tuple(self.view(name, length) for name in self.COLUMNS)